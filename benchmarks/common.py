@@ -0,0 +1,28 @@
+import statistics
+import time
+from collections.abc import Callable
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(name: str, samples: list[float], unit: str = 'ms') -> None:
+    """Print the mean, p50, p95 and max of the samples given in seconds."""
+    scale = {'ms': 1000, 'us': 1_000_000}[unit]
+    print(
+        f'{name:<40} n={len(samples):<6} mean={statistics.fmean(samples) * scale:9.3f}{unit} '
+        f'p50={percentile(samples, 0.5) * scale:9.3f}{unit} p95={percentile(samples, 0.95) * scale:9.3f}{unit} '
+        f'max={max(samples) * scale:9.3f}{unit}'
+    )
+
+
+def measure(func: Callable[[], object], repeat: int) -> list[float]:
+    """Call the function `repeat` times, return the seconds of every call."""
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started_at)
+    return samples
@@ -0,0 +1,79 @@
+"""
+Latency of outbound requests to a local stub server: the shared pooled HTTPClient against
+a new aiohttp session per request, as the clients did before.
+
+Run: python -m benchmarks.http_client
+"""
+
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.common import report
+from src.classes.http_client import HTTPClient
+
+REQUESTS = 500
+CONCURRENCY = 20
+
+
+async def start_stub() -> tuple[web.AppRunner, str]:
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response({'status': True, 'content': (await request.json())['content']})
+
+    stub = web.Application()
+    stub.router.add_post('/solution', handler)
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}/solution'
+
+
+async def pooled_request(client: HTTPClient, url: str) -> float:
+    started_at = time.perf_counter()
+    async with client.post(url, json={'content': 'task'}) as response:
+        await response.json()
+    return time.perf_counter() - started_at
+
+
+async def session_per_request(url: str) -> float:
+    started_at = time.perf_counter()
+    async with aiohttp.ClientSession() as session, session.post(url, json={'content': 'task'}) as response:
+        await response.json()
+    return time.perf_counter() - started_at
+
+
+async def run_concurrently(make_request, requests: int) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited() -> float:
+        async with semaphore:
+            return await make_request()
+
+    return list(await asyncio.gather(*(limited() for _ in range(requests))))
+
+
+async def main() -> None:
+    runner, url = await start_stub()
+    client = HTTPClient()
+    try:
+        await client.start()
+        await pooled_request(client, url)  # warm up the pool
+        report('pooled client, sequential', [await pooled_request(client, url) for _ in range(REQUESTS)])
+        report('session per request, sequential', [await session_per_request(url) for _ in range(REQUESTS)])
+        report(
+            f'pooled client, {CONCURRENCY} concurrent',
+            await run_concurrently(lambda: pooled_request(client, url), REQUESTS),
+        )
+        report(
+            f'session per request, {CONCURRENCY} concurrent',
+            await run_concurrently(lambda: session_per_request(url), REQUESTS),
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
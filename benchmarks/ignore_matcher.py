@@ -0,0 +1,89 @@
+"""
+Matching 10,000 paths of a Python project with a virtual environment, a git directory and caches against
+the ignore settings of a usual .gitignore: the IgnoreMatcher of the room compiled into one regex against
+fnmatch of every setting over the segments of every path.
+
+Run: python -m benchmarks.ignore_matcher
+"""
+
+import random
+from fnmatch import fnmatchcase
+
+from benchmarks.common import measure, report
+from src.classes.ignore import IgnoreMatcher
+from src.events.utils import parse_files_to_ignore
+
+PATHS = 10_000
+REPEAT = 20
+FILES_TO_IGNORE = """
+# Byte-compiled / optimized / DLL files
+__pycache__/
+*.py[cod]
+*$py.class
+*.so
+/build/
+/dist/
+*.egg-info/
+.eggs/
+.git/
+.idea/
+.vscode/
+.mypy_cache/
+.pytest_cache/
+.ruff_cache/
+venv/
+.venv/
+env/
+node_modules/
+.coverage
+.env
+*.log
+*.sqlite3
+*.ipynb
+.DS_Store
+"""
+TOP_DIRECTORIES = ('src', 'tests', 'src/core', 'src/api', 'docs', 'venv/lib/python3.11/site-packages/requests', '.git')
+
+
+def make_paths() -> list[str]:
+    generator = random.Random(0)
+    paths = []
+    for number in range(PATHS):
+        directory = generator.choice(TOP_DIRECTORIES)
+        name = generator.choice(
+            (f'module_{number}.py', f'test_{number}.py', f'notes_{number}.md', f'data_{number}.log')
+        )
+        if generator.random() < 0.2:
+            directory, name = f'{directory}/__pycache__', name.replace('.py', '.cpython-311.pyc')
+        paths.append(f'{directory}/{name}')
+    return paths
+
+
+def match_segments(settings: dict[str : list[str]], path: str) -> bool:
+    """Match every setting against the segments of the path one by one."""
+    *directories, name = path.split('/')
+    return (
+        any(fnmatchcase(segment, pattern) for segment in (*directories, name) for pattern in settings['names'])
+        or any(fnmatchcase(segment, pattern) for segment in directories for pattern in settings['dirs'])
+        or any(fnmatchcase(name, f'*.{extension}') for extension in settings['extensions'])
+    )
+
+
+def main() -> None:
+    settings = parse_files_to_ignore(FILES_TO_IGNORE)
+    matcher = IgnoreMatcher(settings)
+    paths = make_paths()
+    files = [{'filename': path, 'status': 'CREATED', 'content': ''} for path in paths]
+    ignored = len(paths) - len(matcher.filter(files))
+    print(
+        f'{len(paths):,} paths, ignored: compiled matcher {ignored:,}, '
+        f'segments {sum(match_segments(settings, path) for path in paths):,}'
+    )
+
+    report('compile the settings', measure(lambda: IgnoreMatcher(settings), REPEAT * 10), unit='us')
+    report('compiled matcher, filter the files', measure(lambda: matcher.filter(files), REPEAT))
+    report('fnmatch per segment', measure(lambda: [match_segments(settings, path) for path in paths], REPEAT))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Parsing large Notion lesson pages of 600 to 20,000 blocks, given as the JSON of the record map recorded from
+loadPageChunk with the blocks in the order of the chunks: decoding by json and orjson, the HTML built in one pass
+in the page content order against a pydantic model per block in the dictionary order, as before,
+and parse_exercises, which takes the pages of NOTION_OFFLOAD_BLOCKS blocks or more off the event loop
+to the process pool at the cost of pickling the blocks.
+
+Run: python -m benchmarks.notion_parser
+"""
+
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import orjson
+from pydantic import BaseModel
+
+from benchmarks.common import measure, report
+from src.classes.executor import executor_service
+from src.scraper.notion_scraper import build_exercises, parse_exercises
+
+PAGE_TASKS = (60, 600, 2000)  # tasks of 10 blocks
+REPEAT = 10
+
+
+class Block(BaseModel):
+    type_: list | str | None
+    properties: dict | list | None
+
+
+def make_record_map(tasks: int) -> tuple[str, bytes]:
+    """Make a lesson page of tasks of a header, formatted text, a toggle with nested code and a divider."""
+    page_id = str(uuid.UUID(int=tasks << 64))
+    blocks = {}
+    content = []
+
+    def add(block_type: str, title: list | None = None, children: list[str] | None = None) -> str:
+        block_id = str(uuid.UUID(int=(tasks << 64) + len(blocks) + 1))
+        value = {'id': block_id, 'type': block_type, 'parent_id': page_id, 'version': 3, 'created_time': 1}
+        if title is not None:
+            value['properties'] = {'title': title}
+        if children is not None:
+            value['content'] = children
+        blocks[block_id] = {'role': 'reader', 'value': value}
+        return block_id
+
+    for task in range(tasks):
+        content.append(add('header', [[f'Task {task}']]))
+        content.extend(
+            add('text', [['Write a function '], ['solve', [['c']]], [f' for the case {line}.']]) for line in range(6)
+        )
+        code = f'def solve(values):\n    return sorted(values)[{task}]\n'
+        content.append(add('toggle', [['Hint']], children=[add('code', [[code]])]))
+        content.append(add('divider'))
+    blocks[page_id] = {'role': 'reader', 'value': {'id': page_id, 'type': 'page', 'content': content}}
+
+    block_ids = list(blocks)
+    random.Random(tasks).shuffle(block_ids)  # the chunks come in no particular order
+    return page_id, json.dumps({'block': {block_id: blocks[block_id] for block_id in block_ids}}).encode()
+
+
+def parse_with_models(data: dict) -> list[str]:
+    """The parser before the one pass: a pydantic model of every block in the order of the dictionary."""
+    blocks = [
+        Block(type_=value['type'], properties=value.get('properties', {}))
+        for value in (block['value'] for block in data['block'].values())
+        if 'properties' in value and value.get('type') != 'page' or value.get('type') == 'divider'
+    ]
+    all_tasks = []
+    task = []
+    for block in blocks:
+        title = block.properties.get('title')
+        if title and 'header' in block.type_:
+            task.append('<h3>' + title[0][0] + '</h3>')
+        elif title and 'code' in block.type_:
+            task.append('<pre class="ql-syntax">' + title[0][0] + '</pre>')
+        elif block.type_ == 'divider':
+            all_tasks.append(''.join(task))
+            task = []
+        elif title:
+            task.append(''.join(i if isinstance(i, str) else i[0] for i in title) + '<br>')
+    all_tasks.append(''.join(task))
+    return all_tasks
+
+
+async def measure_async(make_call, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await make_call()
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+async def main() -> None:
+    try:
+        for tasks in PAGE_TASKS:
+            page_id, recorded = make_record_map(tasks)
+            data = orjson.loads(recorded)
+            print(f'{len(data["block"]):,} blocks, {len(recorded):,} bytes')
+
+            report('  json decode', measure(lambda recorded=recorded: json.loads(recorded), REPEAT))
+            report('  orjson decode', measure(lambda recorded=recorded: orjson.loads(recorded), REPEAT))
+            report(
+                '  pydantic model per block',
+                measure(lambda data=data: parse_with_models(data), REPEAT),
+            )
+            report(
+                '  one pass in content order',
+                measure(lambda data=data, page_id=page_id: build_exercises(data, page_id), REPEAT),
+            )
+            await parse_exercises(data, page_id)  # start the process pool
+            report(
+                '  parse_exercises',
+                await measure_async(lambda data=data, page_id=page_id: parse_exercises(data, page_id), REPEAT),
+            )
+    finally:
+        executor_service.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
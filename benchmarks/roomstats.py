@@ -0,0 +1,107 @@
+"""
+Latency of /roomstats and /api/roomstats of a room of 50 students under 20 concurrent dashboard requests,
+while the students send their steps over the sockets of the same server: the round trip of steps/status/to_mentor
+to the host is measured meanwhile. The stats rebuilt and rendered on every request, as before, against the stats
+cached by the progress version of the room, with and without If-None-Match. The dashboards run in the same process.
+
+Run: python -m benchmarks.roomstats
+"""
+
+import asyncio
+import itertools
+import time
+from collections.abc import Iterator
+
+import httpx
+from socketio import AsyncClient
+
+from benchmarks.common import report
+from benchmarks.server import create_room, start_server, stop_server
+from src import web
+
+STUDENTS = 50
+STEPS = 20
+REQUESTS = 1000
+CONCURRENCY = 20
+UPDATE_INTERVAL = 0.01  # seconds between the steps updates of the students
+
+
+async def send_steps(
+    host: AsyncClient, students: list[AsyncClient], updates: Iterator[int], stop: asyncio.Event
+) -> list[float]:
+    """Send the changed steps of the students one by one until stopped, return the seconds until the host got them."""
+    waiters: list[asyncio.Future] = []
+    host.on('steps/status/to_mentor', lambda data: waiters.pop().set_result(None))
+    samples = []
+    while not stop.is_set():
+        sent = next(updates)
+        done = sent // STUDENTS % STEPS + 1  # differ from the previous steps of the student, else nothing is sent
+        steps = {str(step): 'DONE' if step < done else 'NONE' for step in range(STEPS)}
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        started_at = time.perf_counter()
+        await students[sent % STUDENTS].emit('steps/status/to_mentor', data=steps)
+        await waiter
+        samples.append(time.perf_counter() - started_at)
+        await asyncio.sleep(UPDATE_INTERVAL)
+    return samples
+
+
+async def get_stats(http: httpx.AsyncClient, path: str, mode: str, etags: dict[str, str]) -> float:
+    if mode == 'rebuilt':
+        web.stats_cache.clear()
+    headers = {'If-None-Match': etags[path]} if mode == 'etag' and path in etags else {}
+    started_at = time.perf_counter()
+    response = await http.get(path, headers=headers)
+    elapsed = time.perf_counter() - started_at
+    if response.status_code == 200:
+        etags[path] = response.headers['etag']
+    return elapsed
+
+
+async def run_load(
+    http: httpx.AsyncClient,
+    host: AsyncClient,
+    students: list[AsyncClient],
+    updates: Iterator[int],
+    path: str,
+    mode: str,
+) -> tuple[list[float], list[float]]:
+    """Request the stats concurrently while the students send their steps, return both latencies."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    etags = {}
+
+    async def limited() -> float:
+        async with semaphore:
+            return await get_stats(http, path, mode, etags)
+
+    stop = asyncio.Event()
+    sockets = asyncio.create_task(send_steps(host, students, updates, stop))
+    requests = await asyncio.gather(*(limited() for _ in range(REQUESTS)))
+    stop.set()
+    return list(requests), await sockets
+
+
+async def main() -> None:
+    server, serving, url = await start_server()
+    clients = []
+    try:
+        room_id, host, students = await create_room(url, STUDENTS)
+        clients = [host, *students]
+        updates = itertools.count()
+        async with httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=CONCURRENCY)) as http:
+            for path in (f'/roomstats/{room_id}', f'/api/roomstats/{room_id}'):
+                for mode, name in (
+                    ('rebuilt', 'rebuilt every request'),
+                    ('cached', 'cached'),
+                    ('etag', 'cached, If-None-Match'),
+                ):
+                    requests, steps = await run_load(http, host, students, updates, path, mode)
+                    report(f'{path.rsplit("/", 1)[0]}, {name}', requests)
+                    report('  steps round trip meanwhile', steps)
+    finally:
+        await stop_server(server, serving, clients)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
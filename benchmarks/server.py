@@ -0,0 +1,54 @@
+"""The application served in the process of the benchmark, with a room of connected Socket.IO clients."""
+
+import asyncio
+import socket
+
+import uvicorn
+from socketio import AsyncClient
+
+from src.main import app
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def start_server() -> tuple[uvicorn.Server, asyncio.Task, str]:
+    port = get_free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f'http://127.0.0.1:{port}'
+
+
+async def stop_server(server: uvicorn.Server, task: asyncio.Task, clients: list[AsyncClient]) -> None:
+    for client in clients:
+        await client.disconnect()  # the server waits for the open connections
+    server.should_exit = True
+    await task
+
+
+async def connect(url: str) -> AsyncClient:
+    client = AsyncClient()
+    await client.connect(url)
+    return client
+
+
+async def create_room(url: str, students: int) -> tuple[int, AsyncClient, list[AsyncClient]]:
+    """Connect a host creating a room and the students joining it, return the room id and the clients."""
+    host = await connect(url)
+    created = asyncio.get_running_loop().create_future()
+    host.on('room/update', lambda data: created.done() or created.set_result(data['id']))
+    await host.emit('room/create', data={'name': 'Teacher'})
+    room_id = await created
+
+    clients = []
+    for number in range(students):
+        client = await connect(url)
+        await client.emit('room/join', data={'room_id': room_id, 'name': f'Student {number}'})
+        clients.append(client)
+    await asyncio.sleep(0.1)
+    return room_id, host, clients
@@ -0,0 +1,64 @@
+"""
+Bytes sent to the host while a student types into a 2,000-line file: every keystroke is one sharing/code_update
+relayed without throttling. Hosts without the 'diff' feature get the full file each time, hosts with it get
+the change, both from plugins sending the changes and from old plugins sending the full content.
+
+Run: python -m benchmarks.sharing_bandwidth
+"""
+
+import json
+import time
+
+from benchmarks.common import report
+from src.classes.relay import PendingUpdate
+from src.classes.sharing import SharedDocument, make_change
+
+FILE_LINES = 2000
+TYPED = 'def solve(numbers):\n    return sorted(set(numbers))[-2]\n'
+
+
+def make_file() -> str:
+    return ''.join(f'value_{line} = compute({line}, factor={line % 7})  # step {line}\n' for line in range(FILE_LINES))
+
+
+def replay(features: set[str], send_changes: bool) -> tuple[int, list[float]]:
+    """Type TYPED in the middle of the file, return the relayed bytes and the seconds of every update."""
+    document = SharedDocument()
+    content = make_file()
+    document.reset([{'filename': 'main.py', 'status': 'CREATED', 'content': content}])
+    slot = PendingUpdate(document)
+    position = len(content) // 2
+    sent, samples = 0, []
+    for index, char in enumerate(TYPED):
+        offset = position + index
+        new_content = content[:offset] + char + content[offset:]
+        if send_changes:
+            file = {'filename': 'main.py', 'status': 'UPDATED', 'changes': [make_change(content, new_content)]}
+        else:
+            file = {'filename': 'main.py', 'status': 'UPDATED', 'content': new_content}
+        content = new_content
+
+        started_at = time.perf_counter()
+        previous = document.get_contents([file])
+        updates = document.update([file], document.version)
+        slot.add(previous, updates, {'room_id': 1, 'user_id': 2}, features)
+        payload = json.dumps(slot.build(), ensure_ascii=False).encode()
+        samples.append(time.perf_counter() - started_at)
+        sent += len(payload)
+    return sent, samples
+
+
+def main() -> None:
+    print(f'{len(TYPED)} keystrokes into a file of {FILE_LINES} lines, {len(make_file().encode()):,} bytes')
+    for name, features, send_changes in (
+        ('full content, host without diff', set(), False),
+        ('changes, host with diff', {'diff'}, True),
+        ('old plugin content, host with diff', {'diff'}, False),
+    ):
+        sent, samples = replay(features, send_changes)
+        print(f'{name:<40} sent={sent:>12,} bytes, {sent // len(TYPED):>8,} per keystroke')
+        report(f'{name}, update', samples)
+
+
+if __name__ == '__main__':
+    main()
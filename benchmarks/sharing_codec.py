@@ -0,0 +1,55 @@
+"""
+Wire bytes and CPU of sharing/code_send payloads of Python projects, taken from the standard library:
+the Socket.IO packet with the files as JSON text against the zlib compressed binary payload of the 'zlib' feature.
+
+Run: python -m benchmarks.sharing_codec
+"""
+
+import sysconfig
+from pathlib import Path
+
+from socketio import packet
+
+from benchmarks.common import measure, report
+from src.classes.codec import pack_files, unpack_files
+
+PROJECTS = ('json', 'asyncio', 'email')  # small, medium and large packages
+REPEAT = 20
+
+
+def load_project(name: str) -> list[dict]:
+    root = Path(sysconfig.get_paths()['stdlib']) / name
+    return [
+        {'filename': str(path.relative_to(root)), 'status': 'CREATED', 'content': path.read_text(encoding='utf-8')}
+        for path in sorted(root.rglob('*.py'))
+    ]
+
+
+def encode_packet(data: dict) -> list[str | bytes]:
+    encoded = packet.Packet(packet.EVENT, data=['sharing/code_send', data], namespace='/').encode()
+    return encoded if isinstance(encoded, list) else [encoded]
+
+
+def wire_size(parts: list[str | bytes]) -> int:
+    return sum(len(part.encode()) if isinstance(part, str) else len(part) for part in parts)
+
+
+def main() -> None:
+    for name in PROJECTS:
+        files = load_project(name)
+        data = {'room_id': 1, 'user_id': 2, 'files': files}
+        json_size = wire_size(encode_packet(data))
+        zlib_size = wire_size(encode_packet(pack_files(dict(data), {'zlib'})))
+        print(f'{name}: {len(files)} files, JSON {json_size:,} bytes, zlib {zlib_size:,} bytes')
+
+        report(f'{name}, JSON packet encode', measure(lambda data=data: encode_packet(data), REPEAT))
+        report(
+            f'{name}, zlib pack and packet encode',
+            measure(lambda data=data: encode_packet(pack_files(dict(data), {'zlib'})), REPEAT),
+        )
+        packed = pack_files(dict(data), {'zlib'})
+        report(f'{name}, zlib unpack', measure(lambda packed=packed: unpack_files(dict(packed)), REPEAT))
+
+
+if __name__ == '__main__':
+    main()
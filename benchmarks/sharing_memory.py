@@ -0,0 +1,91 @@
+"""
+Memory of the shared code of a room of 200 students who started from the same template and changed a few lines:
+documents in the blob pool of the room against a copy of the files per student, as the server kept them before.
+The files of every student are decoded from JSON, so equal files are distinct strings as they come from the socket.
+
+Run: python -m benchmarks.sharing_memory
+"""
+
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import report
+from src.classes.sharing import DocumentStore
+
+STUDENTS = 200
+TEMPLATE_FILES = 10
+LINES_PER_FILE = 100
+
+
+def make_template() -> list[dict]:
+    return [
+        {
+            'filename': f'tasks/task_{number}.py',
+            'status': 'CREATED',
+            'content': ''.join(
+                f'def task_{number}_{line}(values):\n    return sum(values) * {line}\n'
+                for line in range(LINES_PER_FILE)
+            ),
+        }
+        for number in range(TEMPLATE_FILES)
+    ]
+
+
+def make_payloads(template: list[dict]) -> list[str]:
+    """The code_send payloads of the students: the template with the solution of the student in one file."""
+    payloads = []
+    for student in range(STUDENTS):
+        files = [dict(file) for file in template]
+        solved = files[student % TEMPLATE_FILES]
+        solved['content'] = solved['content'].replace('* 1\n', f'* 1 + {student}  # my solution\n', 1)
+        payloads.append(json.dumps(files))
+    return payloads
+
+
+def measure_memory(store_files) -> int:
+    """Run the storing function under tracemalloc, return the bytes kept by its result."""
+    tracemalloc.start()
+    kept = store_files()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main() -> None:
+    template = make_template()
+    payloads = make_payloads(template)
+    content_size = sum(len(file['content']) for file in template) * STUDENTS
+    print(
+        f'{STUDENTS} students, {TEMPLATE_FILES} files of {LINES_PER_FILE * 2} lines, {content_size:,} characters sent'
+    )
+
+    def store_copies() -> dict[int, dict[str, str]]:
+        return {
+            user_id: {file['filename']: file['content'] for file in json.loads(payload)}
+            for user_id, payload in enumerate(payloads)
+        }
+
+    samples = []
+
+    def store_pooled() -> DocumentStore:
+        documents = DocumentStore(max_size=content_size)
+        for user_id, payload in enumerate(payloads):
+            files = json.loads(payload)
+            started_at = time.perf_counter()
+            documents.get_or_create(user_id).reset(files)
+            documents.commit(user_id)
+            samples.append(time.perf_counter() - started_at)
+        return documents
+
+    print(f'{"copy per student":<40} kept={measure_memory(store_copies) / 1024 / 1024:8.2f}MB')
+    print(f'{"blob pool":<40} kept={measure_memory(store_pooled) / 1024 / 1024:8.2f}MB')
+    samples.clear()
+    pool = store_pooled().pool  # timed without tracemalloc
+    print(f'{"blob pool":<40} blobs={len(pool)} size={pool.size:,} characters')
+    report('blob pool, code_send of one student', samples)
+
+
+if __name__ == '__main__':
+    main()
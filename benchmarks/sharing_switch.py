@@ -0,0 +1,66 @@
+"""
+Time to the first code of the student when the host switches between the 20 students of a room, each sharing
+the 'json' package of the standard library: the snapshot of the last shared code sent at once on sharing/start
+against waiting for the code_send of the student, as before. The code_send of the student follows in both cases.
+
+Run: python -m benchmarks.sharing_switch
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import report
+from benchmarks.server import create_room, start_server, stop_server
+from benchmarks.sharing_codec import load_project
+from src.managers import room_manager
+
+STUDENTS = 20
+SWITCHES = 200
+
+
+async def main() -> None:
+    server, serving, url = await start_server()
+    clients = []
+    try:
+        room_id, host, students = await create_room(url, STUDENTS)
+        clients = [host, *students]
+        files = load_project('json')
+        for student in students:  # the plugin sends the code on sharing/start
+
+            async def send_code(data, student=student):
+                await student.emit('sharing/code_send', data={'room_id': room_id, 'files': files})
+
+            student.on('sharing/start', send_code)
+            await send_code({})
+
+        arrivals = asyncio.Queue()
+        host.on('sharing/code_send', lambda data: arrivals.put_nowait((time.perf_counter(), data['user_id'])))
+        room = room_manager.get_room_by_id(room_id)
+        user_ids = [user_id for user_id in room.users if user_id != room.host.uid]
+        await asyncio.sleep(0.5)
+        while not arrivals.empty():
+            arrivals.get_nowait()
+
+        for name, keep_snapshot in (('snapshot', True), ('no snapshot', False)):
+            first, live = [], []
+            for switch in range(SWITCHES):
+                user_id = user_ids[switch % STUDENTS]
+                if not keep_snapshot:
+                    room.documents.discard(user_id)
+                started_at = time.perf_counter()
+                await host.emit('sharing/start', data={'room_id': room_id, 'user_id': user_id})
+                times = []
+                while len(times) < (2 if keep_snapshot else 1):  # the snapshot and the code_send of the student
+                    received_at, sender = await arrivals.get()
+                    if sender == user_id:
+                        times.append(received_at - started_at)
+                first.append(times[0])
+                live.append(times[-1])
+            report(f'{name}, first code', first)
+            report(f'{name}, code_send of the student', live)
+    finally:
+        await stop_server(server, serving, clients)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
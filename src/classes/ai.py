@@ -1,29 +1,51 @@
+import json
 import os
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 from pathlib import Path
 
-import aiohttp
 from dotenv import load_dotenv
 from openai import APIConnectionError, APIStatusError, AsyncOpenAI, BadRequestError
 
+from src.classes.http_client import http_client
+from src.exceptions import AIRequestError
+
 load_dotenv(Path(__file__).parent.parent.parent / '.env')
 
 TOKEN = os.getenv('OPENAI_API_KEY')
 AI_MODEL = 'gpt-4-1106-preview'
 
 
-class BaseClient:
+class BaseClient(ABC):
     """
     Base class for interacting with the OpenAI API
     """
 
     @staticmethod
     def _build_prompt(task_text: str, user_solution_code: str) -> str:
+        """Build the prompt, the task text and the code are already fit to the budget by solution/ai."""
         return (
             f'Я выполнил задание (текст задания: "{task_text}")!\n '
             f'Помоги с решением задания и объясни что не так в моём коде (если что-то не так)!\n'
             f'Вот мой код:\n {user_solution_code}'
         )
 
+    @abstractmethod
+    async def get_explanation(self, task_text: str, user_solution_code: str) -> dict:
+        """
+        Get the explanation, equal concurrent requests are coalesced by ai_router.
+        Returns:
+            dict: {'status', 'content'} of the answer.
+        """
+
+    @abstractmethod
+    def stream_explanation(self, task_text: str, user_solution_code: str) -> AsyncIterator[str]:
+        """
+        Yield the explanation in parts as the API generates it.
+        Raises:
+            AIRequestError: If the request fails.
+        """
+
 
 class AIClient(BaseClient):
     """
@@ -61,6 +83,29 @@ class AIClient(BaseClient):
         prompt = self._build_prompt(task_text, user_solution_code)
         return await self._make_request(prompt)
 
+    async def stream_explanation(self, task_text: str, user_solution_code: str) -> AsyncIterator[str]:
+        prompt = self._build_prompt(task_text, user_solution_code)
+        try:
+            stream = await self.client.chat.completions.create(
+                model=AI_MODEL,
+                messages=[
+                    {
+                        'role': 'user',
+                        'content': prompt,
+                    },
+                ],
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except APIConnectionError as e:
+            raise AIRequestError('The server could not be reached. ' + str(e)) from e
+        except BadRequestError as e:
+            raise AIRequestError('Bad request. ' + str(e)) from e
+        except APIStatusError as e:
+            raise AIRequestError(str(e.status_code) + ' ' + str(e)) from e
+
 
 class AlternateAIClient(BaseClient):
     """
@@ -76,16 +121,15 @@ class AlternateAIClient(BaseClient):
 
     async def _make_request(self, payload: dict) -> dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.url,
-                    headers=self.headers,
-                    json=payload,
-                ) as response:
-                    if response.status == 200:
-                        ai_response = await response.json()
-                        return {'status': True, 'content': ai_response['choices'][0]['message']['content']}
-                    return {'status': False, 'content': f'Something went wrong, response code: {response.status}'}
+            async with http_client.post(
+                self.url,
+                headers=self.headers,
+                json=payload,
+            ) as response:
+                if response.status == 200:
+                    ai_response = await response.json()
+                    return {'status': True, 'content': ai_response['choices'][0]['message']['content']}
+                return {'status': False, 'content': f'Something went wrong, response code: {response.status}'}
         except Exception as e:
             return {'status': False, 'content': f'An exception occurred: {e}'}
 
@@ -101,3 +145,33 @@ class AlternateAIClient(BaseClient):
             ],
         }
         return await self._make_request(payload)
+
+    async def stream_explanation(self, task_text: str, user_solution_code: str) -> AsyncIterator[str]:
+        prompt = self._build_prompt(task_text, user_solution_code)
+        payload = {
+            'model': AI_MODEL,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt,
+                },
+            ],
+            'stream': True,
+        }
+        try:
+            async with http_client.post(self.url, headers=self.headers, json=payload) as response:
+                if response.status != 200:
+                    raise AIRequestError(f'Something went wrong, response code: {response.status}')
+                async for line in response.content:  # server-sent events: 'data: {...}' lines
+                    data = line.decode().strip().removeprefix('data:').strip()
+                    if not line.startswith(b'data:') or not data:
+                        continue
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices') or [{}]
+                    if text := choices[0].get('delta', {}).get('content'):
+                        yield text
+        except AIRequestError:
+            raise
+        except Exception as e:
+            raise AIRequestError(f'An exception occurred: {e}') from e
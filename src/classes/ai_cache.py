@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+import tokenize
+from collections import OrderedDict
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from src.classes.executor import executor_service
+from src.config import AI_CACHE_SIZE, AI_CACHE_TTL
+from src.exceptions import TaskTimeoutError
+
+load_dotenv(Path(__file__).parent.parent.parent / '.env')
+
+SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+TOKEN_MARKERS = {tokenize.INDENT: '<indent>', tokenize.DEDENT: '<dedent>', tokenize.NEWLINE: '\n'}
+
+
+def normalize_code(code: str) -> str:
+    """
+    Drop comments, blank lines and formatting of Python code, keeping the indentation structure.
+    Code which can not be tokenized is only stripped of whitespace.
+    """
+    try:
+        tokens = [
+            TOKEN_MARKERS.get(token.type, token.string)
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type not in SKIPPED_TOKENS
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return '\n'.join(' '.join(line.split()) for line in code.splitlines() if line.strip())
+    return ' '.join(tokens)
+
+
+def get_cache_key(task_text: str, code: str) -> str:
+    """Hash the task and the normalized code, so equal solutions with other comments or formatting share a key."""
+    normalized = json.dumps([' '.join(task_text.split()), normalize_code(code)], ensure_ascii=False)
+    return hashlib.sha256(normalized.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU cache of JSON serializable responses with expiration after `ttl` seconds.
+
+    If `path` is set, every stored response is appended to this JSON Lines file and the not expired ones
+    are loaded back on creation, the file is rewritten when it grows twice as large as the cache.
+    Inside the event loop the responses are written in batches in the executor thread pool, `flush` waits for them.
+    """
+
+    def __init__(self, max_size: int = AI_CACHE_SIZE, ttl: float = AI_CACHE_TTL, path: str | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # key -> (expires at, response)
+        self._lines = 0  # lines in the file, including the pending ones
+        self._pending: list[tuple[str, float, dict]] = []  # (key, expires at, response) not written yet
+        self._writer: asyncio.Task | None = None
+        if path:
+            self._load()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, size: {len(self)}, hits: {self.hits}, misses: {self.misses}>'
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, response: dict) -> None:
+        expires_at = time.time() + self.ttl
+        self._store(key, expires_at, response)
+        if self.path:
+            self._append(key, expires_at, response)
+
+    def _store(self, key: str, expires_at: float, response: dict) -> None:
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _append(self, key: str, expires_at: float, response: dict) -> None:
+        self._pending.append((key, expires_at, response))
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:  # no event loop, e.g. a script
+            self._write(*self._take_pending())
+            return
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+
+    async def flush(self) -> None:
+        """Wait until the stored responses are written to the file."""
+        if self._writer is not None:
+            await self._writer
+
+    async def _write_pending(self) -> None:
+        while self._pending:  # responses stored while a batch is written make the next batch
+            try:
+                await executor_service.run_in_thread(self._write, *self._take_pending())
+            except (OSError, TaskTimeoutError):
+                continue  # the file is a best-effort copy, the responses stay in memory
+
+    def _take_pending(self) -> tuple[list[tuple[str, float, dict]], list[tuple[str, float, dict]] | None]:
+        """Take the pending records and, when the file has to be rewritten, a snapshot of the entries."""
+        records, self._pending = self._pending, []
+        snapshot = None
+        if self._lines >= self.max_size * 2:
+            snapshot = [(key, expires_at, response) for key, (expires_at, response) in self._entries.items()]
+            self._lines = len(snapshot)
+        self._lines += len(records)
+        return records, snapshot
+
+    def _write(self, records: list[tuple[str, float, dict]], snapshot: list[tuple[str, float, dict]] | None) -> None:
+        if snapshot is not None:
+            self._rewrite(snapshot)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.writelines(self._dump(*record) for record in records)
+
+    @staticmethod
+    def _dump(key: str, expires_at: float, response: dict) -> str:
+        return json.dumps({'key': key, 'expires_at': expires_at, 'response': response}, ensure_ascii=False) + '\n'
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                self._lines += 1
+                try:
+                    record = json.loads(line)
+                    if record['expires_at'] > now:
+                        self._store(record['key'], record['expires_at'], record['response'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        self.evictions = 0
+
+    def _rewrite(self, snapshot: list[tuple[str, float, dict]]) -> None:
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.writelines(self._dump(*record) for record in snapshot)
+        os.replace(temporary_path, self.path)
+
+    def get_metrics(self) -> dict[str, int | float]:
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+        }
+
+
+ai_cache = ResponseCache(path=os.getenv('AI_CACHE_PATH'))
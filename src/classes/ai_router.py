@@ -0,0 +1,247 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from src.classes.ai import TOKEN, AIClient, AlternateAIClient
+from src.classes.ai_cache import get_cache_key
+from src.classes.external_api import ExternalAPIClient
+from src.classes.single_flight import SingleFlight
+from src.config import (
+    AI_BREAKER_COOLDOWN,
+    AI_BREAKER_FAILURES,
+    AI_HEDGE_DELAY,
+    AI_HEDGE_MIN_SAMPLES,
+    AI_LATENCY_WINDOW,
+)
+from src.exceptions import AIRequestError
+
+UNAVAILABLE = {'status': False, 'content': 'The AI is unavailable now, try again later.'}
+
+
+class Backend:
+    """
+    An AI backend with its recent latencies and errors and a circuit breaker.
+
+    After `AI_BREAKER_FAILURES` failures in a row the breaker opens and the backend is skipped,
+    after `AI_BREAKER_COOLDOWN` seconds one trial request is let through, its success closes the breaker.
+    """
+
+    __slots__ = ('name', 'request', 'stream', 'latencies', 'outcomes', 'failures', 'opened_at', 'probing')
+
+    def __init__(
+        self,
+        name: str,
+        request: Callable[[dict], Awaitable[dict]],
+        stream: Callable[[dict], AsyncIterator[str]] | None = None,
+    ):
+        self.name = name
+        self.request = request  # takes {'content', 'code'}, returns {'status', 'content'}
+        self.stream = stream  # takes {'content', 'code'}, yields the parts of the answer, raises AIRequestError
+        self.latencies: deque[float] = deque(maxlen=AI_LATENCY_WINDOW)  # seconds of the successful requests
+        self.outcomes: deque[bool] = deque(maxlen=AI_LATENCY_WINDOW)
+        self.failures = 0  # failures in a row
+        self.opened_at: float | None = None  # when the breaker opened, None while it is closed
+        self.probing = False  # a trial request of the open breaker is running
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}, state: {self.state}>'
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= AI_BREAKER_COOLDOWN else 'open'
+
+    def is_available(self) -> bool:
+        """Check the backend could take a request, without taking the trial request of an open breaker."""
+        state = self.state
+        return state == 'closed' or (state == 'half_open' and not self.probing)
+
+    def allows(self) -> bool:
+        """
+        Check the backend takes a request, an open breaker lets one trial request through after the cooldown.
+        Call it only for the request actually sent, it takes the trial.
+        """
+        if not self.is_available():
+            return False
+        if self.state == 'half_open':
+            self.probing = True
+        return True
+
+    def record(self, latency: float, success: bool) -> None:
+        self.outcomes.append(success)
+        self.probing = False
+        if success:
+            self.latencies.append(latency)
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= AI_BREAKER_FAILURES or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def get_percentile(self, percentile: float) -> float | None:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+    def get_hedge_delay(self) -> float:
+        """Get the seconds to wait before a hedged request: p95 of the latency once enough requests are seen."""
+        if len(self.latencies) < AI_HEDGE_MIN_SAMPLES:
+            return AI_HEDGE_DELAY
+        return self.get_percentile(0.95)
+
+    def get_metrics(self) -> dict:
+        p50, p95 = self.get_percentile(0.5), self.get_percentile(0.95)
+        return {
+            'state': self.state,
+            'requests': len(self.outcomes),
+            'error_rate': round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else 0.0,
+            'p50': round(p50, 3) if p50 is not None else None,
+            'p95': round(p95, 3) if p95 is not None else None,
+        }
+
+
+class AIRouter:
+    """
+    Sends solution/ai requests to the AI backends in order of preference.
+
+    A request taking longer than the p95 latency of its backend is hedged: the next backend gets
+    the same request and the first successful answer wins, the others are cancelled. A failed answer
+    fails over to the next backend at once. Backends with an open circuit breaker are skipped.
+    """
+
+    def __init__(self, backends: list[Backend]):
+        self.backends = backends
+        self.flights = SingleFlight()  # concurrent requests with the same task and code share one routing
+        self.hedged = 0
+        self.failovers = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, backends: {[backend.name for backend in self.backends]}>'
+
+    async def get_solution(self, data: dict, key: str | None = None) -> dict:
+        """
+        Get the AI answer for the task 'content' and the 'code'.
+        Args:
+            data (dict): The task 'content' and the 'code'.
+            key (str | None): The cache key of the request, calculated from the data if None.
+        Returns:
+            dict: {'status', 'content'} of the first successful backend or the last failed one.
+        """
+        if key is None:
+            key = get_cache_key(str(data.get('content', '')), str(data.get('code', '')))
+        return await self.flights.do(key, lambda: self._route(data))
+
+    @staticmethod
+    def _take_next(remaining: list[Backend]) -> Backend | None:
+        """Take the next backend which allows a request, the skipped ones are not tried in this request."""
+        while remaining:
+            backend = remaining.pop(0)
+            if backend.allows():
+                return backend
+        return None
+
+    async def _route(self, data: dict) -> dict:
+        remaining = list(self.backends)
+        backend = self._take_next(remaining)
+        if backend is None:
+            return UNAVAILABLE
+        pending = {asyncio.ensure_future(self._call(backend, data))}
+        hedge_delay = backend.get_hedge_delay()
+        answer = UNAVAILABLE
+        try:
+            while pending:
+                can_hedge = any(candidate.is_available() for candidate in remaining)
+                done, pending = await asyncio.wait(
+                    pending, timeout=hedge_delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    answer = task.result()
+                    if answer['status']:
+                        return answer
+                backend = self._take_next(remaining)
+                if backend is None:
+                    continue
+                if done:
+                    self.failovers += 1
+                else:
+                    self.hedged += 1
+                pending.add(asyncio.ensure_future(self._call(backend, data)))
+                hedge_delay = backend.get_hedge_delay()
+            return answer
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_solution(self, data: dict) -> AsyncIterator[str]:
+        """
+        Yield the AI answer for the task 'content' and the 'code' in parts as the backend generates it.
+        A backend failing before its first part fails over to the next one, a later failure is raised
+        as the sent parts can not be taken back. Streams are not hedged.
+        Raises:
+            AIRequestError: If no backend answered.
+        """
+        remaining = [backend for backend in self.backends if backend.stream is not None]
+        error: AIRequestError | None = None
+        while (backend := self._take_next(remaining)) is not None:
+            if error is not None:
+                self.failovers += 1
+            started_at = time.monotonic()
+            started = False
+            try:
+                async for text in backend.stream(data):
+                    started = True
+                    yield text
+            except (asyncio.CancelledError, GeneratorExit):
+                backend.probing = False
+                raise
+            except Exception as e:
+                backend.record(time.monotonic() - started_at, False)
+                error = e if isinstance(e, AIRequestError) else AIRequestError(f'An exception occurred: {e}')
+                if started:
+                    raise error from e
+                continue
+            backend.record(time.monotonic() - started_at, True)
+            return
+        raise error or AIRequestError(UNAVAILABLE['content'])
+
+    @staticmethod
+    async def _call(backend: Backend, data: dict) -> dict:
+        started_at = time.monotonic()
+        try:
+            answer = await backend.request(data)
+        except asyncio.CancelledError:
+            backend.probing = False
+            raise
+        except Exception as e:
+            answer = {'status': False, 'content': f'An exception occurred: {e}'}
+        backend.record(time.monotonic() - started_at, bool(answer.get('status')))
+        return answer
+
+    def get_metrics(self) -> dict:
+        return {
+            'hedged': self.hedged,
+            'failovers': self.failovers,
+            'backends': {backend.name: backend.get_metrics() for backend in self.backends},
+        }
+
+
+def create_router() -> AIRouter:
+    """Create the router of the external API, with the OpenAI clients as the fallbacks if OPENAI_API_KEY is set."""
+    backends = [Backend('external', ExternalAPIClient.get_solution, ExternalAPIClient.stream_solution)]
+    if TOKEN:
+        for name, client in (('openai', AIClient()), ('openai_http', AlternateAIClient())):
+            backends.append(
+                Backend(
+                    name,
+                    lambda data, client=client: client.get_explanation(data['content'], data['code']),
+                    lambda data, client=client: client.stream_explanation(data['content'], data['code']),
+                )
+            )
+    return AIRouter(backends)
+
+
+ai_router = create_router()
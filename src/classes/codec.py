@@ -0,0 +1,71 @@
+import json
+import zlib
+
+from src.config import SHARING_COMPRESSION_LEVEL, SHARING_COMPRESSION_THRESHOLD, SHARING_TRANSFER_MAX_SIZE
+
+ZLIB_ENCODING = 'zlib'
+
+
+def estimate_size(files: list) -> int:
+    """
+    Estimate the size of the JSON encoded files by the length of their strings without encoding them.
+    The estimate is never larger than the encoded size: escapes and multibyte characters only add to it.
+    """
+    size = 0
+    for file in files:
+        if not isinstance(file, dict):
+            continue
+        for value in file.values():
+            if isinstance(value, str):
+                size += len(value)
+            elif isinstance(value, list):  # changes
+                size += sum(len(change.get('text') or '') for change in value if isinstance(change, dict))
+    return size
+
+
+def pack_files(data: dict, features: set[str]) -> dict:
+    """
+    Replace 'files' of a sharing payload with zlib compressed JSON for clients with the 'zlib' feature.
+    Socket.IO sends the bytes as a binary attachment, so the code is neither escaped nor base64 encoded.
+    Args:
+        data (dict): The payload with 'files'.
+        features (set[str]): The features of the receiving client.
+    Returns:
+        dict: The payload with 'encoding' and 'payload' instead of 'files',
+        or the payload as is for other clients and files estimated smaller than SHARING_COMPRESSION_THRESHOLD bytes.
+        The files are JSON encoded only to be compressed, Socket.IO encodes the payload left as is.
+    """
+    if ZLIB_ENCODING not in features or 'files' not in data:
+        return data
+    if estimate_size(data['files']) < SHARING_COMPRESSION_THRESHOLD:
+        return data
+    encoded = json.dumps(data['files'], ensure_ascii=False).encode()
+    packed = {key: value for key, value in data.items() if key != 'files'}
+    packed.update({'encoding': ZLIB_ENCODING, 'payload': zlib.compress(encoded, SHARING_COMPRESSION_LEVEL)})
+    return packed
+
+
+def unpack_files(data: dict) -> list | None:
+    """
+    Take the files out of a sharing payload, 'encoding' and 'payload' keys are removed from it.
+    Args:
+        data (dict): The payload with 'files' or with the zlib compressed JSON 'payload'.
+    Returns:
+        list | None: The files, None if the payload has none.
+    Raises:
+        ValueError: If the encoding is unknown, the payload is broken or larger than SHARING_TRANSFER_MAX_SIZE.
+    """
+    encoding, payload = data.pop('encoding', None), data.pop('payload', None)
+    if encoding is None:
+        return data.get('files')
+    if encoding != ZLIB_ENCODING or not isinstance(payload, bytes):
+        raise ValueError(f'Unsupported encoding {encoding}')
+
+    decompressor = zlib.decompressobj()
+    try:
+        encoded = decompressor.decompress(payload, SHARING_TRANSFER_MAX_SIZE)
+    except zlib.error as e:
+        raise ValueError(str(e)) from None
+    if decompressor.unconsumed_tail:
+        raise ValueError('Payload is too large')
+    return json.loads(encoded)
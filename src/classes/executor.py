@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TypeVar
+
+from src.config import EXECUTOR_PROCESSES, EXECUTOR_THREADS, EXECUTOR_TIMEOUT
+from src.exceptions import TaskTimeoutError
+
+T = TypeVar('T')
+
+
+class PoolStats:
+    """Counters of the tasks of one pool"""
+
+    __slots__ = ('submitted', 'pending', 'completed', 'failed', 'timed_out', 'cancelled')
+
+    def __init__(self):
+        self.submitted = 0
+        self.pending = 0  # submitted and not finished, waiting for a worker or running
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def get_metrics(self) -> dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExecutorService:
+    """
+    Runs the work which would block the event loop: CPU-bound functions in a process pool,
+    blocking calls and work on the server state in a thread pool. The pools start on the first task.
+
+    A task not finished within its timeout raises TaskTimeoutError, a task cancelled or timed out before
+    a worker took it is not run. A process task already running can not be stopped, its result is dropped.
+    Functions and arguments of process tasks must be picklable, the workers are spawned and import
+    the module of the function anew.
+    """
+
+    def __init__(
+        self, processes: int = EXECUTOR_PROCESSES, threads: int = EXECUTOR_THREADS, timeout: float = EXECUTOR_TIMEOUT
+    ):
+        self.processes = processes
+        self.threads = threads
+        self.timeout = timeout
+        self.stats = {'process': PoolStats(), 'thread': PoolStats()}
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._thread_pool: ThreadPoolExecutor | None = None
+
+    def __repr__(self):
+        pending = {name: stats.pending for name, stats in self.stats.items()}
+        return f'<{self.__class__.__name__}, pending: {pending}>'
+
+    @property
+    def is_running(self) -> bool:
+        return self._process_pool is not None or self._thread_pool is not None
+
+    async def run_in_process(self, func: Callable[..., T], *args, timeout: float | None = None) -> T:
+        """
+        Run a CPU-bound function in the process pool.
+        Args:
+            func (Callable): A module level function.
+            *args: Its picklable arguments.
+            timeout (float | None): Seconds to wait for the result, the default timeout if None.
+        Raises:
+            TaskTimeoutError: If the result is not ready in time.
+        """
+        if self._process_pool is None:
+            context = multiprocessing.get_context('spawn')  # a fork would copy the event loop and its threads
+            self._process_pool = ProcessPoolExecutor(self.processes, mp_context=context)
+        try:
+            return await self._run('process', self._process_pool, func, args, timeout)
+        except BrokenProcessPool:
+            self._process_pool = None  # a worker died, the next task starts a new pool
+            raise
+
+    async def run_in_thread(self, func: Callable[..., T], *args, timeout: float | None = None) -> T:
+        """
+        Run a blocking function in the thread pool.
+        Args:
+            func (Callable): The function.
+            *args: Its arguments.
+            timeout (float | None): Seconds to wait for the result, the default timeout if None.
+        Raises:
+            TaskTimeoutError: If the result is not ready in time.
+        """
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix='executor')
+        return await self._run('thread', self._thread_pool, func, args, timeout)
+
+    async def _run(
+        self, pool: str, executor: Executor, func: Callable[..., T], args: tuple, timeout: float | None
+    ) -> T:
+        stats = self.stats[pool]
+        stats.submitted += 1
+        stats.pending += 1
+        future = asyncio.wrap_future(executor.submit(func, *args))  # cancelling it cancels the task not yet started
+        try:
+            result = await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            stats.timed_out += 1
+            raise TaskTimeoutError(f'{getattr(func, "__name__", func)} did not finish in time') from None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.pending -= 1
+        stats.completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        """Stop the pools, the waiting tasks are cancelled."""
+        for executor in (self._process_pool, self._thread_pool):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._process_pool = self._thread_pool = None
+
+    def get_metrics(self) -> dict[str, dict[str, int]]:
+        return {
+            'process': {'workers': self.processes, **self.stats['process'].get_metrics()},
+            'thread': {'workers': self.threads, **self.stats['thread'].get_metrics()},
+        }
+
+
+executor_service = ExecutorService()
@@ -1,9 +1,13 @@
+import codecs
 import os
+from collections.abc import AsyncIterator
 from pathlib import Path
 
-import aiohttp
 from dotenv import load_dotenv
 
+from src.classes.http_client import http_client
+from src.exceptions import AIRequestError
+
 load_dotenv(Path(__file__).parent.parent.parent / '.env')
 
 url = os.getenv("API_URL")
@@ -14,8 +18,38 @@ class ExternalAPIClient:
     @staticmethod
     async def get_solution(data: dict):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data) as response:
-                    return await response.json()
+            async with http_client.post(url, json=data) as response:
+                return await response.json()
         except Exception as e:
             return {"status": False, "content": f"An exception occurred: {e}"}
+
+    @staticmethod
+    async def stream_solution(data: dict) -> AsyncIterator[str]:
+        """
+        Request the solution with 'stream' and yield the text as soon as it arrives.
+        An API answering with JSON instead of a chunked text yields the whole content at once.
+        Raises:
+            AIRequestError: If the request fails or the API answers with an error.
+        """
+        try:
+            async with http_client.post(url, json={**data, 'stream': True}) as response:
+                if response.content_type == 'application/json':
+                    answer = await response.json()
+                    if not answer.get('status'):
+                        raise AIRequestError(
+                            answer.get('content') or f'Something went wrong, response code: {response.status}'
+                        )
+                    yield answer['content']
+                    return
+                if response.status != 200:
+                    raise AIRequestError(f'Something went wrong, response code: {response.status}')
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                async for chunk in response.content.iter_any():
+                    if text := decoder.decode(chunk):
+                        yield text
+                if text := decoder.decode(b'', final=True):
+                    yield text
+        except AIRequestError:
+            raise
+        except Exception as e:
+            raise AIRequestError(f"An exception occurred: {e}") from e
@@ -0,0 +1,69 @@
+import aiohttp
+
+from src.config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_TIMEOUT,
+)
+
+
+class HTTPClient:
+    """
+    One aiohttp session shared by all outbound requests, so connections are kept alive and reused
+    instead of a new TCP/TLS handshake per call. The connector limits connections in total and per host
+    and caches DNS lookups.
+
+    The session is opened by start() on the application startup and closed by close() on shutdown,
+    a request made before the startup (e.g. from a script) opens it lazily.
+    """
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        timeout: float = HTTP_TIMEOUT,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session: aiohttp.ClientSession | None = None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, open: {self.is_open}>'
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def start(self) -> None:
+        self.get_session()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if not self.is_open:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    def get(self, url: str, **kwargs):
+        return self.get_session().get(url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """Send a POST request, use as `async with http_client.post(...) as response`. Accepts a custom `timeout`."""
+        return self.get_session().post(url, **kwargs)
+
+    async def close(self) -> None:
+        if self.is_open:
+            await self._session.close()
+        self._session = None
+
+
+http_client = HTTPClient()
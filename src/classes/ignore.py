@@ -0,0 +1,64 @@
+import re
+
+
+def translate_glob(glob: str) -> str:
+    """Translate a glob of one path segment to a regex: '*' and '?' do not match '/', '[...]' is a character class."""
+    result = []
+    index = 0
+    while index < len(glob):
+        char = glob[index]
+        end = glob.find(']', index + 2) if char == '[' else -1
+        if char == '*':
+            result.append('[^/]*')
+        elif char == '?':
+            result.append('[^/]')
+        elif end != -1:
+            characters = glob[index + 1 : end].replace('\\', '\\\\')
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            result.append(f'[{characters}]')
+            index = end
+        else:
+            result.append(re.escape(char))
+        index += 1
+    return ''.join(result)
+
+
+class IgnoreMatcher:
+    """
+    Files to ignore parsed by parse_files_to_ignore, compiled into one regex over the whole path.
+
+    `names` match any segment of the path, `dirs` match any directory segment, `extensions` match the file name.
+    All of them may contain globs.
+    """
+
+    __slots__ = ('pattern',)
+
+    def __init__(self, settings: dict[str : list[str]] | None = None):
+        settings = settings or {}
+        names = '|'.join(translate_glob(name) for name in settings.get('names', []) if name)
+        dirs = '|'.join(translate_glob(directory) for directory in settings.get('dirs', []) if directory)
+        extensions = '|'.join(translate_glob(extension) for extension in settings.get('extensions', []) if extension)
+
+        alternatives = []
+        if names:
+            alternatives.append(f'(?:^|/)(?:{names})(?:/|$)')
+        if dirs:
+            alternatives.append(f'(?:^|/)(?:{dirs})/')
+        if extensions:
+            alternatives.append(f'\\.(?:{extensions})$')
+        self.pattern: re.Pattern | None = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, pattern: {self.pattern.pattern if self.pattern else None}>'
+
+    def match(self, path: str) -> bool:
+        if self.pattern is None or not isinstance(path, str):
+            return False
+        return self.pattern.search(path.replace('\\', '/')) is not None
+
+    def filter(self, files: list) -> list:
+        """Drop the ignored files, entries without a valid 'filename' are kept as is."""
+        if self.pattern is None:
+            return files
+        return [file for file in files if not (isinstance(file, dict) and self.match(file.get('filename')))]
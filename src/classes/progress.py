@@ -0,0 +1,158 @@
+import time
+from array import array
+from statistics import median
+from typing import Iterator
+
+from src.config import PROGRESS_LOG_LIMIT, PROGRESS_NAMES_LIMIT
+
+COMPLETED_STATUSES = ('DONE', 'ACCEPTED')
+
+
+class ProgressLog:
+    """
+    Append-only log of step status transitions in a room.
+
+    Events are stored column-wise in typed arrays (user id, step code, status code, monotonic timestamp),
+    step names and statuses are interned into small integer codes. When the log reaches `max_events`,
+    the oldest half of it is dropped with the names no longer used, so the memory per room stays bounded.
+    Events with a new name are not recorded while `max_names` names are interned.
+    """
+
+    __slots__ = (
+        'max_events',
+        'max_names',
+        'version',
+        '_users',
+        '_steps',
+        '_statuses',
+        '_timestamps',
+        '_codes',
+        '_names',
+    )
+
+    def __init__(self, max_events: int = PROGRESS_LOG_LIMIT, max_names: int = PROGRESS_NAMES_LIMIT):
+        self.max_events = max_events
+        self.max_names = min(max_names, 2**16)  # the codes are unsigned shorts
+        self.version = 0  # total number of events ever appended
+        self._users = array('I')
+        self._steps = array('H')
+        self._statuses = array('H')
+        self._timestamps = array('d')
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, events: {len(self)}, version: {self.version}>'
+
+    def __len__(self):
+        return len(self._users)
+
+    def _code(self, name: str) -> int | None:
+        """Get the code of the name, intern a new name, None if the table is full."""
+        code = self._codes.get(name)
+        if code is None and len(self._names) < self.max_names:
+            code = self._codes[name] = len(self._names)
+            self._names.append(name)
+        return code
+
+    def append(self, user_id: int, step: str, status: str, timestamp: float | None = None) -> None:
+        """
+        Append a status transition to the log, it is dropped if the step or the status would exceed `max_names`.
+        Args:
+            user_id (int): The id of the user.
+            step (str): The step name.
+            status (str): The new status of the step.
+            timestamp (float | None): Monotonic timestamp, time.monotonic() by default.
+        """
+        if len(self._users) >= self.max_events:
+            self._compact()
+        step_code, status_code = self._code(str(step)), self._code(str(status))
+        if step_code is None or status_code is None:
+            return
+        self._users.append(user_id)
+        self._steps.append(step_code)
+        self._statuses.append(status_code)
+        self._timestamps.append(time.monotonic() if timestamp is None else timestamp)
+        self.version += 1
+
+    def record_changes(self, user_id: int, old_steps: dict, new_steps: dict) -> None:
+        """Append an event for every step whose status differs between old_steps and new_steps."""
+        timestamp = time.monotonic()
+        for step, status in new_steps.items():
+            if old_steps.get(step) != status:
+                self.append(user_id, step, status, timestamp)
+
+    def _compact(self) -> None:
+        drop = max(1, self.max_events // 2)
+        for column in (self._users, self._steps, self._statuses, self._timestamps):
+            del column[:drop]
+        # Intern again only the names of the kept events
+        used = dict.fromkeys([*self._steps, *self._statuses])
+        codes = {old: new for new, old in enumerate(used)}
+        self._steps = array('H', (codes[code] for code in self._steps))
+        self._statuses = array('H', (codes[code] for code in self._statuses))
+        self._names = [self._names[code] for code in used]
+        self._codes = {name: code for code, name in enumerate(self._names)}
+
+    def _rows(self) -> Iterator[tuple[int, int, int, float]]:
+        return zip(self._users, self._steps, self._statuses, self._timestamps, strict=True)
+
+    def events(self) -> Iterator[tuple[int, str, str, float]]:
+        """Yield (user_id, step, status, timestamp) tuples in order of appending."""
+        names = self._names
+        for user_id, step, status, timestamp in self._rows():
+            yield user_id, names[step], names[status], timestamp
+
+    def time_to_completion(self, step: str) -> dict[int, float]:
+        """
+        Calculate how long the step took every user who completed it.
+        The time is measured from the first recorded status of the step to the first completed status.
+        Args:
+            step (str): The step name.
+        Returns:
+            dict[int, float]: Seconds spent on the step by user id.
+        """
+        step_code = self._codes.get(str(step))
+        if step_code is None:
+            return {}
+        completed = {self._codes[status] for status in COMPLETED_STATUSES if status in self._codes}
+
+        started: dict[int, float] = {}
+        result: dict[int, float] = {}
+        for user_id, code, status, timestamp in self._rows():
+            if code != step_code or user_id in result:
+                continue
+            start = started.setdefault(user_id, timestamp)
+            if status in completed:
+                result[user_id] = timestamp - start
+        return result
+
+    def throughput(self, window: float = 60.0) -> float:
+        """
+        Count completed steps per minute over the last `window` seconds.
+        Args:
+            window (float): The period of time in seconds.
+        Returns:
+            float: Number of completions per minute.
+        """
+        completed = {self._codes[status] for status in COMPLETED_STATUSES if status in self._codes}
+        since = time.monotonic() - window
+        count = 0
+        for index in range(len(self._timestamps) - 1, -1, -1):
+            if self._timestamps[index] < since:
+                break
+            if self._statuses[index] in completed:
+                count += 1
+        return count * 60 / window
+
+    def summary(self, window: float = 60.0) -> dict[str, ...]:
+        """Build completion statistics for every step in the log."""
+        steps = {}
+        for name in dict.fromkeys(self._names[code] for code in self._steps):
+            durations = list(self.time_to_completion(name).values())
+            steps[name] = {
+                'completed': len(durations),
+                'average_time': round(sum(durations) / len(durations), 2) if durations else None,
+                'median_time': round(median(durations), 2) if durations else None,
+            }
+        return {'steps': steps, 'throughput': self.throughput(window), 'events': len(self)}
@@ -0,0 +1,168 @@
+import io
+import re
+import tokenize
+
+from src.classes.executor import executor_service
+from src.config import AI_PROMPT_LINE_LIMIT, AI_PROMPT_LITERAL_LIMIT, AI_PROMPT_TOKEN_BUDGET, EXECUTOR_OFFLOAD_SIZE
+
+BYTES_PER_TOKEN = 4  # UTF-8 bytes per token of the usual BPE tokenizers, Cyrillic letters take two bytes
+MAX_REPEATED_BLOCK = 8  # max lines of a block collapsed when it is repeated
+MARKER_TOKENS = 10  # tokens reserved for the line marking the skipped lines
+STRING_QUOTE = re.compile(r'[a-zA-Z]*("""|\'\'\'|"|\')')
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text.encode('utf-8', 'surrogatepass')) // BYTES_PER_TOKEN)
+
+
+def shorten_literals(code: str, limit: int = AI_PROMPT_LITERAL_LIMIT) -> str:
+    """Cut string literals longer than `limit` characters, e.g. embedded data. Not tokenized code is kept."""
+    try:
+        literals = [
+            token
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type == tokenize.STRING and len(token.string) > limit
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return code
+    if not literals:
+        return code
+
+    offsets = [0]
+    for line in code.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    parts, position = [], 0
+    for token in literals:
+        start = offsets[token.start[0] - 1] + token.start[1]
+        parts.append(code[position:start])
+        match = STRING_QUOTE.match(token.string)
+        prefix, quote = match.group(), match.group(1)
+        body = token.string[len(prefix) : limit].rstrip('\\')
+        parts.append(f'{prefix}{body}...{quote}')
+        position = offsets[token.end[0] - 1] + token.end[1]
+    parts.append(code[position:])
+    return ''.join(parts)
+
+
+def truncate_text(text: str, budget: int) -> str:
+    """Keep the beginning of the text which fits into `budget` tokens."""
+    if estimate_tokens(text) <= budget:
+        return text
+    return text.encode('utf-8', 'surrogatepass')[: budget * BYTES_PER_TOKEN].decode('utf-8', 'ignore') + ' ...'
+
+
+def shorten_lines(lines: list[str], limit: int = AI_PROMPT_LINE_LIMIT) -> list[str]:
+    """Cut lines longer than `limit` characters, e.g. long list literals."""
+    return [line if len(line) <= limit else f'{line[:limit]} ...' for line in lines]
+
+
+def collapse_repeats(lines: list[str]) -> list[str]:
+    """Keep one copy of a block of up to MAX_REPEATED_BLOCK lines repeated several times in a row."""
+    result = []
+    index = 0
+    while index < len(lines):
+        best_size, best_repeats = 1, 0
+        for size in range(1, MAX_REPEATED_BLOCK + 1):
+            block = lines[index : index + size]
+            if len(block) < size or not any(line.strip() for line in block):
+                break
+            repeats = 0
+            while lines[index + size * (repeats + 1) : index + size * (repeats + 2)] == block:
+                repeats += 1
+            if repeats * size > best_repeats * best_size:
+                best_size, best_repeats = size, repeats
+        block = lines[index : index + best_size]
+        result.extend(block)
+        if best_repeats * best_size >= 2:  # a marker line saves something only for two or more lines
+            indent = block[0][: len(block[0]) - len(block[0].lstrip())]
+            lines_text = 'line' if best_size == 1 else f'{best_size} lines'
+            result.append(f'{indent}# ... the {lines_text} above repeated {best_repeats} more times')
+            index += best_size * (best_repeats + 1)
+        else:
+            index += best_size
+    return result
+
+
+def truncate_lines(lines: list[str], budget: int) -> list[str]:
+    """Keep the first and the last lines which fit into `budget` tokens, two thirds of it for the first ones."""
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    if sum(costs) <= budget:
+        return lines
+    budget -= MARKER_TOKENS
+    head_end, used = 0, 0
+    while head_end < len(lines) and used + costs[head_end] <= budget * 2 // 3:
+        used += costs[head_end]
+        head_end += 1
+    tail_start = len(lines)
+    while tail_start > head_end and used + costs[tail_start - 1] <= budget:
+        tail_start -= 1
+        used += costs[tail_start]
+    marker = f'# ... {tail_start - head_end} lines skipped ...'
+    return [*lines[:head_end], marker, *lines[tail_start:]]
+
+
+def fit_prompt(task_text: str, code: str, budget: int) -> tuple[str, str, int]:
+    """
+    Shorten the task text and the code to `budget` tokens, see PromptBudget.
+    Returns:
+        tuple[str, str, int]: The task text, the code and the estimated tokens saved.
+    """
+    before = estimate_tokens(task_text) + estimate_tokens(code)
+    task_text = truncate_text(task_text, budget // 2)
+    lines = collapse_repeats(shorten_lines(shorten_literals(code).splitlines()))
+    trimmed_code = '\n'.join(truncate_lines(lines, budget - estimate_tokens(task_text)))
+    if trimmed_code == '\n'.join(code.splitlines()):
+        trimmed_code = code  # unchanged, keep the original line endings
+
+    saved = before - estimate_tokens(task_text) - estimate_tokens(trimmed_code)
+    return task_text, trimmed_code, max(saved, 0)
+
+
+class PromptBudget:
+    """
+    Fits the task text and the code of solution/ai into `budget` tokens, so a huge solution does not slow
+    down the AI answer or exceed the context of the model.
+
+    Long string literals and lines and repeated blocks are always shortened, the code over the budget
+    loses its middle lines and the task text over half of the budget its end. The tokens are estimated
+    by the UTF-8 size, no tokenizer of the model is needed. The code of EXECUTOR_OFFLOAD_SIZE characters or more
+    is shortened in the process pool by fit_async, tokenizing it would block the event loop for seconds.
+    """
+
+    def __init__(self, budget: int = AI_PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.trimmed = 0  # prompts made shorter
+        self.tokens_saved = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, trimmed: {self.trimmed}, tokens saved: {self.tokens_saved}>'
+
+    def fit(self, task_text: str, code: str) -> tuple[str, str, int]:
+        """
+        Shorten the task text and the code to the budget.
+        Returns:
+            tuple[str, str, int]: The task text, the code and the estimated tokens saved.
+        """
+        return self._count(*fit_prompt(task_text, code, self.budget))
+
+    async def fit_async(self, task_text: str, code: str) -> tuple[str, str, int]:
+        """
+        Shorten the task text and the code to the budget like fit, large code in the process pool.
+        Raises:
+            TaskTimeoutError: If the process pool did not finish in time.
+        """
+        if len(code) >= EXECUTOR_OFFLOAD_SIZE:
+            return self._count(*await executor_service.run_in_process(fit_prompt, task_text, code, self.budget))
+        return self.fit(task_text, code)
+
+    def _count(self, task_text: str, code: str, saved: int) -> tuple[str, str, int]:
+        if saved:
+            self.trimmed += 1
+            self.tokens_saved += saved
+        return task_text, code, saved
+
+    def get_metrics(self) -> dict[str, int]:
+        return {'trimmed': self.trimmed, 'tokens_saved': self.tokens_saved}
+
+
+prompt_budget = PromptBudget()
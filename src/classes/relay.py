@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+from socketio import AsyncServer
+
+from src.classes.codec import pack_files
+from src.classes.sharing import SharedDocument, make_change
+from src.config import SHARING_MAX_HOST_QUEUE, SHARING_UPDATE_INTERVAL
+
+
+class PendingUpdate:
+    """The latest not yet relayed state of the files changed by a student"""
+
+    __slots__ = ('document', 'data', 'bases', 'files', 'features', 'sent_at', 'handle')
+
+    def __init__(self, document: SharedDocument):
+        self.document = document
+        self.data: dict | None = None  # the latest sharing/code_update without files, None if nothing is pending
+        self.bases: dict[str, str | None] = {}  # file content before the first pending update
+        self.files: dict[str, dict] = {}  # the latest update of every changed file
+        self.features: set[str] = set()  # features of the host
+        self.sent_at: float = 0.0
+        self.handle: asyncio.TimerHandle | None = None
+
+    def add(self, previous: dict[str, str | None], updates: list[dict], data: dict, features: set[str]) -> None:
+        for filename, content in previous.items():
+            self.bases.setdefault(filename, content)
+        for update in updates:
+            self.files[update['filename']] = update
+        self.data = {key: value for key, value in data.items() if key != 'files'}
+        self.features = features
+
+    def build(self) -> dict:
+        """Build one sharing/code_update from the bases and the current content of the document."""
+        diff = 'diff' in self.features
+        files = []
+        for filename, update in self.files.items():
+            base, content = self.bases.get(filename), self.document.files.get(filename)
+            fields = {key: value for key, value in update.items() if key not in ('content', 'changes')}
+            if content is None:
+                files.append({**fields, 'status': 'DELETED'})
+            elif diff and base is not None:
+                files.append({**fields, 'changes': [make_change(base, content)]})
+            else:
+                files.append({**fields, 'content': content})
+        data = {**self.data, 'files': files}
+        if diff:
+            data['version'] = self.document.version
+        self.data = None
+        self.bases = {}
+        self.files = {}
+        return data
+
+
+class CodeRelay:
+    """
+    Relays sharing/code_update to the host with latest-value throttling.
+
+    The first update of a student goes out at once, the following updates within `interval` are merged
+    into one pending update per (student, host), so intermediate states are dropped instead of queued.
+    While the outgoing queue of the host holds more than `max_queue` packets, the pending update waits.
+    """
+
+    def __init__(self, interval: float = SHARING_UPDATE_INTERVAL, max_queue: int = SHARING_MAX_HOST_QUEUE):
+        self.sio: AsyncServer | None = None
+        self.interval = interval
+        self.max_queue = max_queue
+        self.slots: dict[tuple[int, str], PendingUpdate] = {}
+        self.tasks: set[asyncio.Task] = set()  # running delayed flushes, the loop keeps weak references only
+        self.relayed = 0
+        self.dropped = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, relayed: {self.relayed}, dropped: {self.dropped}>'
+
+    def host_queue_depth(self, host_sid: str) -> int:
+        """
+        Get the number of packets waiting to be sent to the host. Best effort: the outgoing queue is read
+        from the engineio socket, which is not a public API, so 0 is returned if it is not available.
+        """
+        try:
+            eio_sid = self.sio.manager.eio_sid_from_sid(host_sid, '/')
+            socket = self.sio.eio.sockets.get(eio_sid) if eio_sid else None
+            return socket.queue.qsize() if socket else 0
+        except AttributeError:
+            return 0
+
+    async def push(
+        self,
+        user_id: int,
+        host_sid: str,
+        document: SharedDocument,
+        previous: dict[str, str | None],
+        updates: list[dict],
+        data: dict,
+        features: set[str],
+    ) -> None:
+        """
+        Add an applied update to the pending update of the student and relay it when the interval allows.
+        Args:
+            user_id (int): The id of the student.
+            host_sid (str): The session ID of the host.
+            document (SharedDocument): The document of the student.
+            previous (dict[str, str | None]): Content of the updated files before the update.
+            updates (list[dict]): The updates returned by the document.
+            data (dict): The sharing/code_update data.
+            features (set[str]): The features of the host.
+        """
+        key = (user_id, host_sid)
+        slot = self.slots.get(key)
+        if slot is None or slot.document is not document:
+            self.discard(user_id)
+            slot = self.slots[key] = PendingUpdate(document)
+        elif slot.data is not None:
+            self.dropped += 1  # superseded by this update
+        slot.add(previous, updates, data, features)
+
+        if slot.handle is not None:
+            return
+        delay = slot.sent_at + self.interval - time.monotonic()
+        if delay <= 0:
+            await self.flush(key)
+        else:
+            self._schedule(key, delay)
+
+    def _schedule(self, key: tuple[int, str], delay: float) -> None:
+        slot = self.slots[key]
+        slot.handle = asyncio.get_running_loop().call_later(delay, self._start_flush, key)
+
+    def _start_flush(self, key: tuple[int, str]) -> None:
+        task = asyncio.create_task(self.flush(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self, key: tuple[int, str]) -> None:
+        slot = self.slots.get(key)
+        if slot is None or slot.data is None:
+            return
+        slot.handle = None
+        if self.host_queue_depth(key[1]) > self.max_queue:
+            self._schedule(key, self.interval)
+            return
+        slot.sent_at = time.monotonic()
+        self.relayed += 1
+        await self.sio.emit('sharing/code_update', data=pack_files(slot.build(), slot.features), to=key[1])
+
+    def discard(self, user_id: int) -> None:
+        """Drop pending updates of the student, e.g. after a full sharing/code_send or when the student leaves."""
+        for key in [key for key in self.slots if key[0] == user_id]:
+            slot = self.slots.pop(key)
+            if slot.handle is not None:
+                slot.handle.cancel()
+
+    def get_metrics(self) -> dict[str, int]:
+        return {
+            'relayed': self.relayed,
+            'dropped': self.dropped,
+            'pending': sum(1 for slot in self.slots.values() if slot.data is not None),
+            'host_queue_depth': max((self.host_queue_depth(host_sid) for _, host_sid in self.slots), default=0),
+        }
+
+
+code_relay = CodeRelay()
@@ -0,0 +1,166 @@
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+from socketio import AsyncServer
+
+from src.config import AI_MAX_CONCURRENCY, AI_REQUEST_TIMEOUT
+from src.exceptions import AIJobCancelledError, AIRequestError
+
+T = TypeVar('T')
+
+
+class AIJob:
+    """One AI request waiting for or holding a slot of the scheduler"""
+
+    __slots__ = ('queue_key', 'sid', 'factory', 'future', 'task', 'position')
+
+    def __init__(self, queue_key: Hashable, sid: str, factory: Callable[[], Awaitable], future: asyncio.Future):
+        self.queue_key = queue_key
+        self.sid = sid
+        self.factory = factory
+        self.future = future  # resolved with the result of the request
+        self.task: asyncio.Task | None = None  # the running request
+        self.position = 0  # the last position sent to the user, 0 while not queued
+
+
+class AIScheduler:
+    """
+    Runs at most `max_concurrency` AI requests at once, the others wait in one queue per room.
+
+    A free slot goes to the rooms in turn (round-robin), so a large room sending many requests at once
+    does not hold back the others. A request fails with AIRequestError if it is not answered within
+    `timeout` seconds from submitting, and the requests of a user are cancelled when the user disconnects.
+    Waiting users get solution/ai/queue with their position whenever it changes.
+    """
+
+    def __init__(self, max_concurrency: int = AI_MAX_CONCURRENCY, timeout: float = AI_REQUEST_TIMEOUT):
+        self.sio: AsyncServer | None = None
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queues: OrderedDict[Hashable, deque[AIJob]] = OrderedDict()  # the first room is served next
+        self.running: set[AIJob] = set()
+        self.tasks: set[asyncio.Task] = set()  # running position notifications, the loop keeps weak references only
+        self.completed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, running: {len(self.running)}, waiting: {self.waiting}>'
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def run(self, queue_key: Hashable, sid: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run the request made by the factory when a slot is free and its room has its turn.
+        Args:
+            queue_key (Hashable): The queue of the request, e.g. the room id.
+            sid (str): The session ID of the requesting user.
+            factory (Callable[[], Awaitable]): Makes the request coroutine.
+        Raises:
+            AIRequestError: If the request is not answered in time.
+            AIJobCancelledError: If the user disconnected.
+        """
+        job = AIJob(queue_key, sid, factory, asyncio.get_running_loop().create_future())
+        self.queues.setdefault(queue_key, deque()).append(job)
+        self._dispatch()
+        await self._notify_positions()
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._drop(job)
+            raise AIRequestError('The AI did not answer in time, try again later.') from None
+        except asyncio.CancelledError:
+            if job.future.cancelled():  # cancelled by cancel(), not the caller
+                raise AIJobCancelledError(f'AI request of {sid} was cancelled.') from None
+            self._drop(job)
+            raise
+
+    def cancel(self, sid: str) -> None:
+        """Cancel the waiting and running requests of the user, e.g. when the user disconnects."""
+        jobs = [job for queue in self.queues.values() for job in queue if job.sid == sid]
+        jobs += [job for job in self.running if job.sid == sid and not job.future.done()]
+        for job in jobs:
+            self.cancelled += 1
+            self._drop(job)
+        if jobs:
+            self._start_notify()
+
+    def _drop(self, job: AIJob) -> None:
+        job.future.cancel()
+        if job.task is not None:
+            job.task.cancel()  # the slot is freed by _finish
+            return
+        queue = self.queues.get(job.queue_key)
+        if queue is not None and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self.queues[job.queue_key]
+
+    def _dispatch(self) -> None:
+        while self.queues and len(self.running) < self.max_concurrency:
+            queue_key, queue = next(iter(self.queues.items()))
+            job = queue.popleft()
+            if queue:
+                self.queues.move_to_end(queue_key)  # the next room has the next turn
+            else:
+                del self.queues[queue_key]
+            job.position = 0
+            job.task = asyncio.ensure_future(job.factory())
+            job.task.add_done_callback(lambda task, job=job: self._finish(job, task))
+            self.running.add(job)
+
+    def _finish(self, job: AIJob, task: asyncio.Task) -> None:
+        self.running.discard(job)
+        if not job.future.done():
+            if task.cancelled():
+                job.future.cancel()
+            elif task.exception() is not None:
+                job.future.set_exception(task.exception())
+            else:
+                self.completed += 1
+                job.future.set_result(task.result())
+        elif not task.cancelled():
+            task.exception()  # retrieved, the caller does not wait any more
+        self._dispatch()
+        if self.queues:
+            self._start_notify()
+
+    def get_positions(self) -> dict[AIJob, int]:
+        """Get the place of every waiting request in the order the rooms take turns."""
+        positions = {}
+        queues = list(self.queues.values())
+        for index in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if index < len(queue):
+                    positions[queue[index]] = len(positions) + 1
+        return positions
+
+    def _start_notify(self) -> None:
+        task = asyncio.create_task(self._notify_positions())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _notify_positions(self) -> None:
+        for job, position in self.get_positions().items():
+            if job.position != position:
+                job.position = position
+                if self.sio is not None:
+                    await self.sio.emit('solution/ai/queue', data={'position': position}, to=job.sid)
+
+    def get_metrics(self) -> dict[str, int]:
+        return {
+            'running': len(self.running),
+            'waiting': self.waiting,
+            'rooms_waiting': len(self.queues),
+            'completed': self.completed,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled,
+        }
+
+
+ai_scheduler = AIScheduler()
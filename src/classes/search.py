@@ -0,0 +1,154 @@
+import heapq
+import math
+import re
+from collections import Counter
+from operator import itemgetter
+from typing import TYPE_CHECKING
+
+from src.config import SEARCH_SNIPPET_WIDTH
+
+if TYPE_CHECKING:
+    from src.models import Message
+
+WORD_PATTERN = re.compile(r'\w+')
+K1 = 1.2  # BM25 term frequency saturation
+B = 0.75  # BM25 document length normalization
+
+
+def tokenize(text: str) -> list[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def count_file_terms(files: dict[int, dict[str, str]]) -> dict[int, dict[str, Counter]]:
+    """Count the terms of the files by user id and filename, the slow part of reindexing run in an executor thread."""
+    return {
+        user_id: {filename: Counter(tokenize(content)) for filename, content in user_files.items()}
+        for user_id, user_files in files.items()
+    }
+
+
+def make_snippet(text: str, terms: list[str], width: int = SEARCH_SNIPPET_WIDTH) -> tuple[str, int]:
+    """
+    Cut the text around the first occurrence of one of the terms.
+    Returns:
+        tuple[str, int]: The snippet in one line and the number of the line with the occurrence.
+    """
+    pattern = r'\b(?:' + '|'.join(re.escape(term) for term in terms) + r')\b'
+    match = re.search(pattern, text, re.IGNORECASE)
+    position = match.start() if match else 0
+    begin = max(0, position - width // 2)
+    end = begin + width
+    snippet = ' '.join(text[begin:end].split())
+    return ('...' if begin else '') + snippet + ('...' if end < len(text) else ''), text.count('\n', 0, position) + 1
+
+
+class SearchIndex:
+    """
+    In-memory inverted index of the messages and the shared code of a room, ranked with BM25.
+
+    Messages are indexed when they are sent. Files change on every keystroke, so users with changed code
+    are only marked and their files are reindexed by the next search, their terms counted by count_file_terms
+    in an executor thread.
+    """
+
+    __slots__ = ('postings', 'entries', 'lengths', 'total_length', 'dirty', '_terms', '_users', '_files', '_next_id')
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, int]] = {}  # term -> {entry id: term frequency}
+        self.entries: dict[int, tuple[str, int, 'Message | str', str]] = {}  # id -> (kind, user id, key, text)
+        self.lengths: dict[int, int] = {}
+        self.total_length = 0
+        self.dirty: set[int] = set()  # users whose files have to be reindexed
+        self._terms: dict[int, tuple[str, ...]] = {}
+        self._users: dict[int, set[int]] = {}  # user id -> ids of all entries of the user
+        self._files: dict[int, set[int]] = {}  # user id -> ids of the file entries of the user
+        self._next_id = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, entries count: {len(self.entries)}, terms count: {len(self.postings)}>'
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, kind: str, user_id: int, key: 'Message | str', text: str, frequencies: Counter | None = None) -> int:
+        entry_id = self._next_id
+        self._next_id += 1
+        if frequencies is None:
+            frequencies = Counter(tokenize(text))
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[entry_id] = frequency
+        self.entries[entry_id] = (kind, user_id, key, text)
+        self._terms[entry_id] = tuple(frequencies)
+        self.lengths[entry_id] = length = frequencies.total()
+        self.total_length += length
+        self._users.setdefault(user_id, set()).add(entry_id)
+        return entry_id
+
+    def _remove(self, entry_id: int) -> None:
+        _, user_id, _, _ = self.entries.pop(entry_id)
+        for term in self._terms.pop(entry_id):
+            postings = self.postings[term]
+            del postings[entry_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(entry_id)
+        self._users.get(user_id, set()).discard(entry_id)
+
+    def add_message(self, user_id: int, message: 'Message') -> None:
+        """Index a message of the chat of the student."""
+        if isinstance(message.content, str) and message.content:
+            self._add('message', user_id, message, message.content)
+
+    def mark(self, user_id: int) -> None:
+        self.dirty.add(user_id)
+
+    def set_files(self, user_id: int, files: dict[str, str], terms: dict[str, Counter] | None = None) -> None:
+        """Replace the indexed files of the user with the current ones, `terms` are counted by count_file_terms."""
+        for entry_id in self._files.pop(user_id, ()):
+            self._remove(entry_id)
+        terms = terms or {}
+        self._files[user_id] = {
+            self._add('file', user_id, filename, content, terms.get(filename)) for filename, content in files.items()
+        }
+
+    def discard_user(self, user_id: int) -> None:
+        for entry_id in self._users.pop(user_id, ()):
+            self._remove(entry_id)
+        self._files.pop(user_id, None)
+        self.dirty.discard(user_id)
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        """
+        Find the messages and files matching any of the words of the query, the best matches first.
+        Args:
+            query (str): The words to search.
+            limit (int): Max number of results.
+        Returns:
+            list[dict]: Results with the type, user id, score and snippet, the message or the filename and line.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.entries:
+            return []
+        count, average_length = len(self.entries), self.total_length / len(self.entries) or 1
+        lengths, scores = self.lengths, {}
+        base, scale = K1 * (1 - B), K1 * B / average_length
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (K1 + 1)
+            for entry_id, frequency in postings.items():
+                score = weight * frequency / (frequency + base + scale * lengths[entry_id])
+                scores[entry_id] = scores.get(entry_id, 0.0) + score
+
+        results = []
+        for entry_id, score in heapq.nlargest(limit, scores.items(), key=itemgetter(1)):
+            kind, user_id, key, text = self.entries[entry_id]
+            snippet, line = make_snippet(text, terms)
+            result = {'type': kind, 'user_id': user_id, 'score': round(score, 3), 'snippet': snippet}
+            if kind == 'message':
+                result['message'] = key.serialize()
+            else:
+                result.update({'filename': key, 'line': line})
+            results.append(result)
+        return results
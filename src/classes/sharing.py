@@ -0,0 +1,280 @@
+import hashlib
+from collections import OrderedDict
+
+from src.config import SHARING_ROOM_MEMORY_LIMIT
+from src.exceptions import VersionConflictError
+
+
+def common_prefix_length(first: str, second: str) -> int:
+    """Binary search over slice comparisons, which run in C, instead of a char by char loop."""
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(first: str, second: str, limit: int) -> int:
+    low, high = 0, min(len(first), len(second)) - limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[len(first) - middle :] == second[len(second) - middle :]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def make_change(old: str, new: str) -> dict[str, int | str]:
+    """
+    Build a single change that turns the old text into the new one.
+    Returns:
+        dict: {'start': int, 'end': int, 'text': str} - replace old[start:end] with text.
+    """
+    prefix = common_prefix_length(old, new)
+    suffix = common_suffix_length(old, new, prefix)
+    return {'start': prefix, 'end': len(old) - suffix, 'text': new[prefix : len(new) - suffix]}
+
+
+def apply_changes(text: str, changes: list[dict]) -> str:
+    """
+    Apply the changes one after another, offsets of every change refer to the result of the previous one.
+    Raises:
+        VersionConflictError: If a change does not fit the text.
+    """
+    for change in changes:
+        try:
+            start, end, insert = change['start'], change['end'], change.get('text', '')
+        except (KeyError, TypeError):
+            raise VersionConflictError() from None
+        if not (isinstance(start, int) and isinstance(end, int) and isinstance(insert, str)):
+            raise VersionConflictError()
+        if not 0 <= start <= end <= len(text):
+            raise VersionConflictError()
+        text = text[:start] + insert + text[end:]
+    return text
+
+
+def get_digest(content: str) -> str:
+    """Get the SHA-256 hex digest of the UTF-8 encoded content, the same one clients send as the file 'hash'."""
+    return hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class BlobPool:
+    """
+    Content-addressed storage of shared file bodies: digest -> content with a reference count.
+
+    Students of a room mostly share the same starter files, so equal files are stored once
+    and the documents refer to the same string. A blob is removed when its last reference is released.
+    """
+
+    __slots__ = ('size', '_blobs', '_counts')
+
+    def __init__(self):
+        self.size = 0  # total length of the stored blobs
+        self._blobs: dict[str, str] = {}
+        self._counts: dict[str, int] = {}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, blobs count: {len(self._blobs)}, size: {self.size}>'
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def __contains__(self, digest) -> bool:
+        return isinstance(digest, str) and digest in self._blobs
+
+    def get(self, digest) -> str | None:
+        return self._blobs.get(digest) if isinstance(digest, str) else None
+
+    def add(self, content: str) -> str:
+        """Store the content or take one more reference to the equal stored blob and return its digest."""
+        digest = get_digest(content)
+        if digest in self._counts:
+            self._counts[digest] += 1
+        else:
+            self._blobs[digest] = content
+            self._counts[digest] = 1
+            self.size += len(content)
+        return digest
+
+    def release(self, digest: str) -> None:
+        count = self._counts[digest] - 1
+        if count:
+            self._counts[digest] = count
+        else:
+            del self._counts[digest]
+            self.size -= len(self._blobs.pop(digest))
+
+    def missing(self, digests: list) -> list[str]:
+        """Get the digests the pool does not have, the clients upload the content of these files only."""
+        return [digest for digest in digests if digest not in self]
+
+
+class SharedDocument:
+    """
+    Files shared by a student during the sharing session.
+
+    `version` grows by one with every accepted update. An update carrying a base `version`
+    is applied only if it matches the current one, otherwise the student has to resend the full code.
+    The content of the files is kept in the blob pool of the room, a file may be sent as a 'hash' of a blob in it.
+    """
+
+    __slots__ = ('files', 'digests', 'version', 'pool')
+
+    def __init__(self, pool: BlobPool | None = None):
+        self.files: dict[str, str] = {}
+        self.digests: dict[str, str] = {}  # filename -> digest of the content in the pool
+        self.version: int = 0
+        self.pool = pool if pool is not None else BlobPool()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, files count: {len(self.files)}, version: {self.version}>'
+
+    def reset(self, files: list[dict]) -> list[dict]:
+        """Replace all files with a full snapshot sent by sharing/code_send."""
+        contents, updates = self._prepare_files(files, {})
+        digests = self.digests
+        self.files, self.digests = {}, {}
+        self.version = 0
+        self._commit(contents)
+        for digest in digests.values():  # after the commit, so the blobs sent again stay in the pool
+            self.pool.release(digest)
+        return updates
+
+    def update(self, files: list[dict], base_version: int | None = None) -> list[dict]:
+        """
+        Apply sharing/code_update files to the document.
+        Args:
+            files (list[dict]): Files with a full 'content', a 'hash' of a blob in the pool or a list of 'changes'.
+            base_version (int | None): The version the update is based on, None for plugins without deltas.
+        Returns:
+            list[dict]: The applied files.
+        Raises:
+            VersionConflictError: If the base version, one of the changes or hashes does not match the document.
+        """
+        if base_version is not None and base_version != self.version:
+            raise VersionConflictError()
+        contents, updates = self._prepare_files(files, self.files)
+        self._commit(contents)
+        self.version += 1
+        return updates
+
+    def _prepare_files(self, files: list[dict], current: dict[str, str]) -> tuple[dict[str, str | None], list[dict]]:
+        """Check the files and calculate their new content, None for the deleted ones, without changing the document."""
+        contents: dict[str, str | None] = {}
+        updates = []
+        for file in files:
+            if not isinstance(file, dict) or not isinstance(file.get('filename'), str):
+                raise VersionConflictError()
+            filename, status = file['filename'], file.get('status')
+            if status == 'DELETED':
+                contents[filename] = None
+                updates.append(dict(file))
+                continue
+
+            if 'changes' in file:
+                text = contents[filename] if filename in contents else current.get(filename)
+                if text is None:
+                    raise VersionConflictError()
+                contents[filename] = apply_changes(text, file['changes'])
+                updates.append(dict(file))
+            else:
+                content = self.pool.get(file['hash']) if 'hash' in file else file.get('content') or ''
+                if not isinstance(content, str):
+                    raise VersionConflictError()
+                contents[filename] = content
+                update = {key: value for key, value in file.items() if key != 'hash'}  # other fields of the client stay
+                update['content'] = content
+                updates.append(update)
+        return contents, updates
+
+    def _commit(self, contents: dict[str, str | None]) -> None:
+        for filename, content in contents.items():
+            digest = self.digests.pop(filename, None)
+            if content is None:
+                self.files.pop(filename, None)
+            else:  # take the new reference before releasing the old one, so an unchanged blob stays in the pool
+                self.digests[filename] = self.pool.add(content)
+                self.files[filename] = self.pool.get(self.digests[filename])
+            if digest is not None:
+                self.pool.release(digest)
+
+    def release(self) -> None:
+        """Give the blobs back to the pool, the files stay readable until the document is dropped."""
+        for digest in self.digests.values():
+            self.pool.release(digest)
+        self.digests = {}
+
+    def get_contents(self, files: list) -> dict[str, str | None]:
+        """Get the current content of the files, None for the files that do not exist yet."""
+        return {
+            file['filename']: self.files.get(file['filename'])
+            for file in files
+            if isinstance(file, dict) and isinstance(file.get('filename'), str)
+        }
+
+    def get_text(self) -> str:
+        """Get the content of all files in the order of their names, used to compare the code of users."""
+        return '\n'.join(self.files[filename] for filename in sorted(self.files))
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {'filename': filename, 'status': 'CREATED', 'content': content} for filename, content in self.files.items()
+        ]
+
+
+class DocumentStore:
+    """
+    Shared documents of the room by user id, the least recently updated first.
+
+    Documents are kept after the sharing session of the student ends, so the host can see the code at once
+    when switching back. The files of all documents are stored once in the blob pool of the room.
+    If the size of the pool exceeds `max_size` characters, the least recently updated documents are evicted.
+    """
+
+    __slots__ = ('max_size', 'pool', '_documents')
+
+    def __init__(self, max_size: int = SHARING_ROOM_MEMORY_LIMIT):
+        self.max_size = max_size
+        self.pool = BlobPool()
+        self._documents: OrderedDict[int, SharedDocument] = OrderedDict()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, documents count: {len(self._documents)}, size: {self.size}>'
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __iter__(self):
+        return iter(self._documents)
+
+    @property
+    def size(self) -> int:
+        return self.pool.size
+
+    def get(self, user_id: int) -> SharedDocument | None:
+        return self._documents.get(user_id)
+
+    def get_or_create(self, user_id: int) -> SharedDocument:
+        document = self._documents.get(user_id)
+        if document is None:
+            document = self._documents[user_id] = SharedDocument(self.pool)
+        return document
+
+    def commit(self, user_id: int) -> None:
+        """Mark the updated document as recently updated and evict the oldest ones while the pool is too large."""
+        if user_id not in self._documents:
+            return
+        self._documents.move_to_end(user_id)
+        while self.pool.size > self.max_size and len(self._documents) > 1:
+            _, evicted = self._documents.popitem(last=False)
+            evicted.release()
+
+    def discard(self, user_id: int) -> None:
+        document = self._documents.pop(user_id, None)
+        if document is not None:
+            document.release()
@@ -0,0 +1,181 @@
+import asyncio
+import random
+import re
+import threading
+from itertools import combinations
+
+from src.config import SIMILARITY_BANDS, SIMILARITY_NUM_PERM, SIMILARITY_SHINGLE_SIZE
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+_PRIME = (1 << 61) - 1
+_EMPTY_BIN = -1
+
+
+def get_shingles(text: str, size: int) -> set[int]:
+    """Hash every run of `size` consecutive tokens of the code, whitespace and formatting do not matter."""
+    tokens = TOKEN_PATTERN.findall(text)
+    if len(tokens) <= size:
+        return {hash(tuple(tokens))} if tokens else set()
+    return {hash(tuple(tokens[index : index + size])) for index in range(len(tokens) - size + 1)}
+
+
+class SimilarityIndex:
+    """
+    Near-duplicate detection of the code shared in a room.
+
+    The code of a user is reduced to a MinHash signature of `num_perm` values over the token shingles
+    (one permutation hashing: every shingle falls into one bin, the bin keeps its minimum).
+    Signatures are split into `bands`, users with an equal band share an LSH bucket and only such candidates
+    are compared. Signatures are recalculated only for the users whose code changed since the last query.
+    Queries may run in an executor thread, they hold the lock of the index.
+    """
+
+    __slots__ = (
+        'num_perm',
+        'bands',
+        'shingle_size',
+        'dirty',
+        'signatures',
+        'buckets',
+        'query_lock',
+        '_mixer',
+        '_lock',
+    )
+
+    def __init__(
+        self,
+        num_perm: int = SIMILARITY_NUM_PERM,
+        bands: int = SIMILARITY_BANDS,
+        shingle_size: int = SIMILARITY_SHINGLE_SIZE,
+    ):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.dirty: set[int] = set()  # users whose code changed, marked on the event loop
+        self.signatures: dict[int, tuple[int, ...]] = {}
+        self.buckets: dict[tuple, set[int]] = {}
+        self.query_lock = asyncio.Lock()  # one query of the room at a time, from taking the dirty users to the result
+        rng = random.Random(num_perm)
+        self._mixer = (rng.randrange(1, _PRIME), rng.randrange(_PRIME))
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, signatures count: {len(self.signatures)}, dirty: {len(self.dirty)}>'
+
+    def mark(self, user_id: int) -> None:
+        self.dirty.add(user_id)
+
+    def get_signature(self, text: str) -> tuple[int, ...] | None:
+        shingles = get_shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        multiplier, increment = self._mixer
+        bins = [_EMPTY_BIN] * self.num_perm
+        for shingle in shingles:
+            mixed = (multiplier * shingle + increment) % _PRIME
+            index, value = mixed % self.num_perm, mixed // self.num_perm
+            if bins[index] == _EMPTY_BIN or value < bins[index]:
+                bins[index] = value
+        # Empty bins borrow the value of the next filled bin, shifted by the distance so they do not match by chance
+        for index in range(self.num_perm):
+            distance = 1
+            while bins[index] == _EMPTY_BIN:
+                borrowed = bins[(index + distance) % self.num_perm]
+                if borrowed != _EMPTY_BIN:
+                    bins[index] = borrowed + distance * _PRIME
+                distance += 1
+        return tuple(bins)
+
+    def _band_keys(self, signature: tuple[int, ...]) -> list[tuple]:
+        rows = self.num_perm // self.bands
+        return [(band, signature[band * rows : (band + 1) * rows]) for band in range(self.bands)]
+
+    def _remove(self, user_id: int) -> None:
+        signature = self.signatures.pop(user_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets[key]
+            bucket.discard(user_id)
+            if not bucket:
+                del self.buckets[key]
+
+    def _add(self, user_id: int, text: str) -> None:
+        self._remove(user_id)
+        signature = self.get_signature(text)
+        if signature is None:
+            return
+        self.signatures[user_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(user_id)
+
+    def estimate(self, first: int, second: int) -> float:
+        """Estimate the Jaccard similarity of the code of two users by the share of equal signature values."""
+        signature, other = self.signatures[first], self.signatures[second]
+        matches = sum(1 for value, other_value in zip(signature, other, strict=True) if value == other_value)
+        return matches / len(signature)
+
+    def query(self, texts: dict[int, str], present: set[int], threshold: float) -> list[dict]:
+        """
+        Update the index and group users with similar code.
+        Args:
+            texts (dict[int, str]): The code of the users changed since the last query by user id.
+            present (set[int]): Users with shared code, the others are removed from the index.
+            threshold (float): Min estimated similarity of two users in one cluster.
+        Returns:
+            list[dict]: Clusters {'user_ids': [...], 'similarity': float}, the largest first.
+        """
+        with self._lock:
+            for user_id in [user_id for user_id in self.signatures if user_id not in present]:
+                self._remove(user_id)
+            for user_id, text in texts.items():
+                self._add(user_id, text)
+            return self._clusters(threshold)
+
+    def _clusters(self, threshold: float) -> list[dict]:
+        parents: dict[int, int] = {}
+
+        def find(user_id: int) -> int:
+            while parents.setdefault(user_id, user_id) != user_id:
+                parents[user_id] = parents[parents[user_id]]
+                user_id = parents[user_id]
+            return user_id
+
+        # Users with equal signatures (e.g. the untouched template) are joined at once and compared as one
+        groups: dict[tuple[int, ...], list[int]] = {}
+        for user_id, signature in self.signatures.items():
+            groups.setdefault(signature, []).append(user_id)
+        edges: list[tuple[int, float]] = []
+        representatives = set()
+        for user_ids in groups.values():
+            representatives.add(user_ids[0])
+            for user_id in user_ids[1:]:
+                parents[find(user_id)] = find(user_ids[0])
+                edges.append((user_id, 1.0))
+
+        compared = set()
+        for bucket in self.buckets.values():
+            candidates = sorted(bucket & representatives)
+            for pair in combinations(candidates, 2):
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                similarity = self.estimate(*pair)
+                if similarity >= threshold:
+                    parents[find(pair[0])] = find(pair[1])
+                    edges.append((pair[0], similarity))
+
+        clusters: dict[int, dict] = {}
+        for user_id in list(parents):
+            clusters.setdefault(find(user_id), {'user_ids': [], 'similarities': []})['user_ids'].append(user_id)
+        for user_id, similarity in edges:
+            clusters[find(user_id)]['similarities'].append(similarity)
+        result = [
+            {
+                'user_ids': sorted(cluster['user_ids']),
+                'similarity': round(sum(cluster['similarities']) / len(cluster['similarities']), 2),
+            }
+            for cluster in clusters.values()
+            if len(cluster['user_ids']) > 1
+        ]
+        return sorted(result, key=lambda cluster: len(cluster['user_ids']), reverse=True)
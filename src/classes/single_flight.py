@@ -0,0 +1,42 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first call starts the work, the calls made
+    while it is in flight await the same task and get the same result or exception.
+
+    The task is shielded, so a waiter cancelled on disconnect does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0  # calls served by a task started by another call
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}, in flight: {len(self._tasks)}, coalesced: {self.coalesced}>'
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run the coroutine made by the factory, or join the one already running for the key.
+        Args:
+            key (Hashable): Key of equal calls.
+            factory (Callable[[], Awaitable]): Makes the coroutine, called only if no call with the key is in flight.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def get_metrics(self) -> dict[str, int]:
+        return {'in_flight': len(self._tasks), 'coalesced': self.coalesced}
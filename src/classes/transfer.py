@@ -0,0 +1,73 @@
+import time
+
+from src.config import SHARING_TRANSFER_MAX_CHUNKS, SHARING_TRANSFER_MAX_SIZE, SHARING_TRANSFER_TTL
+from src.exceptions import TransferError
+
+
+class ChunkedTransfer:
+    """
+    Reassembles a sharing/code_send payload sent in chunks.
+
+    The manifest declares the total size (characters of the JSON encoded files) and the number of chunks.
+    Chunks may come in any order and more than once, so the student can resume the transfer after reconnect
+    by sending only the chunks that are missing. The transfer is kept by the id chosen by the client,
+    a transfer of a disconnected user waits SHARING_TRANSFER_TTL seconds for the user to join again.
+    """
+
+    __slots__ = ('transfer_id', 'user_id', 'detached_at', 'size', 'chunks', 'received_count', 'received_size')
+
+    def __init__(self, transfer_id: str, user_id: int, size: int, chunks_count: int):
+        if not 0 < size <= SHARING_TRANSFER_MAX_SIZE:
+            raise TransferError(f'Transfer size should be between 1 and {SHARING_TRANSFER_MAX_SIZE}')
+        max_chunks = min(size, SHARING_TRANSFER_MAX_CHUNKS)
+        if not 0 < chunks_count <= max_chunks:
+            raise TransferError(f'Chunks count should be between 1 and {max_chunks}')
+        self.transfer_id = transfer_id
+        self.user_id: int | None = user_id  # None after the user disconnected
+        self.detached_at = 0.0
+        self.size = size
+        self.chunks: list[str | None] = [None] * chunks_count
+        self.received_count = 0
+        self.received_size = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.transfer_id}, received: {self.received_count}/{len(self.chunks)}>'
+
+    @property
+    def received(self) -> list[int]:
+        return [index for index, chunk in enumerate(self.chunks) if chunk is not None]
+
+    @property
+    def is_complete(self) -> bool:
+        return self.received_count == len(self.chunks)
+
+    @property
+    def is_expired(self) -> bool:
+        return self.user_id is None and time.monotonic() - self.detached_at > SHARING_TRANSFER_TTL
+
+    def attach(self, user_id: int) -> None:
+        self.user_id = user_id
+
+    def detach(self) -> None:
+        self.user_id = None
+        self.detached_at = time.monotonic()
+
+    def add(self, index: int, data: str) -> None:
+        """
+        Save a chunk.
+        Raises:
+            TransferError: If the index is out of range or the received data exceeds the declared size.
+        """
+        if not 0 <= index < len(self.chunks):
+            raise TransferError(f'Chunk index {index} is out of range')
+        previous = self.chunks[index]
+        received_size = self.received_size - len(previous or '') + len(data)
+        if received_size > self.size:
+            raise TransferError(f'Transfer {self.transfer_id} exceeds the declared size {self.size}')
+        self.chunks[index] = data
+        self.received_size = received_size
+        if previous is None:
+            self.received_count += 1
+
+    def assemble(self) -> str:
+        return ''.join(self.chunks)
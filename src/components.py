@@ -6,12 +6,13 @@ from pathlib import Path
 import socketio
 from dotenv import load_dotenv
 
-from src.web import fast_app
+from src.web import fast_app, shutdown, startup
 
 load_dotenv(Path(__file__).parent.parent / '.env')
 
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', ping_timeout=180)
-app = socketio.ASGIApp(sio, other_asgi_app=fast_app)
+# engineio handles the lifespan events itself, so the hooks are given here and not to FastAPI
+app = socketio.ASGIApp(sio, other_asgi_app=fast_app, on_startup=startup, on_shutdown=shutdown)
 
 sio.instrument(
     auth={
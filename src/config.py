@@ -1 +1,51 @@
 PLUGIN_VERSION = '1.2.15'
+
+PROGRESS_LOG_LIMIT = 20_000  # max step status events kept per room
+PROGRESS_NAMES_LIMIT = 4096  # max distinct step and status names in the progress log of a room
+STATS_CACHE_SIZE = 1024  # max rooms with cached /roomstats responses
+EXPORT_CHUNK_ROWS = 200  # rows per chunk of the streaming room export
+ADMIN_PAGE_LIMIT = 100  # max rooms/users returned by one admin query
+SHARING_UPDATE_INTERVAL = 0.1  # min seconds between sharing/code_update relays of one student to the host
+SHARING_MAX_HOST_QUEUE = 16  # pending updates wait while the host has more outgoing packets than this
+SHARING_ROOM_MEMORY_LIMIT = 32 * 1024 * 1024  # max characters of shared code kept per room
+SHARING_TRANSFER_MAX_SIZE = 20 * 1024 * 1024  # max characters of one chunked sharing/code_send transfer
+SHARING_TRANSFER_MAX_CHUNKS = 4096  # max chunks of one transfer, the list of the chunks is allocated on start
+SHARING_TRANSFER_TTL = 5 * 60  # seconds an unfinished transfer is kept after its user disconnected
+SHARING_COMPRESSION_THRESHOLD = 4096  # min bytes of JSON encoded files compressed for clients with the 'zlib' feature
+SHARING_COMPRESSION_LEVEL = 1  # zlib level, the fastest one still shrinks source code several times
+SIMILARITY_NUM_PERM = 64  # values in the MinHash signature of the shared code
+SIMILARITY_BANDS = 16  # LSH bands, users with an equal band are compared
+SIMILARITY_SHINGLE_SIZE = 5  # tokens in one shingle
+SIMILARITY_THRESHOLD = 0.8  # default min similarity of users in one room/similarity cluster
+SEARCH_RESULTS_LIMIT = 20  # max results of one room/search
+SEARCH_SNIPPET_WIDTH = 80  # characters of the text around the match in room/search results
+HTTP_POOL_LIMIT = 100  # max open outbound connections
+HTTP_POOL_LIMIT_PER_HOST = 20  # max open connections to one host
+HTTP_KEEPALIVE_TIMEOUT = 30  # seconds an idle outbound connection is kept open
+HTTP_DNS_CACHE_TTL = 300  # seconds a DNS lookup is cached
+HTTP_TIMEOUT = 60  # total seconds of an outbound request, AI answers may take long
+HTTP_CONNECT_TIMEOUT = 10  # seconds to get a connection for an outbound request
+AI_CACHE_SIZE = 1024  # max solution/ai responses kept in the cache
+AI_CACHE_TTL = 24 * 60 * 60  # seconds a cached solution/ai response is valid
+AI_MAX_CONCURRENCY = 8  # max AI requests sent at once, the others wait in the per-room queues
+AI_REQUEST_TIMEOUT = 180  # seconds a solution/ai request may wait and run before it fails
+AI_HEDGE_DELAY = 20  # seconds before a hedged request to the next AI backend until its p95 latency is known
+AI_HEDGE_MIN_SAMPLES = 20  # successful requests of a backend needed to hedge at its p95 latency
+AI_LATENCY_WINDOW = 200  # latest requests of an AI backend used for the latency percentiles and the error rate
+AI_BREAKER_FAILURES = 5  # failures in a row which open the circuit breaker of an AI backend
+AI_BREAKER_COOLDOWN = 30  # seconds an AI backend with an open circuit breaker is skipped
+AI_PROMPT_TOKEN_BUDGET = 6000  # max estimated tokens of the task text and the code sent to the AI
+AI_PROMPT_LITERAL_LIMIT = 200  # max characters of a string literal in the code sent to the AI
+AI_PROMPT_LINE_LIMIT = 300  # max characters of a line of the code sent to the AI
+NOTION_CHUNK_LIMIT = 100  # blocks requested in one loadPageChunk of the Notion import
+NOTION_MAX_CHUNKS = 100  # max loadPageChunk requests of one imported page
+NOTION_BATCH_SIZE = 100  # missing blocks requested in one syncRecordValues
+NOTION_CONCURRENCY = 4  # max concurrent Notion requests of one import
+NOTION_CACHE_SIZE = 256  # max imported Notion pages kept in the cache
+NOTION_CACHE_TTL = 7 * 24 * 60 * 60  # seconds the exercises of an imported Notion page are kept
+NOTION_CACHE_FRESH = 60  # seconds cached exercises are returned without checking the page for edits
+EXECUTOR_PROCESSES = 2  # worker processes for CPU-bound work off the event loop
+EXECUTOR_THREADS = 8  # worker threads for blocking work off the event loop
+EXECUTOR_TIMEOUT = 30  # default seconds a task of the executor service may take
+EXECUTOR_OFFLOAD_SIZE = 64 * 1024  # min characters of a settings text or a transfer parsed in the process pool
+NOTION_OFFLOAD_BLOCKS = 2000  # min blocks of a Notion page parsed in the process pool
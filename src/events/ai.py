@@ -1,5 +1,13 @@
-from src.classes.external_api import ExternalAPIClient
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import aclosing
+
+from src.classes.ai_cache import ai_cache, get_cache_key
+from src.classes.ai_router import ai_router
+from src.classes.prompt import prompt_budget
+from src.classes.scheduler import ai_scheduler
 from src.components import logger, sio
+from src.exceptions import AIJobCancelledError, AIRequestError, TaskTimeoutError, UserNotFoundError
+from src.managers import user_manager
 
 from .utils import Utils
 
@@ -8,29 +16,44 @@ utils = Utils(sio, logger)
 
 def register_ai_events() -> None:
     """Register AI events."""
+    ai_scheduler.sio = sio
     sio.on('solution/ai', solution_from_ai)
 
 
 async def solution_from_ai(sid: str, data: dict[str, str]) -> None:
     """
     Sends a solution from the AI to the student with the given sid.
+    With 'stream' the solution is sent in parts, see stream_solution_from_ai.
     Args:
         sid (str): The session ID of the user.
-        data (dict): The data containing the solution.
+        data (dict): The data containing the task 'content', the 'code' and an optional 'stream' flag.
     """
     event = 'solution/ai'
 
     if not await utils.validate_data(data):
         return
-    content = data.get('content')
-    code = data.get('code')
-    if not content or not code:
-        await utils.handle_bad_request(f'Event: {event}. Task content and code are required!')
+    if (prompt := await get_prompt(sid, data, event)) is None:
+        return
+    content, code = prompt
+    # The same prompt (up to comments and formatting) gets the cached answer, the router coalesces by the same key
+    key = get_cache_key(content, code)
+    if data.get('stream'):
+        await stream_solution_from_ai(sid, content, code, key)
         return
-    logger.debug('Code with a question were sent to AI', extra={'sid': sid})
 
-    client = ExternalAPIClient()
-    ai_response: dict = await client.get_solution({'content': content, 'code': code})
+    ai_response = ai_cache.get(key)
+    if ai_response is None:
+        try:
+            ai_response: dict = await schedule_request(
+                sid, key, lambda: ai_router.get_solution({'content': content, 'code': code}, key)
+            )
+        except AIJobCancelledError:
+            return
+        except AIRequestError as e:
+            await utils.handle_bad_request(str(e))
+            return
+        if ai_response.get('status') and key not in ai_cache:  # coalesced requests get the same response
+            ai_cache.set(key, ai_response)
 
     if not ai_response['status']:
         await utils.handle_bad_request(ai_response['content'])
@@ -38,3 +61,84 @@ async def solution_from_ai(sid: str, data: dict[str, str]) -> None:
 
     await sio.emit('solution/ai', data={'content': ai_response['content']}, to=sid)
     logger.debug(f'The AI solution was sent to the user with SID {sid}!', extra={'sid': sid})
+
+
+async def get_prompt(sid: str, data: dict[str, str], event: str) -> tuple[str, str] | None:
+    """Get the task content and the code fitted to the prompt budget, handle the bad request and return None if not."""
+    content = data.get('content')
+    code = data.get('code')
+    if not content or not code:
+        await utils.handle_bad_request(f'Event: {event}. Task content and code are required!')
+        return None
+    logger.debug('Code with a question were sent to AI', extra={'sid': sid})
+
+    try:
+        content, code, saved = await prompt_budget.fit_async(content, code)  # the only place the prompt is trimmed
+    except TaskTimeoutError as e:
+        await utils.handle_bad_request(f'Event: {event}. {e}')
+        return None
+    if saved:
+        logger.debug(f'The prompt to AI was trimmed by about {saved} tokens', extra={'sid': sid})
+    return content, code
+
+
+async def stream_solution_from_ai(sid: str, content: str, code: str, key: str) -> None:
+    """
+    Send the AI solution in parts as solution/ai/chunk as soon as they arrive, then solution/ai/done
+    with the full content. A cached solution comes as one chunk. A failed stream ends with solution/ai/error.
+    Args:
+        sid (str): The session ID of the user.
+        content (str): The task content.
+        code (str): The code of the user.
+        key (str): The cache key of the task and the code.
+    """
+    cached = ai_cache.get(key)
+    chunks = []
+
+    async def stream() -> None:
+        async with aclosing(ai_router.stream_solution({'content': content, 'code': code})) as parts:
+            async for text in parts:
+                chunks.append(text)
+                await sio.emit('solution/ai/chunk', data={'content': text}, to=sid)
+
+    try:
+        if cached is not None:
+            chunks.append(cached['content'])
+            await sio.emit('solution/ai/chunk', data={'content': cached['content']}, to=sid)
+        else:
+            await ai_scheduler.run(get_queue_key(sid), sid, stream)
+    except AIJobCancelledError:
+        return
+    except AIRequestError as e:
+        await sio.emit('solution/ai/error', data={'content': str(e)}, to=sid)
+        await utils.handle_bad_request(str(e))
+        return
+
+    answer = ''.join(chunks)
+    if cached is None and key not in ai_cache:
+        ai_cache.set(key, {'status': True, 'content': answer})
+    await sio.emit('solution/ai/done', data={'content': answer}, to=sid)
+    logger.debug(f'The AI solution was streamed to the user with SID {sid}!', extra={'sid': sid})
+
+
+def get_queue_key(sid: str) -> Hashable:
+    """Get the scheduler queue of the user: the room, or an own queue for a user not in a room."""
+    try:
+        user = user_manager.get_user_by_sid(sid)
+    except UserNotFoundError:
+        return sid
+    return user.room or sid
+
+
+async def schedule_request(sid: str, key: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+    """
+    Run the AI request through ai_scheduler. A request equal to one already in flight only waits
+    for its answer, so it does not take a slot of the scheduler.
+    Args:
+        sid (str): The session ID of the user.
+        key (str): The cache key of the trimmed task and code, the key of the ai_router flights.
+        factory (Callable[[], Awaitable[dict]]): Makes the request coroutine.
+    """
+    if key in ai_router.flights:
+        return await factory()
+    return await ai_scheduler.run(get_queue_key(sid), sid, factory)
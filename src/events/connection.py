@@ -3,6 +3,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from src.classes.relay import code_relay
+from src.classes.scheduler import ai_scheduler
 from src.components import logger, sio
 from src.exceptions import RoomNotFoundError, UserNotFoundError
 from src.managers import room_manager, user_manager
@@ -34,6 +36,7 @@ async def disconnect_user(sid: str) -> None:
     Args:
         sid (str): The session ID of the user.
     """
+    ai_scheduler.cancel(sid)  # nobody waits for the answers any more
     try:
         user = user_manager.get_user_by_sid(sid)
     except UserNotFoundError:
@@ -42,11 +45,12 @@ async def disconnect_user(sid: str) -> None:
     event = 'disconnect'
 
     if user and user.room:
-        user.status = StatusEnum.OFFLINE
+        user_manager.set_user_status(user, StatusEnum.OFFLINE)
         try:
             room = room_manager.get_room_by_id(user.room)
             if user.role != 'host':
                 room.remove_user_from_room(user.uid)  # contradicts with room/rejoin (not realised on plugin)
+                code_relay.discard(user.uid)
         except RoomNotFoundError:
             await utils.handle_bad_request(f'Event: {event}. Room {user.room} not found.')
             return
@@ -65,8 +65,10 @@ async def send_message(sender_sid: str, data: dict, to: str) -> None:
 
     if to == 'to_client':
         receiver.messages.append(message)
+        room.search.add_message(receiver.uid, message)
     else:
         sender.messages.append(message)
+        room.search.add_message(sender.uid, message)
 
     await sio.emit(
         f'message/{to}',
@@ -1,12 +1,16 @@
 import asyncio
 from random import choice
 
+from src.classes.executor import executor_service
+from src.classes.relay import code_relay
+from src.classes.search import count_file_terms
 from src.components import logger, sio
-from src.exceptions import RoomNotFoundError, UserNotFoundError
+from src.config import ADMIN_PAGE_LIMIT, SEARCH_RESULTS_LIMIT, SIMILARITY_THRESHOLD
+from src.exceptions import RoomNotFoundError, TaskTimeoutError, UserNotFoundError
 from src.managers import room_manager, user_manager
 from src.models import StatusEnum
 
-from .utils import AlertsEnum, Utils
+from .utils import AlertsEnum, Utils, parse_features
 
 utils = Utils(sio, logger)
 
@@ -18,6 +22,8 @@ def register_room_events() -> None:
     sio.on('room/leave', room_leave)
     sio.on('room/close', room_close)
     sio.on('room/log', room_log)
+    sio.on('room/similarity', room_similarity)
+    sio.on('room/search', room_search)
     sio.on('error/from_client', error_from_client)
 
     @sio.on('room/rejoin')
@@ -41,6 +47,7 @@ async def room_create(sid: str, data: dict) -> None:
 
     hostname = data.get('name')
     user = user_manager.create_user(sid, name=hostname, role='host')
+    user.features = parse_features(data)
     room = room_manager.create_room(host=user)
     await sio.emit('room/update', data=room.get_room_data(), to=sid)
     logger.debug(f'User {user.uid} created room {room.rid}!', extra={'sid': sid})
@@ -85,6 +92,7 @@ async def room_join(sid: str, data: dict) -> None:
         return
 
     user = user_manager.create_user(sid, name=username, role='client', room_id=room_id)
+    user.features = parse_features(data)
     room.save_username(username)
     room.add_user_to_room(user)
     await sio.enter_room(sid, room_id)
@@ -139,7 +147,8 @@ async def reconnect(sid: str, data: dict, command: str) -> None:
 
     try:
         user = user_manager.set_new_sid(old_sid=user.sid, new_sid=sid)  # Save the new SID after reconnect
-        user.status = StatusEnum.ONLINE  # Update user status
+        user_manager.set_user_status(user, StatusEnum.ONLINE)  # Update user status
+        user.features = parse_features(data)
     except UserNotFoundError:
         await utils.handle_bad_request(f"Event: {event}. Can't change SID. User with id '{user_id}' not found.")
         return
@@ -187,6 +196,7 @@ async def room_leave(sid: str, data: dict) -> None:
 
     try:
         room.remove_user_from_room(user.uid)
+        code_relay.discard(user.uid)
     except UserNotFoundError:
         await utils.handle_bad_request(f'Event: {event}. User is not in the room {room_id}')
         return
@@ -231,6 +241,7 @@ async def room_close(sid: str, data: dict) -> None:
     try:
         room = room_manager.get_room_by_id(room_id)
         for user in room.users.values():
+            code_relay.discard(user.uid)
             try:
                 user_manager.delete_user(user.sid)
             except UserNotFoundError:
@@ -281,15 +292,128 @@ async def error_from_client(sid: str, data: dict) -> None:
         return
 
 
-async def room_log(sid: str, data: dict) -> None:
+async def room_log(sid: str, data: dict | None) -> None:
     """
-    Send room log.
+    Send a page of rooms and users with the server totals.
     Args:
         sid (str): The session ID of the user.
-        data (dict): not using.
+        data (dict | None): Optional filters 'room_id', 'status', 'role' and pagination 'offset', 'limit'.
     """
-    log = room_manager.get_rooms_log()
-    log.update(
-        {'users': [f'Room {user.room}: {user.name}, {user.status.name}' for user in user_manager.get_all_users()]}
-    )
-    await sio.emit('room/log', data=log, to=sid)
+    event = 'room/log'
+
+    data = data if isinstance(data, dict) else {}
+    room_id = data.get('room_id')
+    try:
+        offset = int(data.get('offset', 0))
+        limit = min(int(data.get('limit', ADMIN_PAGE_LIMIT)), ADMIN_PAGE_LIMIT)
+        if offset < 0 or limit < 1:
+            raise ValueError
+        status = StatusEnum(data['status']) if data.get('status') else None
+        room = room_manager.get_room_by_id(room_id) if room_id is not None else None
+    except (TypeError, ValueError):
+        await utils.handle_bad_request(f'Event: {event}. Invalid filters or pagination: {data}')
+        return
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room {room_id} not found!')
+        return
+
+    log = room_manager.get_rooms_log(offset, limit)
+    log.update(user_manager.get_users_overview())
+    log.update(user_manager.get_users_log(room, status, data.get('role'), offset, limit))
+    await sio.emit(event, data=log, to=sid)
+
+
+async def room_similarity(sid: str, data: dict | None) -> None:
+    """
+    Send the host clusters of users who shared nearly the same code.
+    The similarity index of the room is updated with the code changed since the previous query in an executor thread.
+    Args:
+        sid (str): The session ID of the host.
+        data (dict | None): Optional min similarity 'threshold' from 0 to 1.
+    """
+    event = 'room/similarity'
+
+    data = data if isinstance(data, dict) else {}
+    threshold = data.get('threshold', SIMILARITY_THRESHOLD)
+    if not isinstance(threshold, int | float) or not 0 < threshold <= 1:
+        await utils.handle_bad_request(f'Event: {event}. threshold should be a number from 0 to 1!')
+        return
+
+    try:
+        host = user_manager.get_user_by_sid(sid)
+        room = room_manager.get_room_by_id(host.room)
+        if room.host is not host:
+            raise UserNotFoundError
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Host with sid {sid} not found!')
+        return
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room not found!')
+        return
+
+    index = room.similarity
+    async with index.query_lock:
+        dirty, index.dirty = index.dirty, set()
+        documents = {user_id: room.documents.get(user_id) for user_id in dirty}
+        texts = {user_id: document.get_text() for user_id, document in documents.items() if document is not None}
+        try:
+            clusters = await executor_service.run_in_thread(index.query, texts, set(room.documents), threshold)
+        except TaskTimeoutError:
+            index.dirty |= dirty  # compared again by the next query
+            await utils.handle_bad_request(f'Event: {event}. Comparing the code of room {room.rid} took too long!')
+            return
+    await sio.emit(event, data={'clusters': clusters}, to=sid)
+    logger.debug(f'{len(clusters)} clusters of similar code in room {room.rid}', extra={'sid': sid})
+
+
+async def room_search(sid: str, data: dict) -> None:
+    """
+    Search the messages and the shared code of the room for the host.
+    Files changed since the previous search are reindexed first, their terms are counted in an executor thread.
+    Args:
+        sid (str): The session ID of the host.
+        data (dict): The data containing the 'query' and an optional 'limit'.
+    """
+    event = 'room/search'
+
+    if not await utils.validate_data(data, 'query'):
+        return
+
+    query = data.get('query')
+    limit = data.get('limit', SEARCH_RESULTS_LIMIT)
+    if not isinstance(query, str) or not isinstance(limit, int) or not 0 < limit <= SEARCH_RESULTS_LIMIT:
+        await utils.handle_bad_request(
+            f'Event: {event}. query should be a string and limit up to {SEARCH_RESULTS_LIMIT}!'
+        )
+        return
+
+    try:
+        host = user_manager.get_user_by_sid(sid)
+        room = room_manager.get_room_by_id(host.room)
+        if room.host is not host:
+            raise UserNotFoundError
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Host with sid {sid} not found!')
+        return
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room not found!')
+        return
+
+    index = room.search
+    dirty, index.dirty = index.dirty, set()
+    files = {}
+    for user_id in dirty:
+        document = room.documents.get(user_id)
+        files[user_id] = dict(document.files) if document is not None else {}  # the documents change meanwhile
+    try:
+        terms = await executor_service.run_in_thread(count_file_terms, files)
+    except TaskTimeoutError:
+        index.dirty |= dirty  # reindexed by the next search
+        await utils.handle_bad_request(f'Event: {event}. Indexing the code of room {room.rid} took too long!')
+        return
+    for user_id, user_files in files.items():
+        if user_id in room.users:  # not left the room meanwhile
+            index.set_files(user_id, user_files, terms[user_id])
+    results = index.search(query, limit)
+    await sio.emit(event, data={'query': query, 'results': results}, to=sid)
+    logger.debug(f'{len(results)} results for "{query}" in room {room.rid}', extra={'sid': sid})
@@ -1,4 +1,6 @@
+from src.classes.executor import executor_service
 from src.components import logger, sio
+from src.config import EXECUTOR_OFFLOAD_SIZE
 from src.exceptions import RoomNotFoundError, UserNotFoundError
 from src.managers import room_manager, user_manager
 
@@ -35,11 +37,14 @@ def register_settings_events() -> None:
             files_to_ignore = data.get('files_to_ignore')
             if files_to_ignore is None:
                 return
-            result = parse_files_to_ignore(files_to_ignore)
+            if len(files_to_ignore) >= EXECUTOR_OFFLOAD_SIZE:  # a huge text would stall the other rooms
+                result = await executor_service.run_in_process(parse_files_to_ignore, files_to_ignore)
+            else:
+                result = parse_files_to_ignore(files_to_ignore)
+            room.set_settings(result)  # Compile the ignore matcher and save to the Room.settings
         except Exception as e:
             await utils.handle_bad_request(f'Event: {event}. Failed to parse files to ignore: {e}')
             return
 
-        room.settings = result  # Save to the Room.settings
         await sio.emit(event, data=result, room=host.room)
         logger.debug(f'Settings were sent to all students in the room {host.room}!', extra={'sid': sid})
@@ -1,6 +1,10 @@
+from src.classes.codec import pack_files, unpack_files
+from src.classes.relay import code_relay
+from src.classes.sharing import SharedDocument
 from src.components import logger, sio
-from src.exceptions import RoomNotFoundError, UserNotFoundError
+from src.exceptions import RoomNotFoundError, UserNotFoundError, VersionConflictError
 from src.managers import room_manager, user_manager
+from src.models import Room
 
 from .utils import Utils
 
@@ -8,6 +12,8 @@ utils = Utils(sio, logger)
 
 
 def register_sharing_code_events() -> None:
+    code_relay.sio = sio
+
     @sio.on('sharing/start')
     async def sharing_start(sid, data):
         await send_sharing_start(data)
@@ -20,6 +26,17 @@ def register_sharing_code_events() -> None:
     async def sharing_code_update(sid, data):
         await send_sharing_code(sid, data, command='code_update')
 
+    sio.on('sharing/snapshot', send_sharing_snapshot)
+    sio.on('sharing/blobs', check_sharing_blobs)
+
+    @sio.on('sharing/subscribe')
+    async def sharing_subscribe(sid, data):
+        await change_subscriptions(sid, data, subscribe=True)
+
+    @sio.on('sharing/unsubscribe')
+    async def sharing_unsubscribe(sid, data):
+        await change_subscriptions(sid, data, subscribe=False)
+
     # deprecated from v1.2.13
     @sio.on('sharing/end')
     async def sharing_end(sid, data):
@@ -49,6 +66,11 @@ async def send_sharing_start(data: dict) -> None:
         await utils.handle_bad_request(f'Event {event}. User {user_id} in room {room_id} not found!')
         return
 
+    # Show the last code of the user to the host at once, the live session updates it later
+    document = room.documents.get(user.uid)
+    if document is not None and document.files:
+        await emit_snapshot(room, user.uid, room.host.sid)
+
     await sio.emit('sharing/end', data={}, room=room_id, skip_sid=user.sid)
     await sio.emit(event, data={}, to=user.sid)
     logger.debug(f'Host sent {event} to the user {user_id}', extra={'sid': room.host.sid})
@@ -56,7 +78,15 @@ async def send_sharing_start(data: dict) -> None:
 
 async def send_sharing_code(sid: str, data: dict, command: str) -> None:
     """
-    Send sharing code to the host in the room where the user is.
+    Save sharing code to the user's document and send it to the host in the room where the user is.
+    code_send replaces the document, code_update applies files with a full 'content' or a list of 'changes'
+    ({'start', 'end', 'text'}) based on the document 'version'. If the version does not match,
+    the user gets sharing/resync and has to send the full code again.
+    Hosts with the 'diff' feature get the changes and the version, other hosts get the full content of the files.
+    Files ignored by the room settings are dropped before they are stored or relayed.
+    Clients with the 'zlib' feature may send and receive the files as a compressed binary 'payload'.
+    Updates are relayed through code_relay, which merges the updates of the user coming faster than
+    SHARING_UPDATE_INTERVAL and holds them while the host is backlogged.
     Args:
         sid (str): The session ID of the user.
         data (dict): The data to be sent.
@@ -77,7 +107,163 @@ async def send_sharing_code(sid: str, data: dict, command: str) -> None:
     except UserNotFoundError:
         await utils.handle_bad_request(f'Event: {event}. User with sid {sid} not found!')
         return
-    data.update({'user_id': user.uid})
 
-    await sio.emit(event, data=data, to=room.host.sid)
+    files = get_files(data)
+    version = data.get('version')
+    if not isinstance(files, list) or (version is not None and not isinstance(version, int)):
+        await utils.handle_bad_request(
+            f'Event: {event}. Files should be a JSON array or a zlib payload and version an integer!'
+        )
+        return
+
+    files = room.ignore.filter(files)  # strip files ignored by the host settings, e.g. venv/ and .git/
+    document = room.get_document(user.uid)
+    previous = document.get_contents(files)
+    try:
+        updates = document.reset(files) if command == 'code_send' else document.update(files, version)
+    except VersionConflictError:
+        await sio.emit('sharing/resync', data={'version': document.version}, to=sid)
+        logger.debug(f'User {user.uid} got sharing/resync, document version {document.version}', extra={'sid': sid})
+        return
+    room.documents.commit(user.uid)
+    room.similarity.mark(user.uid)
+    room.search.mark(user.uid)
+
+    if not room.is_subscribed(user.uid):  # keep the code on the server only
+        code_relay.discard(user.uid)
+        return
+
+    data.update({'user_id': user.uid})
+    features = room.host.features
+    if command == 'code_update':
+        await code_relay.push(user.uid, room.host.sid, document, previous, updates, data, features)
+    else:
+        code_relay.discard(user.uid)
+        data.update({'files': updates})
+        if 'diff' in features:
+            data.update({'version': document.version})
+        await sio.emit(event, data=pack_files(data, features), to=room.host.sid)
     logger.debug(f'User {user.uid} sent sharing/{command} to host {room.host.uid}', extra={'sid': user.sid})
+
+
+def get_files(data: dict) -> list | None:
+    """Get the files of sharing/code_send or sharing/code_update, None if the compressed payload is broken."""
+    try:
+        return unpack_files(data)
+    except ValueError:
+        return None
+
+
+async def send_sharing_snapshot(sid: str, data: dict) -> None:
+    """
+    Send the full document shared by the user to the host as sharing/code_send.
+    Args:
+        sid (str): The session ID of the host.
+        data (dict): The data containing the user ID.
+    """
+    event = 'sharing/snapshot'
+
+    if not await utils.validate_data(data, 'user_id'):
+        return
+
+    user_id = data.get('user_id')
+    try:
+        host = user_manager.get_user_by_sid(sid)
+        room = room_manager.get_room_by_id(host.room)
+        if room.host is not host:
+            raise UserNotFoundError
+        room.get_user_by_id(user_id)
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room not found!')
+        return
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Host or user {user_id} not found!')
+        return
+
+    await emit_snapshot(room, user_id, sid)
+    logger.debug(f'Host got the shared code snapshot of the user {user_id}', extra={'sid': sid})
+
+
+async def check_sharing_blobs(sid: str, data: dict) -> None:
+    """
+    Send the user of the room the hashes of the files the room does not have yet. The user uploads the content
+    of these files only, other files are sent as {'filename', 'status', 'hash'} and taken from the blob pool.
+    Args:
+        sid (str): The session ID of the user.
+        data (dict): The data containing the room ID and 'hashes' of the files.
+    """
+    event = 'sharing/blobs'
+
+    if not await utils.validate_data(data, 'room_id', 'hashes'):
+        return
+
+    hashes = data.get('hashes')
+    if not isinstance(hashes, list):
+        await utils.handle_bad_request(f'Event: {event}. hashes should be a list!')
+        return
+
+    room_id = data.get('room_id')
+    try:
+        room = room_manager.get_room_by_id(room_id)
+        room.get_user_by_id(user_manager.get_user_by_sid(sid).uid)  # only users of the room may probe its blobs
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room {room_id} not found!')
+        return
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. User with sid {sid} in room {room_id} not found!')
+        return
+
+    await sio.emit('sharing/blobs/missing', data={'hashes': room.documents.pool.missing(hashes)}, to=sid)
+    logger.debug(f'{len(hashes)} blobs checked in room {room_id}', extra={'sid': sid})
+
+
+async def change_subscriptions(sid: str, data: dict, subscribe: bool) -> None:
+    """
+    Subscribe the host with the 'subscribe' feature to the shared code of the users or unsubscribe from it.
+    Only code of the subscribed users is relayed to such host, a new subscription gets the latest snapshot at once.
+    Args:
+        sid (str): The session ID of the host.
+        data (dict): The data containing 'user_ids'.
+        subscribe (bool): True to subscribe, False to unsubscribe.
+    """
+    event = 'sharing/subscribe' if subscribe else 'sharing/unsubscribe'
+
+    if not await utils.validate_data(data, 'user_ids'):
+        return
+
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not all(isinstance(user_id, int) for user_id in user_ids):
+        await utils.handle_bad_request(f'Event: {event}. user_ids should be a list of integers!')
+        return
+
+    try:
+        host = user_manager.get_user_by_sid(sid)
+        room = room_manager.get_room_by_id(host.room)
+        if room.host is not host:
+            raise UserNotFoundError
+        for user_id in user_ids:
+            room.get_user_by_id(user_id)
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room not found!')
+        return
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Host or one of the users {user_ids} not found!')
+        return
+
+    for user_id in user_ids:
+        if not subscribe:
+            room.subscriptions.discard(user_id)
+            code_relay.discard(user_id)
+        elif user_id not in room.subscriptions:
+            room.subscriptions.add(user_id)
+            await emit_snapshot(room, user_id, sid)
+    logger.debug(f'Host subscriptions: {room.subscriptions}', extra={'sid': sid})
+
+
+async def emit_snapshot(room: Room, user_id: int, sid: str) -> None:
+    """Send the latest full document of the user as sharing/code_send, with the version to hosts with 'diff'."""
+    document = room.documents.get(user_id) or SharedDocument()
+    snapshot = {'room_id': room.rid, 'user_id': user_id, 'files': document.snapshot()}
+    if 'diff' in room.host.features:
+        snapshot.update({'version': document.version})
+    await sio.emit('sharing/code_send', data=pack_files(snapshot, room.host.features), to=sid)
@@ -1,7 +1,7 @@
 from src.components import logger, sio
 from src.exceptions import RoomNotFoundError, UserNotFoundError
 from src.managers import room_manager, user_manager
-from src.models import SignalEnum
+from src.models import SignalEnum, User
 from src.scraper.notion_scraper import get_exercises_from_notion
 
 from .utils import AlertsEnum, Utils
@@ -16,6 +16,7 @@ def register_steps_events() -> None:
     sio.on('steps/status/to_mentor', steps_status_to_mentor)
     sio.on('steps/table', steps_table)
     sio.on('steps/import', steps_import)
+    sio.on('steps/analytics', steps_analytics)
 
     sio.on('exercise', exercise)  # deprecated from v1.1.0
     sio.on('exercise/feedback', exercise_feedback)  # deprecated from v1.1.0
@@ -74,6 +75,9 @@ async def steps_status_to_client(sid: str, data: dict[str, int | dict[str, str]]
         return
 
     steps: dict = data.get('steps')
+    if not isinstance(steps, dict):
+        await utils.handle_bad_request(f'Event: {event}. steps should be a dictionary!')
+        return
     try:
         host = user_manager.get_user_by_sid(sid)
         room_id = host.room
@@ -92,29 +96,41 @@ async def steps_status_to_client(sid: str, data: dict[str, int | dict[str, str]]
         await utils.handle_bad_request(f'Event: {event}. User {user_id} in room {room_id} not found!')
         return
 
-    if not user.steps:
-        user.steps = steps
-    else:
-        for step, status in steps.items():
-            if step in user.steps:
-                if status == 'NONE' and user.steps[step] == 'DONE':
-                    await utils.alerts(
-                        user.sid,
-                        f'Task {step} solution declined!',
-                        AlertsEnum.WARNING,
-                    )
-                elif status == 'ACCEPTED' and user.steps[step] != status:
-                    await utils.alerts(
-                        user.sid,
-                        f'Task {step} solution accepted!',
-                        AlertsEnum.SUCCESS,
-                    )
-                user.steps[step] = status
+    changed_steps = {step: status for step, status in steps.items() if not user.steps or step in user.steps}
+    room.progress.record_changes(user.uid, user.steps, changed_steps)
+    await update_user_steps(user, steps)
 
     await sio.emit(event, data=steps, to=user.sid)
     logger.debug(f'Statuses were sent to user {user.uid} in the room {room_id}!', extra={'sid': sid})
 
 
+async def update_user_steps(user: User, steps: dict[str, str]) -> None:
+    """
+    Save the statuses set by the host, the student gets an alert when a solution is accepted or declined.
+    Args:
+        user (User): The student.
+        steps (dict[str, str]): The statuses by step.
+    """
+    if not user.steps:
+        user.steps = steps
+        return
+    for step, status in steps.items():
+        if step in user.steps:
+            if status == 'NONE' and user.steps[step] == 'DONE':
+                await utils.alerts(
+                    user.sid,
+                    f'Task {step} solution declined!',
+                    AlertsEnum.WARNING,
+                )
+            elif status == 'ACCEPTED' and user.steps[step] != status:
+                await utils.alerts(
+                    user.sid,
+                    f'Task {step} solution accepted!',
+                    AlertsEnum.SUCCESS,
+                )
+            user.steps[step] = status
+
+
 async def steps_status_to_mentor(sid: str, data: dict[str, str]) -> None:
     """
     Sends statuses from the student to the host of the room.
@@ -140,7 +156,9 @@ async def steps_status_to_mentor(sid: str, data: dict[str, str]) -> None:
 
     if user.steps == data:  # if nothing was changed -> no need to send steps to mentor
         return
+    room.progress.record_changes(user.uid, user.steps, data)
     user.steps = data
+    room.touch()
 
     await sio.emit(event, data={'user_id': user.uid, 'steps': data}, to=room.host.sid)
     logger.debug(f'Statuses were sent from user {user.uid} to the host of the room {room_id}!', extra={'sid': sid})
@@ -171,6 +189,35 @@ async def steps_table(sid: str, data) -> None:
     logger.debug(f'Steps table was sent to host {host.uid}!', extra={'sid': sid})
 
 
+async def steps_analytics(sid: str, data: dict | None) -> None:
+    """
+    Send the time-to-completion and throughput statistics of the room to the host.
+    Args:
+        sid (str): The session ID of the host.
+        data (dict | None): The data containing an optional 'window' (seconds) for the throughput.
+    """
+    event = 'steps/analytics'
+
+    try:
+        host = user_manager.get_user_by_sid(sid)
+        room_id = host.room
+        room = room_manager.get_room_by_id(room_id)
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Host with sid {sid} not found!')
+        return
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room not found!')
+        return
+
+    window = data.get('window', 60) if isinstance(data, dict) else 60
+    if not isinstance(window, int | float) or window <= 0:
+        await utils.handle_bad_request(f'Event: {event}. Window should be a positive number!')
+        return
+
+    await sio.emit(event, data=room.progress.summary(window), to=sid)
+    logger.debug(f'Steps analytics was sent to host {host.uid}!', extra={'sid': sid})
+
+
 async def steps_import(sid: str, data: dict[str, str]) -> None:
     """
     Get Notion url from the host and parse the steps from Notion.
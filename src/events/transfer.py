@@ -0,0 +1,133 @@
+import json
+
+from src.classes.executor import executor_service
+from src.classes.transfer import ChunkedTransfer
+from src.components import logger, sio
+from src.config import EXECUTOR_OFFLOAD_SIZE
+from src.exceptions import RoomNotFoundError, TaskTimeoutError, TransferError, UserNotFoundError
+from src.managers import room_manager, user_manager
+from src.models import Room, User
+
+from .sharing_code import send_sharing_code
+from .utils import Utils
+
+utils = Utils(sio, logger)
+
+
+def register_transfer_events() -> None:
+    """Register chunked transfer events."""
+    sio.on('sharing/transfer/start', transfer_start)
+    sio.on('sharing/transfer/chunk', transfer_chunk)
+
+
+async def get_room_and_user(sid: str, data: dict, event: str) -> tuple[Room, User] | None:
+    """Get the room from the data and the user with the sid in it, or report a bad request."""
+    room_id = data.get('room_id')
+    try:
+        room = room_manager.get_room_by_id(room_id)
+        user = room.get_user_by_id(user_manager.get_user_by_sid(sid).uid)
+    except RoomNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. Room {room_id} not found!')
+        return None
+    except UserNotFoundError:
+        await utils.handle_bad_request(f'Event: {event}. User with sid {sid} in room {room_id} not found!')
+        return None
+    return room, user
+
+
+async def load_files(payload: str) -> list[dict]:
+    """Decode the assembled files, a large payload in the process pool: json.loads keeps the GIL of a thread."""
+    if len(payload) >= EXECUTOR_OFFLOAD_SIZE:
+        return await executor_service.run_in_process(json.loads, payload)
+    return json.loads(payload)
+
+
+async def transfer_start(sid: str, data: dict) -> None:
+    """
+    Start a chunked sharing/code_send transfer or resume it after reconnect, also after the user joined again.
+    The user gets sharing/transfer/ack with the indices of the chunks the server already has.
+    Args:
+        sid (str): The session ID of the user.
+        data (dict): The manifest containing 'room_id', 'transfer_id', 'size' (characters of the JSON encoded files)
+            and 'chunks' (count of the chunks).
+    """
+    event = 'sharing/transfer/start'
+
+    if not await utils.validate_data(data, 'room_id', 'transfer_id', 'size', 'chunks'):
+        return
+
+    transfer_id, size, chunks_count = data.get('transfer_id'), data.get('size'), data.get('chunks')
+    if not isinstance(transfer_id, str) or not isinstance(size, int) or not isinstance(chunks_count, int):
+        await utils.handle_bad_request(f'Event: {event}. Invalid manifest: {data}')
+        return
+    if (found := await get_room_and_user(sid, data, event)) is None:
+        return
+    room, user = found
+
+    transfer = room.transfers.get(transfer_id)
+    if transfer is not None and transfer.user_id not in (None, user.uid):
+        await utils.handle_bad_request(f'Event: {event}. Transfer {transfer_id} belongs to another user')
+        return
+    if transfer is None or transfer.is_expired:
+        try:
+            transfer = ChunkedTransfer(transfer_id, user.uid, size, chunks_count)
+        except TransferError as e:
+            await utils.handle_bad_request(f'Event: {event}. {e}')
+            return
+    else:
+        transfer.attach(user.uid)
+    room.add_transfer(transfer)
+
+    await sio.emit('sharing/transfer/ack', data={'transfer_id': transfer_id, 'received': transfer.received}, to=sid)
+    logger.debug(f'User {user.uid} started transfer {transfer_id}', extra={'sid': sid})
+
+
+async def transfer_chunk(sid: str, data: dict) -> None:
+    """
+    Save a chunk of the transfer and send the progress to the host.
+    When all chunks are received, the files are handled as sharing/code_send and the user gets sharing/transfer/done.
+    Args:
+        sid (str): The session ID of the user.
+        data (dict): The data containing 'room_id', 'transfer_id', 'index' and 'data' of the chunk.
+    """
+    event = 'sharing/transfer/chunk'
+
+    if not await utils.validate_data(data, 'room_id', 'transfer_id', 'index', 'data'):
+        return
+    if (found := await get_room_and_user(sid, data, event)) is None:
+        return
+    room, user = found
+
+    transfer_id, index, chunk = data.get('transfer_id'), data.get('index'), data.get('data')
+    transfer = room.transfers.get(transfer_id)
+    try:
+        if transfer is None or transfer.user_id != user.uid:
+            raise TransferError(f'Transfer {transfer_id} is not started')
+        if not isinstance(index, int) or not isinstance(chunk, str):
+            raise TransferError('Chunk index should be an integer and data a string')
+        transfer.add(index, chunk)
+    except TransferError as e:
+        await utils.handle_bad_request(f'Event: {event}. {e}')
+        return
+
+    if room.is_subscribed(user.uid):
+        progress = {
+            'user_id': user.uid,
+            'transfer_id': transfer_id,
+            'received': transfer.received_count,
+            'total': len(transfer.chunks),
+        }
+        await sio.emit('sharing/transfer/progress', data=progress, to=room.host.sid)
+    # popped once, a resent last chunk may find the transfer finished while the progress was sent
+    if not transfer.is_complete or room.transfers.pop(transfer_id, None) is None:
+        return
+    try:
+        files = await load_files(transfer.assemble())
+    except ValueError as e:
+        await utils.handle_bad_request(f'Event: {event}. Transfer {transfer_id} is not a valid JSON: {e}')
+        return
+    except TaskTimeoutError as e:
+        await utils.handle_bad_request(f'Event: {event}. {e}')
+        return
+    await sio.emit('sharing/transfer/done', data={'transfer_id': transfer_id}, to=sid)
+    await send_sharing_code(sid, {'room_id': room.rid, 'files': files}, command='code_send')
@@ -106,6 +106,20 @@ class Utils:
             self.logger.debug('Test room created with id: %s', test_room.rid)
 
 
+def parse_features(data: dict) -> set[str]:
+    """
+    Get the optional protocol features supported by the client, e.g. ['diff'].
+    Args:
+        data (dict): The data containing 'features'.
+    Returns:
+        set[str]: The features, empty for clients that do not send them.
+    """
+    features = data.get('features')
+    if not isinstance(features, list):
+        return set()
+    return {feature for feature in features if isinstance(feature, str)}
+
+
 def parse_files_to_ignore(data: str) -> dict[str : list[str]]:
     """
     Parses a string with names and break lines to ignore and returns a dictionary
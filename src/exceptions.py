@@ -4,3 +4,27 @@ class UserNotFoundError(Exception):
 
 class RoomNotFoundError(Exception):
     pass
+
+
+class VersionConflictError(Exception):
+    pass
+
+
+class TransferError(Exception):
+    pass
+
+
+class AIRequestError(Exception):
+    pass
+
+
+class AIJobCancelledError(AIRequestError):
+    pass
+
+
+class NotionError(Exception):
+    pass
+
+
+class TaskTimeoutError(Exception):
+    pass
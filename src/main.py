@@ -12,6 +12,7 @@ from src.events.room import register_room_events
 from src.events.settings import register_settings_events
 from src.events.sharing_code import register_sharing_code_events
 from src.events.steps import register_steps_events
+from src.events.transfer import register_transfer_events
 
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -24,6 +25,7 @@ register_connection_events()
 register_room_events()
 register_settings_events()
 register_sharing_code_events()
+register_transfer_events()
 register_messages_events()
 register_steps_events()
 register_ai_events()
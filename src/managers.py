@@ -1,5 +1,9 @@
+from collections import Counter
+from itertools import islice
+
+from src.config import ADMIN_PAGE_LIMIT
 from src.exceptions import RoomNotFoundError, UserNotFoundError
-from src.models import Room, User
+from src.models import Room, StatusEnum, User
 
 
 class RoomManager:
@@ -40,12 +44,21 @@ class RoomManager:
         except KeyError:
             raise RoomNotFoundError() from None
 
-    def get_rooms_log(self) -> dict[str, int | list[dict]]:
+    def get_rooms_count(self) -> int:
+        return len(self._rooms)
+
+    def get_rooms_log(self, offset: int = 0, limit: int = ADMIN_PAGE_LIMIT) -> dict[str, int | list[dict]]:
+        """
+        Get a page of rooms in order of creation.
+        Args:
+            offset (int): The number of rooms to skip.
+            limit (int): The max number of rooms to return.
+        """
         return {
             'total_rooms_count': len(self._rooms),
             'rooms': [
                 {'room_id': room.rid, 'users_count': len(room.users), 'host_id': room.host.uid}
-                for room in self._rooms.values()
+                for room in islice(self._rooms.values(), offset, offset + limit)
             ],
         }
 
@@ -65,21 +78,32 @@ class UserManager:
     def __init__(self):
         self._id = 100
         self._users = {}
+        self._counters: Counter[tuple[str, StatusEnum]] = Counter()  # users count by (role, status)
 
     def __repr__(self):
         return f'<{self.__class__.__name__}, users count: {len(self._users)}>'
 
     def create_user(self, sid: str, **kwargs) -> User:
         user = User(sid, self._id, **kwargs)
+        if sid in self._users:
+            self._counters[(self._users[sid].role, self._users[sid].status)] -= 1
         self._users[sid] = user
+        self._counters[(user.role, user.status)] += 1
         self._id += 1
         return user
 
     def delete_user(self, sid: str) -> None:
         try:
-            del self._users[sid]
+            user = self._users.pop(sid)
         except KeyError:
             raise UserNotFoundError() from None
+        self._counters[(user.role, user.status)] -= 1
+
+    def set_user_status(self, user: User, status: StatusEnum) -> None:
+        if self._users.get(user.sid) is user:
+            self._counters[(user.role, user.status)] -= 1
+            self._counters[(user.role, status)] += 1
+        user.status = status
 
     def get_user_by_sid(self, sid: str) -> User:
         try:
@@ -97,8 +121,54 @@ class UserManager:
         except KeyError:
             raise UserNotFoundError() from None
 
-    def get_all_users(self) -> list[User]:
-        return list(self._users.values())
+    def count_users(self, status: StatusEnum | None = None, role: str | None = None) -> int:
+        """Count users with the given status and role using the maintained counters."""
+        return sum(
+            count
+            for (user_role, user_status), count in self._counters.items()
+            if (status is None or user_status == status) and (role is None or user_role == role)
+        )
+
+    def get_users_overview(self) -> dict[str, int | dict[str, int]]:
+        roles, statuses = Counter(), Counter()
+        for (role, status), count in self._counters.items():
+            roles[role] += count
+            statuses[status.value] += count
+        return {'total_users_count': len(self._users), 'roles': dict(roles), 'statuses': dict(statuses)}
+
+    def get_users_log(
+        self,
+        room: Room | None = None,
+        status: StatusEnum | None = None,
+        role: str | None = None,
+        offset: int = 0,
+        limit: int = ADMIN_PAGE_LIMIT,
+    ) -> dict[str, int | list[dict]]:
+        """
+        Get a page of users filtered by room, status and role.
+        Args:
+            room (Room | None): Only users of this room.
+            status (StatusEnum | None): Only users with this status.
+            role (str | None): Only users with this role ('host' or 'client').
+            offset (int): The number of matching users to skip.
+            limit (int): The max number of users to return.
+        """
+        users = room.users.values() if room else self._users.values()
+        matched = (
+            user for user in users if (status is None or user.status == status) and (role is None or user.role == role)
+        )
+        if room:
+            matched = list(matched)
+            users_count = len(matched)
+        else:
+            users_count = self.count_users(status, role)
+        return {
+            'users_count': users_count,
+            'users': [
+                {'id': user.uid, 'name': user.name, 'room': user.room, 'role': user.role, 'status': user.status.value}
+                for user in islice(matched, offset, offset + limit)
+            ],
+        }
 
 
 user_manager = UserManager()
@@ -2,13 +2,35 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
+from src.classes.ignore import IgnoreMatcher
+from src.classes.progress import ProgressLog
+from src.classes.search import SearchIndex
+from src.classes.sharing import DocumentStore, SharedDocument
+from src.classes.similarity import SimilarityIndex
+from src.classes.transfer import ChunkedTransfer
 from src.exceptions import UserNotFoundError
 
 
 class Room:
     """Room Class"""
 
-    __slots__ = ('rid', 'host', 'users', 'usernames', 'settings', 'steps', 'exercise')
+    __slots__ = (
+        'rid',
+        'host',
+        'users',
+        'usernames',
+        'settings',
+        'ignore',
+        'steps',
+        'progress',
+        'documents',
+        'subscriptions',
+        'similarity',
+        'search',
+        'transfers',
+        'version',
+        'exercise',
+    )
 
     def __init__(self, room_id: int, host: 'User'):
         self.rid = room_id
@@ -16,12 +38,32 @@ class Room:
         self.users: dict[int, User] = {host.uid: host}
         self.usernames: list[str] = []
         self.settings: dict[str : list[str]] = {}
+        self.ignore: IgnoreMatcher = IgnoreMatcher()  # compiled settings, applied to the shared code
         self.steps: list[dict[str, str]] = []
+        self.progress: ProgressLog = ProgressLog()
+        self.documents: DocumentStore = DocumentStore()  # shared code by user id
+        self.subscriptions: set[int] = set()  # ids of users whose code the host is viewing
+        self.similarity: SimilarityIndex = SimilarityIndex()  # near-duplicate shared code
+        self.search: SearchIndex = SearchIndex()  # messages and shared code
+        self.transfers: dict[str, ChunkedTransfer] = {}  # unfinished chunked sharing/code_send by transfer id
+        self.version: int = 0  # incremented on every change of the users list or their steps
         self.exercise: str = ''  # deprecated from the v1.1.0
 
     def __repr__(self):
         return f'<{self.__class__.__name__} {self.rid}, users count: {len(self.users)}>'
 
+    @property
+    def stats_version(self) -> str:
+        return f'{self.version}.{self.progress.version}'
+
+    def set_settings(self, settings: dict[str : list[str]]) -> None:
+        """Compile the ignore matcher, then save the settings with it, re.error of an invalid glob keeps both."""
+        self.ignore = IgnoreMatcher(settings)
+        self.settings = settings
+
+    def touch(self) -> None:
+        self.version += 1
+
     def serialize_users(self) -> list[dict[str, ...]]:
         return [user.serialize() for user in self.users.values() if user.status != StatusEnum.OFFLINE]
 
@@ -43,6 +85,26 @@ class Room:
 
     def add_user_to_room(self, user: 'User') -> None:
         self.users[user.uid] = user
+        self.touch()
+
+    def get_document(self, user_id: int) -> SharedDocument:
+        return self.documents.get_or_create(user_id)
+
+    def get_transfer(self, user_id: int) -> ChunkedTransfer | None:
+        return next((transfer for transfer in self.transfers.values() if transfer.user_id == user_id), None)
+
+    def add_transfer(self, transfer: ChunkedTransfer) -> None:
+        """Save a new transfer instead of the unfinished one of its user and drop the expired ones."""
+        self.transfers = {
+            transfer_id: other
+            for transfer_id, other in self.transfers.items()
+            if other.user_id != transfer.user_id and not other.is_expired
+        }
+        self.transfers[transfer.transfer_id] = transfer
+
+    def is_subscribed(self, user_id: int) -> bool:
+        """Check if the host should get the shared code of the user, hosts without 'subscribe' feature get all."""
+        return 'subscribe' not in self.host.features or user_id in self.subscriptions
 
     def remove_user_from_room(self, user_id: int) -> None:
         try:
@@ -50,6 +112,12 @@ class Room:
             user.room = None
             self.usernames.remove(user.name)
             del self.users[user_id]
+            self.documents.discard(user_id)
+            self.subscriptions.discard(user_id)
+            self.search.discard_user(user_id)
+            if transfer := self.get_transfer(user_id):
+                transfer.detach()  # kept for the user joining again
+            self.touch()
         except (KeyError, ValueError):
             raise UserNotFoundError() from None
 
@@ -69,7 +137,7 @@ class SignalEnum(Enum):
 class User:
     """User Class"""
 
-    __slots__ = ('sid', 'uid', 'name', 'room', 'role', 'status', 'steps', 'messages', 'signal')
+    __slots__ = ('sid', 'uid', 'name', 'room', 'role', 'status', 'steps', 'messages', 'features', 'signal')
 
     def __init__(
         self,
@@ -89,6 +157,7 @@ class User:
         self.status: StatusEnum = status
         self.steps: dict[str:str] = {}
         self.messages: list[Message] = []
+        self.features: set[str] = set()  # optional protocol features supported by the client, e.g. 'diff'
         self.signal: SignalEnum = signal  # deprecated from the v1.1.0
 
     def __repr__(self):
@@ -1,51 +1,149 @@
+import asyncio
 import json
+import os
 import re
+import time
+from pathlib import Path
 from urllib.parse import urlparse
 
-import aiohttp
-from pydantic import BaseModel
+import orjson
+from dotenv import load_dotenv
 
+from src.classes.ai_cache import ResponseCache
+from src.classes.executor import executor_service
+from src.classes.http_client import http_client
+from src.classes.single_flight import SingleFlight
+from src.config import (
+    NOTION_BATCH_SIZE,
+    NOTION_CACHE_FRESH,
+    NOTION_CACHE_SIZE,
+    NOTION_CACHE_TTL,
+    NOTION_CHUNK_LIMIT,
+    NOTION_CONCURRENCY,
+    NOTION_MAX_CHUNKS,
+    NOTION_OFFLOAD_BLOCKS,
+)
+from src.exceptions import NotionError
 
-class Block(BaseModel):
-    type_: list | str | None
-    properties: dict | list | None
+load_dotenv(Path(__file__).parent.parent.parent / '.env')
 
+NOTION_API_URL = 'https://{domain}/api/v3'
 
-async def scrape(domain: str, page_id: str) -> dict[str, str]:
+# Parsed exercises by page id: {'last_edited_time', 'exercises'}, kept in NOTION_CACHE_PATH between restarts
+notion_cache = ResponseCache(NOTION_CACHE_SIZE, NOTION_CACHE_TTL, os.getenv('NOTION_CACHE_PATH'))
+notion_flights = SingleFlight()  # concurrent imports of one page share one fetch
+checked_at: dict[str, float] = {}  # when the cached exercises of the page were last revalidated
+
+
+async def post_notion(url: str, payload: dict) -> dict:
+    async with http_client.post(
+            url, data=json.dumps(payload), headers={'Content-Type': 'application/json'},
+    ) as response:
+        if response.status == 200:
+            return await response.json(loads=orjson.loads)
+        raise NotionError(f'Could not connect to Notion, status: {response.status}, reason: {response.reason}')
+
+
+async def get_last_edited_time(api_url: str, page_id: str) -> int | None:
+    """Get the last edit time of the page in ms, the page changes when any of its blocks is edited."""
+    payload = {"requests": [{"pointer": {"table": "block", "id": page_id}, "version": -1}]}
+    data = await post_notion(f'{api_url}/syncRecordValues', payload)
+    value = data.get('recordMap', {}).get('block', {}).get(page_id, {}).get('value') or {}
+    return value.get('last_edited_time')
+
+
+async def load_page_chunks(api_url: str, page_id: str) -> dict[str, dict]:
+    """Load the blocks of the page chunk by chunk, following the cursor until Notion returns an empty one."""
+    blocks = {}
+    cursor = {"stack": []}
+    for chunk_number in range(NOTION_MAX_CHUNKS):
+        payload = {
+            "page": {
+                "id": page_id,
+            },
+            "limit": NOTION_CHUNK_LIMIT,
+            "cursor": cursor,
+            "chunkNumber": chunk_number,
+            "verticalColumns": False,
+        }
+        data = await post_notion(f'{api_url}/loadPageChunk', payload)
+        blocks.update(data.get('recordMap', {}).get('block', {}))
+        cursor = data.get('cursor') or {}
+        if not cursor.get('stack'):
+            break
+    return blocks
+
+
+def walk_blocks(blocks: dict[str, dict], page_id: str) -> tuple[list[str], list[str]]:
+    """
+    Walk the content of the page depth-first, not entering child pages.
+
+    Returns:
+        tuple[list[str], list[str]]: The ids of the loaded blocks in the page order and the ids of the missing ones.
+    """
+    ordered, missing = [], []
+    seen = set()
+    stack = [page_id]
+    while stack:
+        block_id = stack.pop()
+        if block_id in seen:
+            continue
+        seen.add(block_id)
+        if block_id not in blocks:
+            missing.append(block_id)
+            continue
+        ordered.append(block_id)
+        value = blocks[block_id].get('value') or {}
+        if block_id == page_id or value.get('type') != 'page':
+            stack.extend(reversed(value.get('content') or []))
+    return ordered, missing
+
+
+async def load_missing_blocks(api_url: str, blocks: dict[str, dict], page_id: str) -> None:
+    """Load the blocks of the page content which the chunks did not contain, NOTION_CONCURRENCY batches at once."""
+    semaphore = asyncio.Semaphore(NOTION_CONCURRENCY)
+
+    async def load(block_ids: list[str]) -> dict[str, dict]:
+        payload = {
+            "requests": [{"pointer": {"table": "block", "id": block_id}, "version": -1} for block_id in block_ids],
+        }
+        async with semaphore:
+            data = await post_notion(f'{api_url}/syncRecordValues', payload)
+        return data.get('recordMap', {}).get('block', {})
+
+    requested = set()
+    _, missing = walk_blocks(blocks, page_id)
+    while missing:  # the loaded blocks may have missing children too
+        requested.update(missing)
+        batches = [missing[i:i + NOTION_BATCH_SIZE] for i in range(0, len(missing), NOTION_BATCH_SIZE)]
+        for loaded in await asyncio.gather(*(load(batch) for batch in batches)):
+            blocks.update({block_id: block for block_id, block in loaded.items() if block.get('value')})
+        missing = [block_id for block_id in walk_blocks(blocks, page_id)[1] if block_id not in requested]
+
+
+async def scrape(domain: str, page_id: str) -> dict:
     """
     Scrapes data from a Notion page using the Notion API.
 
+    All chunks of the page are loaded, then the blocks of the page content missing from them.
+
     Args:
         domain (str): The domain of the Notion workspace.
         page_id (str): The ID of the page to scrape.
     Returns:
-        dict[str, str]: The scraped data if successful, or an error dictionary if unsuccessful.
+        dict: The scraped data if successful, or an error dictionary if unsuccessful.
     """
-    url = f'https://{domain}/api/v3/loadPageChunk'
-    payload = {
-        "page": {
-            "id": page_id,
-        },
-        "limit": 50,
-        "cursor": {
-            "stack": [],
-        },
-        "chunkNumber": 0,
-        "verticalColumns": False,
-    }
+    api_url = NOTION_API_URL.format(domain=domain)
     try:
-        async with aiohttp.ClientSession() as session:  # noqa SIM117
-            async with session.post(
-                    url, data=json.dumps(payload), headers={'Content-Type': 'application/json'},
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                return {
-                    "error": f'Could not connect to Notion, status: {response.status}, reason: {response.reason}',
-                }
+        blocks = await load_page_chunks(api_url, page_id)
+        await load_missing_blocks(api_url, blocks, page_id)
+    except NotionError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f'Could not connect to Notion to parse tasks with id: {page_id}! Error: {str(e)}'}
 
+    return {"recordMap": {"block": blocks}}
+
 
 def extract_domain_and_page_id_from_url(url: str) -> dict[str, str]:
     """
@@ -79,47 +177,48 @@ def extract_domain_and_page_id_from_url(url: str) -> dict[str, str]:
         return {'message': f'Could not extract domain and page_id from url: {url}. Error: {str(e)}'}
 
 
-async def parse_exercises(data: dict) -> list[str]:
+async def parse_exercises(data: dict, page_id: str | None = None) -> list[str]:
     """
-    Parse the exercises from the given data dictionary.
+    Parse the exercises from the given data dictionary, a page of NOTION_OFFLOAD_BLOCKS blocks or more
+    is parsed in the process pool.
 
     Args:
         data (dict): The data dictionary containing exercise blocks.
+        page_id (str | None): The page whose content is walked in the document order,
+            without it the blocks are taken in the order of the dictionary.
 
     Returns:
         list[str]: The parsed exercises as a list of strings.
     """
-    filtered_data: list[Block] = [
-        Block(type_=item['type'], properties=item.get('properties', {}))
-        for item in [
-            data['block'][block]['value']
-            for block in data['block']
-            if (
-                    'properties' in data['block'][block]['value'] and
-                    data['block'][block]['value'].get('type') != 'page' or
-                    data['block'][block]['value'].get('type') == 'divider'
-            )
-        ]
-    ]
+    if len(data['block']) >= NOTION_OFFLOAD_BLOCKS:
+        return await executor_service.run_in_process(build_exercises, data, page_id)
+    return build_exercises(data, page_id)
+
+
+def build_exercises(data: dict, page_id: str | None = None) -> list[str]:
+    """Build the HTML of the exercises in one pass over the blocks, see parse_exercises."""
+    blocks = data['block']
+    block_ids = walk_blocks(blocks, page_id)[0] if page_id in blocks else blocks
     all_tasks = []
     task = []
-    for block in filtered_data:
-        title = block.properties.get('title')
-        if title and 'header' in block.type_:
-            task.append('<h3>' + title[0][0] + '</h3>')
-        elif title and 'code' in block.type_:
-            task.append('<pre class="ql-syntax">' + title[0][0] + '</pre>')
-        elif block.type_ == 'divider':
+    for block_id in block_ids:
+        value = blocks[block_id]['value']
+        block_type = value['type']
+        if block_type == 'divider':
             all_tasks.append(''.join(task))
             task = []
-        elif title:
-            text = []
-            for i in title:
-                if isinstance(i, str):
-                    text.append(i)
-                else:
-                    text.append(i[0])
-            task.append(''.join(text) + '<br>')
+            continue
+        if block_type == 'page' or 'properties' not in value:
+            continue
+        title = value['properties'].get('title')
+        if not title:
+            continue
+        if 'header' in block_type:
+            task.append('<h3>' + title[0][0] + '</h3>')
+        elif 'code' in block_type:
+            task.append('<pre class="ql-syntax">' + title[0][0] + '</pre>')
+        else:
+            task.append(''.join(i if isinstance(i, str) else i[0] for i in title) + '<br>')
 
     all_tasks.append(''.join(task))
     return all_tasks
@@ -142,12 +241,41 @@ async def get_exercises_from_notion(link: str) -> list[str] | dict[str, str]:
 
     domain = extracted_data.get('domain')
     page_id = extracted_data.get('page_id')
+    return await notion_flights.do(f'{domain}/{page_id}', lambda: import_exercises(link, domain, page_id))
+
+
+async def import_exercises(link: str, domain: str, page_id: str) -> list[str] | dict[str, str]:
+    """
+    Get the exercises of the page from notion_cache, or scrape and parse them.
+
+    Cached exercises are returned at once within NOTION_CACHE_FRESH seconds after the last check,
+    later they are returned while the last edit time of the page is unchanged or Notion is unreachable.
+    The page is cached by the domain too, a page id in a link to another host must not replace the lesson.
+    """
+    key = f'{domain}/{page_id}'
+    cached = notion_cache.get(key)
+    if cached is not None:
+        if time.monotonic() - checked_at.get(key, 0) < NOTION_CACHE_FRESH:
+            return cached['exercises']
+        try:
+            last_edited_time = await get_last_edited_time(NOTION_API_URL.format(domain=domain), page_id)
+        except Exception:
+            last_edited_time = cached['last_edited_time']  # serve the cached exercises while Notion is down
+        if last_edited_time == cached['last_edited_time']:
+            checked_at[key] = time.monotonic()
+            return cached['exercises']
 
     data: dict = await scrape(domain, page_id)
     if error := data.get('error'):
         return {'message': error}
     try:
         records = data.get('recordMap')
-        return await parse_exercises(records)
+        exercises = await parse_exercises(records, page_id)
     except Exception as e:
         return {'message': f'Could not parse exercises from Notion: {link}. Error: {str(e)}'}
+
+    page = records['block'].get(page_id, {}).get('value') or {}
+    if page.get('last_edited_time') is not None:
+        notion_cache.set(key, {'last_edited_time': page['last_edited_time'], 'exercises': exercises})
+        checked_at[key] = time.monotonic()
+    return exercises
@@ -1,15 +1,201 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import secrets
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
+from typing import Annotated
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.requests import Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.templating import Jinja2Templates
 
+from src.classes.ai_cache import ai_cache
+from src.classes.ai_router import ai_router
+from src.classes.executor import executor_service
+from src.classes.http_client import http_client
+from src.classes.prompt import prompt_budget
+from src.classes.relay import code_relay
+from src.classes.scheduler import ai_scheduler
+from src.config import ADMIN_PAGE_LIMIT, EXPORT_CHUNK_ROWS, STATS_CACHE_SIZE
 from src.exceptions import RoomNotFoundError
-from src.managers import room_manager
+from src.managers import room_manager, user_manager
+from src.models import Room, StatusEnum
+
+
+async def startup() -> None:
+    """Open the shared outbound HTTP session, called by the socketio ASGIApp on the application startup."""
+    await http_client.start()
+
+
+async def shutdown() -> None:
+    """
+    Close the shared outbound HTTP session, write the pending AI cache responses and stop the executor pools,
+    called by the socketio ASGIApp on the application shutdown.
+    """
+    await http_client.close()
+    await ai_cache.flush()
+    executor_service.shutdown()
+
 
 fast_app = FastAPI()
 templates = Jinja2Templates(directory=str(Path(__file__).parent / 'templates'))
+basic_auth = HTTPBasic(auto_error=False)
+
+# room_id -> {'version': ..., 'data': ..., 'json': ..., 'html': ...}, least recently used first
+stats_cache: OrderedDict[int, dict] = OrderedDict()
+
+
+def build_room_stats(room: Room) -> list[dict]:
+    return [
+        {
+            'username': user.name,
+            'steps': dict(user.steps),
+            'result': round(
+                sum(1 for step in user.steps.values() if step in ['DONE', 'ACCEPTED']) / len(user.steps) * 100,
+            ),
+        }
+        for user in room.users.values()
+        if user.steps
+    ]
+
+
+def get_cached_stats(room: Room) -> dict:
+    """
+    Get the statistics of the room from the cache, rebuild them if the room has changed since the last call.
+    Args:
+        room (Room): The room.
+    Returns:
+        dict: The cache entry with the stats version, the data and rendered JSON/HTML (None until requested).
+    """
+    entry = stats_cache.get(room.rid)
+    if entry is None or entry['version'] != room.stats_version:
+        entry = {'version': room.stats_version, 'data': build_room_stats(room), 'json': None, 'html': None}
+        stats_cache[room.rid] = entry
+        if len(stats_cache) > STATS_CACHE_SIZE:
+            stats_cache.popitem(last=False)
+    stats_cache.move_to_end(room.rid)
+    return entry
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag in tags or '*' in tags
+
+
+def cached_response(request: Request, content: bytes | str, etag: str, media_type: str) -> Response:
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def check_admin(credentials: Annotated[HTTPBasicCredentials | None, Depends(basic_auth)]) -> None:
+    """
+    Require the socket admin credentials for the admin endpoints and the room exports.
+    Without configured credentials the access is denied, unless ADMIN_AUTH_DISABLED=1 opens it explicitly.
+    """
+    if os.getenv('ADMIN_AUTH_DISABLED') == '1':
+        return
+    username, password = os.getenv('SOCKET_ADMIN_USERNAME'), os.getenv('SOCKET_ADMIN_PASSWORD')
+    if not username or not password:
+        raise HTTPException(status_code=403, detail='Admin credentials are not configured')
+    if (
+        credentials is None
+        or not secrets.compare_digest(credentials.username.encode(), username.encode())
+        or not secrets.compare_digest(credentials.password.encode(), password.encode())
+    ):
+        raise HTTPException(status_code=401, headers={'WWW-Authenticate': 'Basic'})
+
+
+EXPORT_FIELDS = ('type', 'user_id', 'username', 'step', 'status', 'sender', 'receiver', 'content', 'created_at')
+
+
+def iter_room_records(room: Room) -> Iterator[dict]:
+    """
+    Yield step results and messages of every user in the room one record at a time.
+    Lists are walked up to their length at the moment the user is reached, so records appended during the export
+    are skipped instead of breaking the iteration.
+    """
+    for user in list(room.users.values()):
+        for step, status in list(user.steps.items()):
+            yield {'type': 'step', 'user_id': user.uid, 'username': user.name, 'step': step, 'status': status}
+        messages = user.messages
+        for index in range(len(messages)):
+            message = messages[index]
+            yield {
+                'type': 'message',
+                'user_id': user.uid,
+                'username': user.name,
+                **message.serialize(),
+            }
+
+
+async def stream_room_export(room: Room, export_format: str) -> AsyncIterator[str]:
+    """
+    Encode room records as CSV or JSON Lines in chunks of EXPORT_CHUNK_ROWS rows,
+    giving control back to the event loop between the chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    if export_format == 'csv':
+        writer.writeheader()
+
+    for count, record in enumerate(iter_room_records(room), 1):
+        if export_format == 'csv':
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            await asyncio.sleep(0)
+    yield buffer.getvalue()
+
+
+def export_response(room_id: int, export_format: str, media_type: str) -> StreamingResponse:
+    try:
+        room = room_manager.get_room_by_id(room_id)
+    except RoomNotFoundError:
+        raise HTTPException(status_code=404, detail=f'Room # {room_id} not found!') from None
+    return StreamingResponse(
+        stream_room_export(room, export_format),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="room_{room_id}.{export_format}"'},
+    )
+
+
+@fast_app.get('/export/{room_id}.csv', dependencies=[Depends(check_admin)])
+async def export_csv(room_id: int):
+    return export_response(room_id, 'csv', 'text/csv')
+
+
+@fast_app.get('/export/{room_id}.jsonl', dependencies=[Depends(check_admin)])
+async def export_jsonl(room_id: int):
+    return export_response(room_id, 'jsonl', 'application/jsonl')
+
+
+@fast_app.get('/api/roomstats/{room_id}')
+async def stats_api(request: Request, room_id: int):
+    try:
+        room = room_manager.get_room_by_id(room_id)
+    except RoomNotFoundError:
+        raise HTTPException(status_code=404, detail=f'Room # {room_id} not found!') from None
+
+    entry = get_cached_stats(room)
+    if entry['json'] is None:
+        entry['json'] = json.dumps({'room_id': room_id, 'users': entry['data']}, ensure_ascii=False).encode()
+    etag = f'"{room_id}-{entry["version"]}-json"'
+    return cached_response(request, entry['json'], etag, 'application/json')
 
 
 @fast_app.get('/roomstats/{room_id}', response_class=HTMLResponse)
@@ -22,25 +208,52 @@ async def stats(request: Request, room_id: int):
             {'request': request, 'message': f'Room # {room_id} not found!'},
             status_code=404,
         )
-    data = [
-        {
-            'username': user.name,
-            'steps': user.steps,
-            'result': round(
-                sum(1 for step in user.steps.values() if step in ['DONE', 'ACCEPTED']) / len(user.steps) * 100,
-            ),
-        }
-        for user in room.users.values()
-        if user.steps
-    ]
-    if not data:
+    entry = get_cached_stats(room)
+    if not entry['data']:
         return templates.TemplateResponse(
             '404.html',
             {'request': request, 'message': f'There are no statistics for Room # {room_id} yet!'},
             status_code=404,
         )
 
-    return templates.TemplateResponse(
-        'stats.html',
-        {'request': request, 'room_id': room_id, 'data': data},
-    )
+    if entry['html'] is None:
+        entry['html'] = templates.get_template('stats.html').render(room_id=room_id, data=entry['data'])
+    etag = f'"{room_id}-{entry["version"]}-html"'
+    return cached_response(request, entry['html'], etag, 'text/html')
+
+
+@fast_app.get('/api/admin/overview', dependencies=[Depends(check_admin)])
+async def admin_overview():
+    return {
+        'total_rooms_count': room_manager.get_rooms_count(),
+        **user_manager.get_users_overview(),
+        'sharing': code_relay.get_metrics(),
+        'ai_cache': ai_cache.get_metrics(),
+        'ai_requests': ai_router.flights.get_metrics(),
+        'ai_backends': ai_router.get_metrics(),
+        'ai_prompts': prompt_budget.get_metrics(),
+        'executor': executor_service.get_metrics(),
+        'ai_scheduler': ai_scheduler.get_metrics(),
+    }
+
+
+@fast_app.get('/api/admin/rooms', dependencies=[Depends(check_admin)])
+async def admin_rooms(offset: int = Query(0, ge=0), limit: int = Query(ADMIN_PAGE_LIMIT, ge=1, le=ADMIN_PAGE_LIMIT)):
+    return room_manager.get_rooms_log(offset, limit)
+
+
+@fast_app.get('/api/admin/users', dependencies=[Depends(check_admin)])
+async def admin_users(
+    room_id: int | None = None,
+    status: StatusEnum | None = None,
+    role: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(ADMIN_PAGE_LIMIT, ge=1, le=ADMIN_PAGE_LIMIT),
+):
+    room = None
+    if room_id is not None:
+        try:
+            room = room_manager.get_room_by_id(room_id)
+        except RoomNotFoundError:
+            raise HTTPException(status_code=404, detail=f'Room # {room_id} not found!') from None
+    return user_manager.get_users_log(room, status, role, offset, limit)
@@ -1,6 +1,15 @@
+import os
+from pathlib import Path
+
 import pytest_asyncio
+from dotenv import load_dotenv
 from socketio import AsyncClient
 
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+# HTTP Basic credentials of the admin endpoints and the room exports, the server under test must have the same
+ADMIN_AUTH = (os.getenv('SOCKET_ADMIN_USERNAME', ''), os.getenv('SOCKET_ADMIN_PASSWORD', ''))
+
 
 async def client_generator():
     user = AsyncClient()
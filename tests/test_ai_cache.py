@@ -0,0 +1,50 @@
+import time
+
+from src.classes.ai_cache import ResponseCache, get_cache_key
+
+
+def test_cache_key_ignores_comments_and_formatting():
+    code = 'def add(x):\n    # add one\n    return x+1\n'
+    assert get_cache_key('Task', code) == get_cache_key(' Task ', 'def add(x):  # todo\n\n    return x + 1')
+    assert get_cache_key('Task', code) != get_cache_key('Task', 'def add(x):\n    return x+1\nreturn 2\n')
+    assert get_cache_key('Task', code) != get_cache_key('Other task', code)
+
+
+def test_response_cache(tmp_path):
+    path = str(tmp_path / 'ai_cache.jsonl')
+    cache = ResponseCache(max_size=2, ttl=60, path=path)
+    cache.set('a', {'status': True, 'content': 'A'})
+    cache.set('b', {'status': True, 'content': 'B'})
+    assert cache.get('a') == {'status': True, 'content': 'A'}
+    cache.set('c', {'status': True, 'content': 'C'})  # evicts the least recently used 'b'
+
+    assert cache.get('b') is None
+    assert cache.get_metrics() == {'size': 2, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5}
+
+    restored = ResponseCache(max_size=2, ttl=60, path=path)  # the latest stored responses are loaded
+    assert len(restored) == 2
+    assert restored.get('c') == {'status': True, 'content': 'C'}
+
+    expired = ResponseCache(ttl=0.01)
+    expired.set('a', {'status': True, 'content': 'A'})
+    time.sleep(0.02)
+    assert expired.get('a') is None
+
+
+async def test_response_cache_writes_in_batches(tmp_path):
+    """Test responses stored inside the event loop are written in the thread pool and the file is rewritten"""
+    path = tmp_path / 'ai_cache.jsonl'
+    cache = ResponseCache(max_size=2, ttl=60, path=str(path))
+    for key in 'abcd':
+        cache.set(key, {'status': True, 'content': key.upper()})
+    assert not path.exists()
+    await cache.flush()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 4  # one batch
+
+    cache.set('e', {'status': True, 'content': 'E'})
+    await cache.flush()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 3  # rewritten with 'd' and 'e', then appended
+    restored = ResponseCache(max_size=2, ttl=60, path=str(path))
+    assert restored.get('e') == {'status': True, 'content': 'E'}
+    assert restored.get('d') == {'status': True, 'content': 'D'}
+    assert restored.get('a') is None
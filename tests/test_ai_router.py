@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from src.classes.ai_cache import ResponseCache
+from src.classes.ai_router import UNAVAILABLE, AIRouter, Backend
+from src.classes.scheduler import AIScheduler
+from src.config import AI_BREAKER_COOLDOWN, AI_BREAKER_FAILURES
+from src.events import ai as ai_events
+from src.exceptions import AIRequestError
+
+
+def make_backend(name: str, delay: float, status: bool = True, calls: list | None = None) -> Backend:
+    async def request(data: dict) -> dict:
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        return {'status': status, 'content': f'{name}: {data["content"]}'}
+
+    return Backend(name, request)
+
+
+def make_stream_backend(name: str, parts: list[str], fail_after: int | None = None) -> Backend:
+    async def stream(data: dict):
+        for index, part in enumerate(parts):
+            if index == fail_after:
+                raise AIRequestError(f'{name} failed')
+            await asyncio.sleep(0)
+            yield part
+        if fail_after == len(parts):
+            raise AIRequestError(f'{name} failed')
+
+    return Backend(name, make_backend(name, 0).request, stream)
+
+
+async def test_router_hedges_slow_backend():
+    """Test a request slower than the p95 of its backend is hedged and the first answer wins"""
+    slow = make_backend('slow', 1)
+    slow.latencies.extend([0.01] * 20)
+    router = AIRouter([slow, make_backend('fast', 0.01)])
+
+    assert await router.get_solution({'content': 'Task', 'code': 'pass'}) == {'status': True, 'content': 'fast: Task'}
+    assert router.get_metrics()['hedged'] == 1
+    assert router.get_metrics()['backends']['fast']['requests'] == 1
+    assert router.get_metrics()['backends']['slow']['requests'] == 0  # cancelled
+
+
+async def test_router_failover_and_breaker():
+    """Test a failed answer goes to the next backend and a failing backend is skipped"""
+    calls = []
+    broken = make_backend('broken', 0, status=False, calls=calls)
+    router = AIRouter([broken, make_backend('spare', 0, calls=calls)])
+
+    for _ in range(AI_BREAKER_FAILURES):
+        assert (await router.get_solution({'content': 'Task', 'code': 'pass'}))['content'] == 'spare: Task'
+    assert broken.state == 'open'
+    assert router.get_metrics()['failovers'] == AI_BREAKER_FAILURES
+    assert router.get_metrics()['backends']['broken']['error_rate'] == 1.0
+
+    calls.clear()
+    await router.get_solution({'content': 'Task', 'code': 'pass'})
+    assert calls == ['spare']  # skipped while the breaker is open
+
+    broken.opened_at = time.monotonic() - AI_BREAKER_COOLDOWN
+    assert broken.allows()  # one trial request after the cooldown
+    assert not broken.allows()
+    broken.record(0.01, success=True)
+    assert broken.state == 'closed'
+
+    assert await AIRouter([]).get_solution({'content': 'Task', 'code': 'pass'}) == UNAVAILABLE
+
+
+async def test_router_keeps_half_open_fallback_trial():
+    """Test a half-open fallback not called because the primary answered keeps its trial request"""
+    calls = []
+    fallback = make_backend('fallback', 0, calls=calls)
+    fallback.opened_at = time.monotonic() - AI_BREAKER_COOLDOWN
+    router = AIRouter([make_backend('primary', 0, calls=calls), fallback])
+
+    assert (await router.get_solution({'content': 'Task', 'code': 'pass'}))['content'] == 'primary: Task'
+    assert calls == ['primary']
+    assert fallback.state == 'half_open'
+    assert not fallback.probing
+
+    router.backends.reverse()  # the trial request goes to the fallback now and closes its breaker
+    assert (await router.get_solution({'content': 'Task', 'code': 'pass'}))['content'] == 'fallback: Task'
+    assert fallback.state == 'closed'
+
+
+async def test_trimmed_request_joins_flight(monkeypatch: pytest.MonkeyPatch):
+    """Test a request trimmed to the prompt budget waits for the equal request in flight, not for a scheduler slot"""
+    calls = []
+    monkeypatch.setattr(ai_events, 'ai_router', AIRouter([make_backend('slow', 0.05, calls=calls)]))
+    monkeypatch.setattr(ai_events, 'ai_scheduler', AIScheduler(max_concurrency=1))
+    monkeypatch.setattr(ai_events, 'ai_cache', ResponseCache())
+    data = {'content': 'Task', 'code': '\n'.join(f'y{number} = {number}' for number in range(5000))}
+
+    first = asyncio.ensure_future(ai_events.solution_from_ai('sid0', data))
+    await asyncio.sleep(0.01)  # the first request is sent
+    await asyncio.gather(first, *(ai_events.solution_from_ai(f'sid{number}', data) for number in range(1, 3)))
+
+    assert calls == ['slow']
+    assert ai_events.ai_router.flights.get_metrics()['coalesced'] == 2
+
+
+async def test_router_streams_with_failover():
+    """Test a stream failing before its first part fails over and a stream failing after it is raised"""
+    broken = make_stream_backend('broken', ['never'], fail_after=0)
+    router = AIRouter([make_backend('no_stream', 0), broken, make_stream_backend('spare', ['Ваш ', 'код'])])
+
+    assert [text async for text in router.stream_solution({'content': 'Task', 'code': 'pass'})] == ['Ваш ', 'код']
+    assert router.get_metrics()['failovers'] == 1
+    assert broken.failures == 1
+
+    router = AIRouter([make_stream_backend('cut', ['Ваш ', 'код'], fail_after=1), make_stream_backend('spare', ['x'])])
+    parts = router.stream_solution({'content': 'Task', 'code': 'pass'})
+    assert await anext(parts) == 'Ваш '
+    with pytest.raises(AIRequestError, match='cut failed'):
+        await anext(parts)
+
+    parts = AIRouter([make_backend('no_stream', 0)]).stream_solution({'content': 'Task', 'code': 'pass'})
+    with pytest.raises(AIRequestError, match='unavailable'):
+        await anext(parts)
+
+
+async def test_stream_error_is_sent_to_student(monkeypatch: pytest.MonkeyPatch):
+    """Test a stream failing mid-way ends with solution/ai/error to the requesting student"""
+    emitted = []
+
+    async def emit(event: str, data: dict | None = None, to: str | None = None, **kwargs) -> None:
+        emitted.append((event, data, to))
+
+    router = AIRouter([make_stream_backend('cut', ['Ваш '], fail_after=1)])
+    monkeypatch.setattr(ai_events, 'ai_router', router)
+    monkeypatch.setattr(ai_events, 'ai_scheduler', AIScheduler())
+    monkeypatch.setattr(ai_events, 'ai_cache', ResponseCache())
+    monkeypatch.setattr(ai_events.sio, 'emit', emit)
+
+    await ai_events.solution_from_ai('sid', {'content': 'Task', 'code': 'pass', 'stream': True})
+
+    student_events = [(event, data) for event, data, to in emitted if to == 'sid']
+    assert student_events == [
+        ('solution/ai/chunk', {'content': 'Ваш '}),
+        ('solution/ai/error', {'content': 'cut failed'}),
+    ]
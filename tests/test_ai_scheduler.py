@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from src.classes.scheduler import AIScheduler
+from src.exceptions import AIJobCancelledError, AIRequestError
+
+
+async def test_scheduler_round_robin():
+    """Test the rooms take turns for the slots and at most max_concurrency requests run at once"""
+    scheduler = AIScheduler(max_concurrency=1, timeout=5)
+    release = asyncio.Event()
+    order = []
+
+    async def request(name: str) -> str:
+        order.append(name)
+        await release.wait()
+        return name
+
+    jobs = [asyncio.create_task(scheduler.run(1, 'a', lambda: request('first')))]
+    await asyncio.sleep(0)
+    jobs += [
+        asyncio.create_task(scheduler.run(1, f'a{number}', lambda n=number: request(f'1-{n}'))) for number in range(3)
+    ]
+    await asyncio.sleep(0)
+    jobs.append(asyncio.create_task(scheduler.run(2, 'b', lambda: request('2-0'))))
+    await asyncio.sleep(0)
+
+    assert scheduler.get_metrics()['running'] == 1
+    assert sorted(job.sid for job in scheduler.get_positions()) == ['a0', 'a1', 'a2', 'b']
+    release.set()
+    assert await asyncio.gather(*jobs) == ['first', '1-0', '1-1', '1-2', '2-0']
+    assert order == ['first', '1-0', '2-0', '1-1', '1-2']
+    assert scheduler.get_metrics()['completed'] == 5
+
+
+async def test_scheduler_timeout_and_cancel():
+    """Test a request fails after the timeout and the requests of a disconnected user are cancelled"""
+    scheduler = AIScheduler(max_concurrency=1, timeout=0.05)
+    with pytest.raises(AIRequestError, match='in time'):
+        await scheduler.run(1, 'a', lambda: asyncio.sleep(1))
+
+    scheduler.timeout = 5
+    running = asyncio.create_task(scheduler.run(1, 'a', lambda: asyncio.sleep(1)))
+    waiting = asyncio.create_task(scheduler.run(2, 'b', lambda: asyncio.sleep(0, 'b')))
+    await asyncio.sleep(0)
+    scheduler.cancel('a')
+    with pytest.raises(AIJobCancelledError):
+        await running
+    assert await waiting == 'b'
+    assert scheduler.get_metrics() == {
+        'running': 0,
+        'waiting': 0,
+        'rooms_waiting': 0,
+        'completed': 1,
+        'timed_out': 1,
+        'cancelled': 1,
+    }
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from src.classes import external_api
+from src.classes.external_api import ExternalAPIClient
+from src.classes.http_client import http_client
+from src.exceptions import AIRequestError
+
+
+async def start_stub(handler) -> tuple[web.AppRunner, str]:
+    stub = web.Application()
+    stub.router.add_post('/solution', handler)
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}/solution'
+
+
+async def collect_solution() -> list[str]:
+    return [text async for text in ExternalAPIClient.stream_solution({'content': 'Task', 'code': 'pass'})]
+
+
+async def test_stream_solution(monkeypatch: pytest.MonkeyPatch):
+    """Test the chunked answer of the external API is yielded part by part"""
+
+    async def streaming(request: web.Request) -> web.StreamResponse:
+        assert (await request.json())['stream'] is True
+        response = web.StreamResponse(headers={'Content-Type': 'text/plain; charset=utf-8'})
+        await response.prepare(request)
+        for part in ('Ваш ', 'код ', 'верный'):
+            await response.write(part.encode())
+            await asyncio.sleep(0.01)
+        await response.write_eof()
+        return response
+
+    async def not_streaming(request: web.Request) -> web.Response:
+        return web.json_response({'status': True, 'content': 'Весь ответ'})
+
+    async def failing(request: web.Request) -> web.Response:
+        return web.json_response({'status': False, 'content': 'Limit exceeded'})
+
+    async def failing_without_content(request: web.Request) -> web.Response:
+        return web.json_response({'status': False}, status=429)
+
+    try:
+        for handler, expected in ((streaming, ['Ваш ', 'код ', 'верный']), (not_streaming, ['Весь ответ'])):
+            runner, url = await start_stub(handler)
+            monkeypatch.setattr(external_api, 'url', url)
+            chunks = await collect_solution()
+            await runner.cleanup()
+            assert chunks == expected
+
+        runner, url = await start_stub(failing)
+        monkeypatch.setattr(external_api, 'url', url)
+        with pytest.raises(AIRequestError, match='Limit exceeded'):
+            await collect_solution()
+        await runner.cleanup()
+
+        runner, url = await start_stub(failing_without_content)
+        monkeypatch.setattr(external_api, 'url', url)
+        with pytest.raises(AIRequestError, match='response code: 429'):
+            await collect_solution()
+        await runner.cleanup()
+    finally:
+        await http_client.close()
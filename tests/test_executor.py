@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from src.classes.executor import ExecutorService
+from src.events.utils import parse_files_to_ignore
+from src.exceptions import TaskTimeoutError
+
+
+async def test_executor_runs_in_process():
+    service = ExecutorService(processes=1, threads=1, timeout=30)
+    try:
+        text = '\n'.join(['*.pyc', '/venv/', 'secret.txt'] * 1000)
+        assert await service.run_in_process(parse_files_to_ignore, text) == parse_files_to_ignore(text)
+    finally:
+        service.shutdown()
+    assert service.get_metrics()['process'] == {
+        'workers': 1,
+        'submitted': 1,
+        'pending': 0,
+        'completed': 1,
+        'failed': 0,
+        'timed_out': 0,
+        'cancelled': 0,
+    }
+
+
+async def test_executor_timeout_and_cancel():
+    """Test a slow task times out and a task waiting for the busy worker is not run after its timeout"""
+    service = ExecutorService(processes=1, threads=1, timeout=30)
+    release = threading.Event()
+    calls = []
+    try:
+        with pytest.raises(TaskTimeoutError, match='wait did not finish'):
+            await service.run_in_thread(release.wait, 5, timeout=0.05)
+        with pytest.raises(TaskTimeoutError, match='append did not finish'):
+            await service.run_in_thread(calls.append, 'queued', timeout=0.05)
+        release.set()
+        with pytest.raises(ZeroDivisionError):
+            await service.run_in_thread(divmod, 1, 0)
+        assert await service.run_in_thread(sum, [1, 2]) == 3
+    finally:
+        service.shutdown()
+
+    assert calls == []
+    metrics = service.get_metrics()['thread']
+    assert (metrics['timed_out'], metrics['failed'], metrics['completed'], metrics['pending']) == (2, 1, 1, 0)
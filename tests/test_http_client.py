@@ -0,0 +1,58 @@
+import asyncio
+
+from aiohttp import web
+
+from src.classes.executor import executor_service
+from src.classes.http_client import HTTPClient, http_client
+from src.components import app
+
+
+async def test_http_client_reuses_connections():
+    """Test requests to a local stub go through one session and reuse the kept-alive connection"""
+    peers = set()
+
+    async def handler(request: web.Request) -> web.Response:
+        peers.add(request.transport.get_extra_info('peername'))
+        return web.json_response(await request.json())
+
+    stub = web.Application()
+    stub.router.add_post('/echo', handler)
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    client = HTTPClient()
+    try:
+        await client.start()
+        session = client.get_session()
+        for number in range(5):
+            async with client.post(f'http://127.0.0.1:{port}/echo', json={'number': number}) as response:
+                assert await response.json() == {'number': number}
+        assert client.get_session() is session
+        assert len(peers) == 1
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    assert not client.is_open
+
+
+async def test_app_lifespan_opens_and_closes_session():
+    """Test the ASGI lifespan of the app opens the shared session and stops it and the executor on shutdown"""
+    messages = asyncio.Queue()
+    await messages.put({'type': 'lifespan.startup'})
+    sent = []
+
+    async def send(message: dict) -> None:
+        sent.append(message['type'])
+        if message['type'] == 'lifespan.startup.complete':
+            assert http_client.is_open
+            assert await executor_service.run_in_thread(sum, [1, 2]) == 3
+            await messages.put({'type': 'lifespan.shutdown'})
+
+    await app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, messages.get, send)
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert not http_client.is_open
+    assert not executor_service.is_running
@@ -0,0 +1,179 @@
+import asyncio
+import random
+import uuid
+
+import pytest_asyncio
+from aiohttp import web
+
+from src.classes.http_client import http_client
+from src.scraper import notion_scraper
+
+TASKS = 60
+LINES_PER_TASK = 9  # with the divider 600 blocks
+
+
+def make_page(number: int) -> tuple[str, dict[str, dict], list[str]]:
+    """Make a lesson page: tasks of a header, text lines and a toggle with nested code, split by dividers"""
+    page_id = str(uuid.UUID(int=number << 64))
+    blocks = {}
+    content = []
+    expected = []
+
+    def add(block_type: str, title: str | None = None, children: list[str] | None = None) -> str:
+        block_id = str(uuid.UUID(int=(number << 64) + len(blocks) + 1))
+        value = {'id': block_id, 'type': block_type}
+        if title is not None:
+            value['properties'] = {'title': [[title]]}
+        if children is not None:
+            value['content'] = children
+        blocks[block_id] = {'value': value}
+        return block_id
+
+    for task in range(TASKS):
+        content.append(add('header', f'Task {task}'))
+        content.extend(add('text', f'Line {task}.{line}') for line in range(LINES_PER_TASK - 3))
+        content.append(add('toggle', f'Hint {task}', children=[add('code', f'print({task})')]))
+        content.append(add('divider'))
+        lines = ''.join(f'Line {task}.{line}<br>' for line in range(LINES_PER_TASK - 3))
+        expected.append(f'<h3>Task {task}</h3>{lines}Hint {task}<br><pre class="ql-syntax">print({task})</pre>')
+    expected.append('')
+    blocks[page_id] = {'value': {'id': page_id, 'type': 'page', 'content': content, 'last_edited_time': 1}}
+    return page_id, blocks, expected
+
+
+class NotionStub:
+    """Local Notion API serving the pages in shuffled chunks, every tenth block only by syncRecordValues"""
+
+    def __init__(self):
+        self.blocks: dict[str, dict] = {}
+        self.chunks: dict[str, list[str]] = {}
+        self.requests = {'loadPageChunk': 0, 'syncRecordValues': 0}
+        self.runner: web.AppRunner | None = None
+        self.port = 0
+
+    def add_page(self, number: int) -> tuple[str, list[str]]:
+        page_id, blocks, expected = make_page(number)
+        self.blocks.update(blocks)
+        ids = list(blocks)
+        random.Random(number).shuffle(ids)
+        self.chunks[page_id] = [block_id for index, block_id in enumerate(ids) if index % 10]
+        return page_id, expected
+
+    def get_link(self, page_id: str) -> str:
+        return f'http://127.0.0.1:{self.port}/Lesson-{page_id.replace("-", "")}'
+
+    async def load_page_chunk(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.requests['loadPageChunk'] += 1
+        await asyncio.sleep(0.01)
+        chunked = self.chunks[data['page']['id']]
+        start = data['cursor']['stack'][0][0]['index'] if data['cursor']['stack'] else 0
+        end = start + data['limit']
+        stack = [[{'table': 'block', 'id': data['page']['id'], 'index': end}]] if end < len(chunked) else []
+        record_map = {'block': {block_id: self.blocks[block_id] for block_id in chunked[start:end]}}
+        return web.json_response({'recordMap': record_map, 'cursor': {'stack': stack}})
+
+    async def sync_record_values(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.requests['syncRecordValues'] += 1
+        block_ids = [item['pointer']['id'] for item in data['requests']]
+        return web.json_response({'recordMap': {'block': {block_id: self.blocks[block_id] for block_id in block_ids}}})
+
+    async def start(self) -> None:
+        stub = web.Application()
+        stub.router.add_post('/api/v3/loadPageChunk', self.load_page_chunk)
+        stub.router.add_post('/api/v3/syncRecordValues', self.sync_record_values)
+        self.runner = web.AppRunner(stub)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        await http_client.close()
+        await self.runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def notion(monkeypatch):
+    monkeypatch.setattr(notion_scraper, 'NOTION_API_URL', 'http://{domain}/api/v3')
+    stub = NotionStub()
+    await stub.start()
+    yield stub
+    await stub.stop()
+
+
+async def test_notion_import_follows_cursor(notion: NotionStub):
+    """Test a page of 600 blocks is loaded in chunks with the missing blocks and parsed in the page order"""
+    page_id, expected = notion.add_page(1)
+    exercises = await notion_scraper.get_exercises_from_notion(notion.get_link(page_id))
+
+    assert len(notion.blocks) > 600
+    assert notion.requests['loadPageChunk'] == -(-len(notion.chunks[page_id]) // notion_scraper.NOTION_CHUNK_LIMIT)
+    assert notion.requests['syncRecordValues'] >= 1
+    assert exercises == expected
+
+
+async def test_notion_import_cache(notion: NotionStub):
+    """Test concurrent imports share one fetch and the cached exercises are revalidated by the last edit time"""
+    page_id, expected = notion.add_page(2)
+    link = notion.get_link(page_id)
+    results = await asyncio.gather(*(notion_scraper.get_exercises_from_notion(link) for _ in range(10)))
+    assert results == [expected] * 10
+    chunk_requests = notion.requests['loadPageChunk']
+
+    assert await notion_scraper.get_exercises_from_notion(link) == expected  # fresh, no request
+    assert notion.requests['loadPageChunk'] == chunk_requests
+
+    key = f'127.0.0.1:{notion.port}/{page_id}'
+    notion_scraper.checked_at[key] = 0
+    sync_requests = notion.requests['syncRecordValues']
+    assert await notion_scraper.get_exercises_from_notion(link) == expected  # unchanged page
+    assert notion.requests['syncRecordValues'] == sync_requests + 1
+    assert notion.requests['loadPageChunk'] == chunk_requests
+
+    notion_scraper.checked_at[key] = 0
+    first_header = notion.blocks[str(uuid.UUID(int=(2 << 64) + 1))]['value']
+    first_header['properties']['title'][0][0] = 'Edited'
+    notion.blocks[page_id]['value']['last_edited_time'] = 2
+    exercises = await notion_scraper.get_exercises_from_notion(link)  # the edited page is loaded again
+    assert exercises[0].startswith('<h3>Edited</h3>')
+    assert notion.requests['loadPageChunk'] == chunk_requests * 2
+
+
+async def test_notion_cache_by_domain(notion: NotionStub):
+    """Test a link to another host with the id of a cached page does not replace the cached exercises"""
+    page_id, expected = notion.add_page(3)
+    assert await notion_scraper.get_exercises_from_notion(notion.get_link(page_id)) == expected
+
+    other = NotionStub()
+    await other.start()
+    try:
+        other.add_page(3)
+        other.blocks[str(uuid.UUID(int=(3 << 64) + 1))]['value']['properties']['title'][0][0] = 'Forged'
+        forged = await notion_scraper.get_exercises_from_notion(other.get_link(page_id))
+    finally:
+        await other.runner.cleanup()
+
+    assert forged[0].startswith('<h3>Forged</h3>')
+    assert await notion_scraper.get_exercises_from_notion(notion.get_link(page_id)) == expected
+
+
+async def test_parse_exercises_in_page_order():
+    """Test the blocks are parsed in the order of the page content, not of the block dictionary"""
+    page_id, blocks, expected = make_page(3)
+    shuffled = list(blocks.items())
+    random.Random(3).shuffle(shuffled)
+    assert await notion_scraper.parse_exercises({'block': dict(shuffled)}, page_id) == expected
+
+    blocks = {
+        'page': {'value': {'type': 'page', 'content': ['header', 'text', 'divider', 'code', 'empty']}},
+        'header': {'value': {'type': 'sub_header', 'properties': {'title': [['Task', [['b']]]]}}},
+        'text': {'value': {'type': 'text', 'properties': {'title': [['Print '], ['x', [['c']]], '!']}}},
+        'divider': {'value': {'type': 'divider'}},
+        'code': {'value': {'type': 'code', 'properties': {'title': [['print(x)']], 'language': [['Python']]}}},
+        'empty': {'value': {'type': 'text', 'properties': {}}},
+    }
+    assert await notion_scraper.parse_exercises({'block': blocks}, 'page') == [
+        '<h3>Task</h3>Print x!<br>',
+        '<pre class="ql-syntax">print(x)</pre>',
+    ]
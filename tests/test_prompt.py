@@ -0,0 +1,39 @@
+from src.classes.executor import executor_service
+from src.classes.prompt import PromptBudget, estimate_tokens
+
+
+def test_prompt_budget_keeps_small_prompt():
+    budget = PromptBudget(budget=1000)
+    code = 'def add(x):\r\n    return x + 1\r\n'
+    assert budget.fit('Task', code) == ('Task', code, 0)
+    assert budget.get_metrics() == {'trimmed': 0, 'tokens_saved': 0}
+
+
+def test_prompt_budget_trims_code():
+    budget = PromptBudget(budget=500)
+    data = 'a' * 1000
+    code = '\n'.join(
+        [f"DATA = '{data}'", 'def f():', *['    print(1)'] * 5, *[f'y{number} = {number}' for number in range(1000)]]
+    )
+    task_text, trimmed, saved = budget.fit('Задание ' * 1000, code)
+
+    lines = trimmed.splitlines()
+    assert len(lines[0]) < 300
+    assert lines[2:4] == ['    print(1)', '    # ... the line above repeated 4 more times']
+    assert 'lines skipped' in trimmed
+    assert lines[-1] == 'y999 = 999'
+    assert estimate_tokens(task_text) + estimate_tokens(trimmed) <= 500 + 1
+    assert saved == budget.get_metrics()['tokens_saved'] > 0
+
+
+async def test_prompt_budget_fits_large_code_in_process():
+    """Test the code of EXECUTOR_OFFLOAD_SIZE characters or more is shortened in the process pool"""
+    budget = PromptBudget(budget=500)
+    code = '\n'.join(f"y{number} = '{number}' * 10" for number in range(10_000))
+    try:
+        assert await budget.fit_async('Task', code) == PromptBudget(budget=500).fit('Task', code)
+    finally:
+        executor_service.shutdown()
+
+    assert executor_service.stats['process'].completed >= 1
+    assert budget.get_metrics()['trimmed'] == 1
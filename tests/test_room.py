@@ -1,5 +1,6 @@
 import asyncio
 
+import httpx
 from socketio import AsyncClient
 
 from tests.conftest import TestContext
@@ -121,3 +122,50 @@ async def test_room_close(
     await asyncio.sleep(0.01)
 
     assert events['room/closed']['message'] == 'Room closed!'
+
+    # The room is deleted a few seconds later, wait for it so the next tests see the final rooms count
+    async with httpx.AsyncClient(base_url='http://127.0.0.1:5000') as http:
+        for _ in range(100):
+            if (await http.get(f'/api/roomstats/{context.room_id}')).status_code == 404:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            raise AssertionError(f'Room {context.room_id} was not deleted')
+
+
+async def test_room_log(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test room/log filters and pagination"""
+    await host.emit('room/create', data={'name': 'Teacher'})
+    await asyncio.sleep(0.01)
+    context.room_id = events['room/update']['id']
+    await client.emit('room/join', data={'room_id': context.room_id, 'name': 'John Test'})
+    await asyncio.sleep(0.01)
+
+    await host.emit('room/log', data={'room_id': context.room_id, 'role': 'client', 'limit': 10})
+    await asyncio.sleep(0.01)
+
+    log = events['room/log']
+
+    assert log['total_rooms_count'] >= 1
+    assert log['total_users_count'] >= 2
+    assert log['users_count'] == 1
+    assert log['users'] == [
+        {
+            'id': events['room/join']['user_id'],
+            'name': 'John Test',
+            'room': context.room_id,
+            'role': 'client',
+            'status': 'online',
+        },
+    ]
+
+    await host.emit('room/log', data={'offset': 0, 'limit': 1})
+    await asyncio.sleep(0.01)
+
+    assert len(events['room/log']['rooms']) == 1
+    assert len(events['room/log']['users']) == 1
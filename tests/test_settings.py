@@ -48,3 +48,10 @@ async def test_settings(
         'dist',
     }
     assert set(settings['extensions']) == {'so', 'py[cod]'}
+
+    events.pop('settings')
+    await host.emit('settings', data={'files_to_ignore': '*.py[z-a]\nvenv/'})  # invalid character range
+    await asyncio.sleep(0.01)
+
+    assert 'settings' not in events
+    assert events['error']['message'].startswith('Error: Event: settings. Failed to parse files to ignore: bad')
@@ -1,4 +1,7 @@
 import asyncio
+import hashlib
+import json
+import zlib
 
 from socketio import AsyncClient
 
@@ -36,7 +39,7 @@ async def test_sharing_code(host: AsyncClient, client: AsyncClient, events: dict
         'room_id': context.room_id,
         'user_id': context.client_id,
         'files': [
-            {'filename': 'main.py', 'status': 'CREATED', 'content': 'содержимое main.py'},
+            {'filename': 'main.py', 'status': 'CREATED', 'content': 'содержимое main.py', 'language': 'python'},
             {'filename': 'data/data.json', 'status': 'CREATED', 'content': 'содержимое data.json'},
         ],
     }
@@ -48,9 +51,400 @@ async def test_sharing_code(host: AsyncClient, client: AsyncClient, events: dict
     updated_data = {
         'room_id': context.room_id,
         'user_id': context.client_id,
-        'files': [{'filename': 'main.py', 'status': 'UPDATED', 'content': 'содержимое main.py обновилось'}],
+        'files': [
+            {
+                'filename': 'main.py',
+                'status': 'UPDATED',
+                'content': 'содержимое main.py обновилось',
+                'language': 'python',
+            }
+        ],
     }
     await client.emit('sharing/code_update', data=updated_data)
     await asyncio.sleep(0.01)
 
     assert events.get('sharing/code_update') == updated_data
+
+
+async def test_sharing_code_diff(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test code_update with changes for a host with the 'diff' feature, sharing/resync and sharing/snapshot"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id, 'features': ['diff']})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    files = [{'filename': 'main.py', 'status': 'CREATED', 'content': 'print(1)\n'}]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_send']['version'] == 0
+
+    changes = [{'start': 6, 'end': 7, 'text': '42'}]
+    update = {'filename': 'main.py', 'status': 'UPDATED', 'changes': changes}
+    await client.emit('sharing/code_update', data={'room_id': context.room_id, 'version': 0, 'files': [update]})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_update']['version'] == 1
+    assert events['sharing/code_update']['files'] == [update]
+
+    # Full content from old plugins is relayed as a diff
+    update = {'filename': 'main.py', 'status': 'UPDATED', 'content': 'print(42)\nprint(2)\n'}
+    await client.emit('sharing/code_update', data={'room_id': context.room_id, 'files': [update]})
+    await asyncio.sleep(0.2)  # relayed after SHARING_UPDATE_INTERVAL
+
+    assert events['sharing/code_update']['files'][0]['changes'] == [{'start': 10, 'end': 10, 'text': 'print(2)\n'}]
+
+    await client.emit('sharing/code_update', data={'room_id': context.room_id, 'version': 0, 'files': [update]})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/resync'] == {'version': 2}
+
+    await host.emit('sharing/snapshot', data={'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_send']['files'] == [
+        {'filename': 'main.py', 'status': 'CREATED', 'content': 'print(42)\nprint(2)\n'},
+    ]
+    assert events['sharing/code_send']['version'] == 2
+
+
+async def test_sharing_code_update_throttling(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test code_update coming faster than SHARING_UPDATE_INTERVAL are merged into the latest state"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    updates = []
+
+    async def on_code_update(data):
+        updates.append(data)
+
+    host.on('sharing/code_update', on_code_update)
+
+    files = [{'filename': 'main.py', 'status': 'CREATED', 'content': ''}]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    for i in range(10):
+        files = [{'filename': 'main.py', 'status': 'UPDATED', 'content': f'print({i})'}]
+        await client.emit('sharing/code_update', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.3)
+
+    assert 1 < len(updates) < 10
+    assert updates[-1]['files'] == [{'filename': 'main.py', 'status': 'UPDATED', 'content': 'print(9)'}]
+
+
+async def test_sharing_subscriptions(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test only the code of subscribed users is relayed to a host with the 'subscribe' feature"""
+    await host.emit(
+        'room/rehost',
+        data={'user_id': context.host_id, 'room_id': context.room_id, 'features': ['subscribe']},
+    )
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    files = [{'filename': 'main.py', 'status': 'CREATED', 'content': 'print(1)'}]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert 'sharing/code_send' not in events
+
+    await host.emit('sharing/subscribe', data={'user_ids': [context.client_id]})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_send']['files'] == files
+
+    files = [{'filename': 'main.py', 'status': 'UPDATED', 'content': 'print(2)'}]
+    await client.emit('sharing/code_update', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_update']['files'] == files
+
+    await host.emit('sharing/unsubscribe', data={'user_ids': [context.client_id]})
+    await asyncio.sleep(0.01)
+    events.pop('sharing/code_update')
+    await client.emit('sharing/code_update', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.2)
+
+    assert 'sharing/code_update' not in events
+
+
+async def test_sharing_start_snapshot(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test the host gets the last shared code of the user at once on sharing/start"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    await host.emit('sharing/start', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/start'] == {}
+    assert events['sharing/code_send']['user_id'] == context.client_id
+    assert 'version' not in events['sharing/code_send']  # as in the live code_send to a host without 'diff'
+    assert events['sharing/code_send']['files'] == [
+        {'filename': 'main.py', 'status': 'CREATED', 'content': 'print(2)'},
+    ]
+
+    events.pop('sharing/code_send')
+    await client.emit('sharing/snapshot', data={'user_id': context.client_id})  # only the host gets snapshots
+    await asyncio.sleep(0.01)
+
+    assert 'sharing/code_send' not in events
+    assert events['error']['message'] == f'Error: Event: sharing/snapshot. Host or user {context.client_id} not found!'
+
+
+async def test_sharing_transfer(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test chunked sharing/code_send with resume"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    files = [{'filename': 'big.py', 'status': 'CREATED', 'content': 'x = 1\n' * 100}]
+    payload = json.dumps(files)
+    chunks = [payload[i : i + 250] for i in range(0, len(payload), 250)]
+    manifest = {'room_id': context.room_id, 'transfer_id': 't1', 'size': len(payload), 'chunks': len(chunks)}
+
+    await client.emit('sharing/transfer/start', data=manifest)
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/transfer/ack'] == {'transfer_id': 't1', 'received': []}
+
+    huge = {**manifest, 'transfer_id': 't2', 'size': 10**6, 'chunks': 10**6}  # rejected before allocating the chunks
+    await client.emit('sharing/transfer/start', data=huge)
+    await asyncio.sleep(0.01)
+
+    assert (
+        events['error']['message'] == 'Error: Event: sharing/transfer/start. Chunks count should be between 1 and 4096'
+    )
+    assert events['sharing/transfer/ack']['transfer_id'] == 't1'
+
+    chunk = {'room_id': context.room_id, 'transfer_id': 't1'}
+    await client.emit('sharing/transfer/chunk', data={**chunk, 'index': 0, 'data': chunks[0]})
+    await asyncio.sleep(0.01)
+    # Resume after reconnect
+    await client.emit('sharing/transfer/start', data=manifest)
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/transfer/ack'] == {'transfer_id': 't1', 'received': [0]}
+
+    for index in range(1, len(chunks)):
+        await client.emit('sharing/transfer/chunk', data={**chunk, 'index': index, 'data': chunks[index]})
+    await asyncio.sleep(0.05)
+
+    assert events['sharing/transfer/progress']['received'] == len(chunks)
+    assert events['sharing/transfer/done'] == {'transfer_id': 't1'}
+    assert events['sharing/code_send']['files'] == files
+
+
+async def test_sharing_transfer_after_disconnect(host: AsyncClient, events: dict, context: TestContext):
+    """Test a transfer is resumed by the student who disconnected and joined the room again"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+
+    files = [{'filename': 'big.py', 'status': 'CREATED', 'content': 'y = 2\n' * 100}]
+    payload = json.dumps(files)
+    chunks = [payload[i : i + 250] for i in range(0, len(payload), 250)]
+    manifest = {'room_id': context.room_id, 'transfer_id': 't2', 'size': len(payload), 'chunks': len(chunks)}
+    chunk = {'room_id': context.room_id, 'transfer_id': 't2'}
+    acks = []
+
+    async def on_ack(data):
+        acks.append(data)
+
+    student = AsyncClient()
+    student.on('sharing/transfer/ack', on_ack)
+    await student.connect('http://127.0.0.1:5000')
+    try:
+        await student.emit('room/join', data={'room_id': context.room_id, 'name': 'Slow Network'})
+        await asyncio.sleep(0.01)
+        await student.emit('sharing/transfer/start', data=manifest)
+        await student.emit('sharing/transfer/chunk', data={**chunk, 'index': 0, 'data': chunks[0]})
+        await asyncio.sleep(0.01)
+    finally:
+        await student.disconnect()
+    await asyncio.sleep(0.01)
+
+    student = AsyncClient()
+    student.on('sharing/transfer/ack', on_ack)
+    await student.connect('http://127.0.0.1:5000')
+    try:
+        await student.emit('room/join', data={'room_id': context.room_id, 'name': 'Slow Network'})
+        await asyncio.sleep(0.01)
+        await student.emit('sharing/transfer/start', data=manifest)
+        await asyncio.sleep(0.01)
+
+        assert acks == [{'transfer_id': 't2', 'received': []}, {'transfer_id': 't2', 'received': [0]}]
+
+        for index in range(1, len(chunks)):
+            await student.emit('sharing/transfer/chunk', data={**chunk, 'index': index, 'data': chunks[index]})
+        await asyncio.sleep(0.05)
+
+        assert events['sharing/code_send']['files'] == files
+    finally:
+        await student.disconnect()
+
+
+async def test_sharing_code_zlib(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test compressed binary payloads for clients with the 'zlib' feature"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id, 'features': ['zlib']})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    files = [{'filename': 'big.py', 'status': 'CREATED', 'content': 'print("hello")\n' * 1000}]
+    payload = zlib.compress(json.dumps(files).encode())
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'encoding': 'zlib', 'payload': payload})
+    await asyncio.sleep(0.05)
+
+    code_send = events['sharing/code_send']
+    assert code_send['encoding'] == 'zlib'
+    assert 'files' not in code_send
+    assert len(code_send['payload']) < len(json.dumps(files)) // 10
+    assert json.loads(zlib.decompress(code_send['payload'])) == files
+
+    # Small files are sent as JSON
+    files = [{'filename': 'main.py', 'status': 'CREATED', 'content': 'print(1)'}]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_send']['files'] == files
+
+
+async def test_sharing_blobs(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test files sent as hashes of the content already stored in the room"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    template = 'def main():\n    pass\n'
+    digest = hashlib.sha256(template.encode()).hexdigest()
+    await client.emit('sharing/blobs', data={'room_id': context.room_id, 'hashes': [digest]})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/blobs/missing'] == {'hashes': [digest]}
+
+    files = [{'filename': 'main.py', 'status': 'CREATED', 'content': template}]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+    await client.emit('sharing/blobs', data={'room_id': context.room_id, 'hashes': [digest]})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/blobs/missing'] == {'hashes': []}
+
+    files = [
+        {'filename': 'main.py', 'status': 'CREATED', 'hash': digest},
+        {'filename': 'copy.py', 'status': 'CREATED', 'hash': digest},
+    ]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert events['sharing/code_send']['files'] == [
+        {'filename': 'main.py', 'status': 'CREATED', 'content': template},
+        {'filename': 'copy.py', 'status': 'CREATED', 'content': template},
+    ]
+
+    outsider = AsyncClient()
+    outsider.on('sharing/blobs/missing', lambda data: events.update(outsider_missing=data))
+    await outsider.connect('http://127.0.0.1:5000')
+    try:
+        await outsider.emit('sharing/blobs', data={'room_id': context.room_id, 'hashes': [digest]})
+        await asyncio.sleep(0.01)
+    finally:
+        await outsider.disconnect()
+
+    assert 'outsider_missing' not in events
+    assert events['error']['message'].startswith('Error: Event: sharing/blobs. User with sid')
+
+
+async def test_sharing_ignored_files(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test files ignored by the room settings are not relayed to the host"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+    await host.emit('settings', data={'files_to_ignore': 'venv/\n.git/\n*.py[cod]\n.env'})
+    await asyncio.sleep(0.01)
+
+    files = [
+        {'filename': filename, 'status': 'CREATED', 'content': ''}
+        for filename in ('main.py', 'venv/lib/site.py', '.git/HEAD', 'src/__init__.pyc', 'src/.env', 'venvs/a.py')
+    ]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    assert [file['filename'] for file in events['sharing/code_send']['files']] == ['main.py', 'venvs/a.py']
+
+    await host.emit('settings', data={'files_to_ignore': ''})
+    await asyncio.sleep(0.01)
+
+
+async def test_room_similarity(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test students who shared the same code are clustered together"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+    other = AsyncClient()
+    await other.connect('http://127.0.0.1:5000')
+    try:
+        await other.emit('room/join', data={'room_id': context.room_id, 'name': 'Copy Paste'})
+        await asyncio.sleep(0.01)
+
+        solution = '\n'.join(f'def task_{i}(numbers):\n    return sum(n * {i} for n in numbers)' for i in range(20))
+        files = [{'filename': 'solution.py', 'status': 'CREATED', 'content': solution}]
+        await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+        files = [{'filename': 'solution.py', 'status': 'CREATED', 'content': solution + '\n# my solution'}]
+        await other.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+        await asyncio.sleep(0.01)
+
+        await client.emit('room/similarity', data={'threshold': 0.5})
+        await asyncio.sleep(0.05)
+
+        assert 'room/similarity' not in events
+        assert events['error']['message'].startswith('Error: Event: room/similarity. Host with sid')
+
+        await host.emit('room/similarity', data={'threshold': 0.5})
+        await asyncio.sleep(0.05)
+
+        clusters = events['room/similarity']['clusters']
+        assert len(clusters) == 1
+        assert len(clusters[0]['user_ids']) == 2
+        assert context.client_id in clusters[0]['user_ids']
+        assert clusters[0]['similarity'] >= 0.5
+    finally:
+        await other.disconnect()
+
+
+async def test_room_search(host: AsyncClient, client: AsyncClient, events: dict, context: TestContext):
+    """Test search over the messages and the shared code of the room"""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+    await client.emit('room/rejoin', data={'room_id': context.room_id, 'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    await client.emit('message/to_mentor', data={'room_id': context.room_id, 'content': 'Help with the recursion'})
+    files = [
+        {'filename': 'fib.py', 'status': 'CREATED', 'content': 'import sys\n\ndef fib(n):\n    return recursion(n)'}
+    ]
+    await client.emit('sharing/code_send', data={'room_id': context.room_id, 'files': files})
+    await asyncio.sleep(0.01)
+
+    await host.emit('room/search', data={'query': 'Recursion'})
+    await asyncio.sleep(0.01)
+
+    results = events['room/search']['results']
+    assert {result['type'] for result in results} == {'message', 'file'}
+    assert all(result['user_id'] == context.client_id for result in results)
+    message = next(result for result in results if result['type'] == 'message')
+    assert message['message']['content'] == 'Help with the recursion'
+    file = next(result for result in results if result['type'] == 'file')
+    assert file['filename'] == 'fib.py'
+    assert file['line'] == 4
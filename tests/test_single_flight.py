@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from src.classes.single_flight import SingleFlight
+
+
+async def test_single_flight_coalesces_calls():
+    flights = SingleFlight()
+    calls = []
+
+    async def request(answer: str) -> str:
+        calls.append(answer)
+        await asyncio.sleep(0.05)
+        return answer
+
+    waiters = [asyncio.ensure_future(flights.do('task', lambda: request('first'))) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    waiters[0].cancel()  # a disconnected student does not cancel the call for the others
+
+    results = await asyncio.gather(*waiters[1:])
+    assert results == ['first'] * 9
+    assert calls == ['first']
+    assert flights.get_metrics() == {'in_flight': 0, 'coalesced': 9}
+
+    assert await flights.do('task', lambda: request('second')) == 'second'
+
+
+async def test_single_flight_shares_exceptions():
+    flights = SingleFlight()
+
+    async def request():
+        await asyncio.sleep(0.01)
+        raise ValueError('API is down')
+
+    results = await asyncio.gather(*(flights.do('task', request) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError, match='API is down'):
+        await flights.do('task', request)
@@ -2,6 +2,7 @@ import asyncio
 
 from socketio import AsyncClient
 
+from src.classes.progress import ProgressLog
 from tests.conftest import TestContext
 
 NOTION_URL = 'https://it-cat.notion.site/cc1609901f894100b20b07f6b51dc37f'
@@ -97,6 +98,12 @@ async def test_steps_to_mentor_and_client(
     assert alerts['type'] == 'WARNING'
     assert alerts['message'] == 'Task 2 solution declined!'
 
+    # Statuses without steps are rejected
+    await host.emit('steps/status/to_client', data={'user_id': context.client_id})
+    await asyncio.sleep(0.01)
+
+    assert events['error']['message'] == 'Error: Event: steps/status/to_client. steps should be a dictionary!'
+
 
 async def test_steps_table(
     host: AsyncClient,
@@ -124,6 +131,28 @@ async def test_steps_table(
     ]
 
 
+async def test_steps_analytics(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test steps/analytics."""
+    await host.emit('room/rehost', data={'user_id': context.host_id, 'room_id': context.room_id})
+    await asyncio.sleep(0.01)
+
+    await host.emit('steps/analytics', data={})
+    await asyncio.sleep(0.01)
+
+    analytics = events['steps/analytics']
+
+    assert analytics['events'] == 5
+    assert analytics['throughput'] == 3
+    assert analytics['steps']['1']['completed'] == 1
+    assert analytics['steps']['2']['completed'] == 1
+    assert analytics['steps']['3'] == {'completed': 0, 'average_time': None, 'median_time': None}
+
+
 async def wait_for_event(events, event_name):
     while event_name not in events:
         await asyncio.sleep(0.01)
@@ -152,3 +181,20 @@ async def test_steps_import(
     assert len(events['steps/load']) == 3
     assert events['alerts']['type'] == 'SUCCESS'
     assert events['alerts']['message'] == 'Задания были успешно загружены из Notion!'
+
+
+def test_progress_log_names_are_bounded():
+    """Test new step names are dropped once the names table is full and compaction forgets unused names"""
+    log = ProgressLog(max_events=4, max_names=4)
+    log.append(1, 'step 1', 'NONE', timestamp=1)
+    log.append(1, 'step 1', 'DONE', timestamp=2)
+    log.append(1, 'step 2', 'DONE', timestamp=3)
+    log.append(1, 'step 3', 'DONE', timestamp=4)  # the fifth name
+
+    assert [event[1:3] for event in log.events()] == [('step 1', 'NONE'), ('step 1', 'DONE'), ('step 2', 'DONE')]
+
+    log.append(2, 'step 2', 'NONE', timestamp=5)
+    log.append(2, 'step 3', 'DONE', timestamp=6)  # compacted, the name 'step 1' is freed
+
+    assert [event[1:3] for event in log.events()] == [('step 2', 'DONE'), ('step 2', 'NONE'), ('step 3', 'DONE')]
+    assert log.time_to_completion('step 3') == {2: 0}
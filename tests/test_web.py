@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPBasicCredentials
+from socketio import AsyncClient
+
+from src.web import check_admin
+from tests.conftest import ADMIN_AUTH, TestContext
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+
+async def test_roomstats_etag(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test /api/roomstats and /roomstats are cached and return 304 for a known ETag"""
+    await host.emit('room/create', data={'name': 'Teacher'})
+    await asyncio.sleep(0.01)
+    context.room_id = events['room/update']['id']
+    await client.emit('room/join', data={'room_id': context.room_id, 'name': 'John Test'})
+    await asyncio.sleep(0.01)
+    await client.emit('steps/status/to_mentor', data={'1': 'DONE', '2': 'NONE'})
+    await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=BASE_URL) as http:
+        response = await http.get(f'/api/roomstats/{context.room_id}')
+        assert response.status_code == 200
+        assert response.json() == {
+            'room_id': context.room_id,
+            'users': [{'username': 'John Test', 'steps': {'1': 'DONE', '2': 'NONE'}, 'result': 50}],
+        }
+        etag = response.headers['etag']
+
+        response = await http.get(f'/api/roomstats/{context.room_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        html = await http.get(f'/roomstats/{context.room_id}')
+        assert html.status_code == 200
+        assert html.headers['etag'] != etag
+
+        await client.emit('steps/status/to_mentor', data={'1': 'DONE', '2': 'DONE'})
+        await asyncio.sleep(0.01)
+
+        response = await http.get(f'/api/roomstats/{context.room_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json()['users'][0]['result'] == 100
+
+        response = await http.get('/api/roomstats/1')
+        assert response.status_code == 404
+
+
+async def test_room_export(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test /export/{room_id}.csv and /export/{room_id}.jsonl"""
+    await host.emit('room/create', data={'name': 'Teacher'})
+    await asyncio.sleep(0.01)
+    context.room_id = events['room/update']['id']
+    await client.emit('room/join', data={'room_id': context.room_id, 'name': 'John Test'})
+    await asyncio.sleep(0.01)
+    await client.emit('steps/status/to_mentor', data={'1': 'DONE'})
+    await client.emit('message/to_mentor', data={'room_id': context.room_id, 'content': 'Hi, teacher'})
+    await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=BASE_URL) as http:
+        response = await http.get(f'/export/{context.room_id}.csv')
+        assert response.status_code == 401
+        response = await http.get(f'/export/{context.room_id}.jsonl', auth=('admin', 'wrong password'))
+        assert response.status_code == 401
+
+    async with httpx.AsyncClient(base_url=BASE_URL, auth=ADMIN_AUTH) as http:
+        response = await http.get(f'/export/{context.room_id}.csv')
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0] == 'type,user_id,username,step,status,sender,receiver,content,created_at'
+        assert lines[1].startswith('step,')
+        assert lines[2].startswith('message,')
+        assert 'Hi, teacher' in lines[2]
+
+        response = await http.get(f'/export/{context.room_id}.jsonl')
+        assert response.status_code == 200
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [record['type'] for record in records] == ['step', 'message']
+        assert records[1]['content'] == 'Hi, teacher'
+
+        response = await http.get('/export/1.csv')
+        assert response.status_code == 404
+
+
+async def test_admin_api(
+    host: AsyncClient,
+    client: AsyncClient,
+    events: dict,
+    context: TestContext,
+):
+    """Test /api/admin/* endpoints"""
+    await host.emit('room/create', data={'name': 'Teacher'})
+    await asyncio.sleep(0.01)
+    context.room_id = events['room/update']['id']
+    await client.emit('room/join', data={'room_id': context.room_id, 'name': 'John Test'})
+    await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=BASE_URL, auth=ADMIN_AUTH) as http:
+        overview = (await http.get('/api/admin/overview')).json()
+        assert overview['total_rooms_count'] >= 1
+        assert overview['total_users_count'] == sum(overview['roles'].values())
+
+        rooms = (await http.get('/api/admin/rooms', params={'limit': 2})).json()
+        assert rooms['total_rooms_count'] == overview['total_rooms_count']
+        assert len(rooms['rooms']) <= 2
+
+        users = (await http.get('/api/admin/users', params={'room_id': context.room_id, 'role': 'host'})).json()
+        assert users['users_count'] == 1
+        assert users['users'][0]['name'] == 'Teacher'
+
+        response = await http.get('/api/admin/users', params={'status': 'unknown'})
+        assert response.status_code == 422
+
+
+def test_check_admin_without_credentials(monkeypatch):
+    """Test the admin endpoints are closed when the credentials are not configured, unless opened explicitly"""
+    monkeypatch.delenv('SOCKET_ADMIN_USERNAME', raising=False)
+    monkeypatch.delenv('SOCKET_ADMIN_PASSWORD', raising=False)
+    monkeypatch.delenv('ADMIN_AUTH_DISABLED', raising=False)
+    with pytest.raises(HTTPException) as error:
+        check_admin(HTTPBasicCredentials(username='', password=''))
+    assert error.value.status_code == 403
+
+    monkeypatch.setenv('ADMIN_AUTH_DISABLED', '1')
+    assert check_admin(None) is None